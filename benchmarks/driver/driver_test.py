@@ -0,0 +1,48 @@
+import pytest
+
+from esrally import metrics, track
+from esrally.driver import driver
+
+CLIENTS = 8
+
+SAMPLES_PER_CLIENT = 25000
+
+task = track.Task(track.Operation("index", track.OperationType.Index), clients=CLIENTS)
+
+
+def create_buffers():
+    buffers = []
+    for client_id in range(CLIENTS):
+        buffer = driver.SampleBuffer(client_id, task)
+        for i in range(SAMPLES_PER_CLIENT):
+            sample_type = metrics.SampleType.Warmup if i < SAMPLES_PER_CLIENT // 10 else metrics.SampleType.Normal
+            # clients run concurrently so their samples interleave
+            absolute_time = 1470838595 + i * 0.01 + client_id * 0.001
+            buffer.add(absolute_time, i * 0.01, sample_type, {"success": True}, 10, 9, 5000, "docs", i * 0.01, i / SAMPLES_PER_CLIENT)
+        buffers.append(buffer)
+    return buffers
+
+
+buffers = create_buffers()
+
+samples = [sample for buffer in buffers for sample in buffer.to_samples()]
+
+
+@pytest.mark.benchmark(
+    group="global-throughput",
+    warmup="on",
+    warmup_iterations=3,
+    disable_gc=True
+)
+def test_calculate_global_throughput_of_samples(benchmark):
+    benchmark(driver.calculate_global_throughput, samples)
+
+
+@pytest.mark.benchmark(
+    group="global-throughput",
+    warmup="on",
+    warmup_iterations=3,
+    disable_gc=True
+)
+def test_calculate_global_throughput_of_buffers(benchmark):
+    benchmark(driver.calculate_global_throughput_of_buffers, buffers)
@@ -1,20 +1,236 @@
 import gzip
+import itertools
+import json
 import logging
+import queue
+import re
+import threading
+import time
+import urllib.parse
 
 import certifi
 import urllib3
 
+from esrally.utils import compression
+
 logger = logging.getLogger("rally.client")
 
+class PoolWaitTime(threading.local):
+    """
+    Accumulates the time that the current thread has waited for a free connection in a shared connection pool.
+    """
+    def __init__(self):
+        self.seconds = 0
+
+    def add(self, seconds):
+        self.seconds += seconds
+
+    def pop(self):
+        """
+        :return: The accumulated wait time in seconds since the last call.
+        """
+        seconds, self.seconds = self.seconds, 0
+        return seconds
+
+
+POOL_WAIT_TIME = PoolWaitTime()
+
+
+class TimedLifoQueue(queue.LifoQueue):
+    """
+    The queue of connections in a shared connection pool which records in ``POOL_WAIT_TIME`` how long clients wait for a free connection.
+    """
+    def get(self, block=True, timeout=None):
+        start = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            POOL_WAIT_TIME.add(time.perf_counter() - start)
+
+
+class ConnectionPools:
+    """
+    Manages the HTTP connection pools of all clients in a load driver process. All clients share one connection pool per target node which
+    holds one connection per client. If all connections are in use, clients wait for a free connection instead of opening new ones. The
+    time they wait is recorded in ``POOL_WAIT_TIME``.
+
+    Note that this relies on internals of ``urllib3.HTTPConnectionPool`` (the ``pool`` queue and ``_get_conn`` / ``_put_conn``) which are
+    not part of its public API. They are the same in all urllib3 1.x versions (tested with urllib3 1.26) and setup.py restricts urllib3 to
+    them. Check this class again when lifting that restriction.
+    """
+    def __init__(self, clients):
+        """
+        :param clients: The number of clients in this process.
+        """
+        self.clients = clients
+        self.pools = {}
+        self.lock = threading.Lock()
+
+    def shared(self, pool):
+        """
+        :param pool: A new (unused) urllib3 connection pool.
+        :return: The shared connection pool for the same target node. If there is none yet, ``pool`` becomes the shared pool.
+        """
+        key = (pool.scheme, pool.host, pool.port)
+        with self.lock:
+            if key not in self.pools:
+                logger.info("Creating shared connection pool with [%d] connections to [%s://%s:%s]." %
+                            (self.clients, pool.scheme, pool.host, pool.port))
+                pool.pool = TimedLifoQueue(self.clients)
+                for _ in range(self.clients):
+                    pool.pool.put(None)
+                pool.block = True
+                self.pools[key] = pool
+            return self.pools[key]
+
+    def warm(self):
+        """
+        Opens all connections of all shared pools so clients do not need to establish (TCP and TLS) connections during the benchmark.
+        """
+        start = time.perf_counter()
+        for key, pool in self.pools.items():
+            connections = [pool._get_conn() for _ in range(self.clients)]
+            try:
+                for connection in connections:
+                    if connection.sock is None:
+                        connection.connect()
+            except BaseException:
+                logger.exception("Could not open all connections to [%s://%s:%s] in advance." % key)
+            finally:
+                for connection in connections:
+                    pool._put_conn(connection)
+        POOL_WAIT_TIME.pop()
+        logger.info("Opened connections of [%d] shared connection pools in [%.2f] seconds." %
+                    (len(self.pools), time.perf_counter() - start))
+
+
+class LeanTransport:
+    """
+    A minimal HTTP transport for hot operations like bulk requests. Contrary to elasticsearch-py it sends ready-to-send ``bytes`` bodies
+    without any further processing, does not log requests and responses and does not retry on other nodes. Errors are reported with the
+    same exception types as elasticsearch-py so they are handled in the same way by the driver.
+    """
+    # matches the beginning of (possibly filtered) bulk responses without any errors, e.g. ``{"took":30,"errors":false,"items":[...]}``
+    BULK_WITHOUT_ERRORS = re.compile(rb'\s*{\s*("took"\s*:\s*\d+\s*,\s*)?"errors"\s*:\s*false\b')
+
+    def __init__(self, hosts, client_options, connection_pools=None):
+        """
+        :param hosts: A list of hosts as dicts with the keys ``host``, ``port`` and optionally ``use_ssl`` and ``url_prefix``.
+        :param client_options: The client options as passed to the Elasticsearch client.
+        :param connection_pools: ``ConnectionPools`` to share connections with other clients. Optional.
+        """
+        self.compressed = client_options.get("compressed", False)
+        self.compression_level = client_options.get("compression_level", compression.DEFAULT_COMPRESSION_LEVEL)
+        self.headers = {"connection": "keep-alive", "content-type": "application/json"}
+        if client_options.get("http_auth"):
+            self.headers.update(urllib3.make_headers(basic_auth="%s:%s" % tuple(client_options["http_auth"])))
+        if self.compressed:
+            self.headers.update(urllib3.make_headers(accept_encoding=True))
+            self.headers["content-encoding"] = "gzip"
+        self.pools = []
+        for host in hosts:
+            pool = self._create_pool(host, client_options)
+            if connection_pools:
+                pool = connection_pools.shared(pool)
+            self.pools.append((pool, host.get("url_prefix", "").rstrip("/")))
+        self._next_pool = itertools.cycle(self.pools)
+
+    @staticmethod
+    def _create_pool(host, client_options):
+        use_ssl = host.get("use_ssl", client_options.get("use_ssl", False))
+        pool_options = {
+            "host": host.get("host", "localhost"),
+            "port": host.get("port", 9200),
+            "timeout": client_options.get("timeout", 10),
+            "maxsize": client_options.get("maxsize", 10)
+        }
+        if use_ssl:
+            verify_certs = client_options.get("verify_certs", True)
+            pool = urllib3.HTTPSConnectionPool(cert_reqs="CERT_REQUIRED" if verify_certs else "CERT_NONE",
+                                               ca_certs=client_options.get("ca_certs"),
+                                               cert_file=client_options.get("client_cert"),
+                                               key_file=client_options.get("client_key"),
+                                               **pool_options)
+        else:
+            pool = urllib3.HTTPConnectionPool(**pool_options)
+        return pool
+
+    def perform_request(self, method, path, params=None, body=None):
+        """
+        Sends a request to the next host (round-robin).
+
+        :param method: The HTTP method.
+        :param path: The path of the request, e.g. ``/_bulk``.
+        :param params: A dict of query parameters. Optional.
+        :param body: The request body as ``bytes``. Optional.
+        :return: The (uncompressed) response body as ``bytes``.
+        """
+        import elasticsearch
+
+        pool, url_prefix = next(self._next_pool)
+        url = url_prefix + path
+        if params:
+            url = "%s?%s" % (url, urllib.parse.urlencode(params))
+        if body is not None and self.compressed:
+            if isinstance(body, compression.PrecompressedBody):
+                body = body.compressed
+            else:
+                body = gzip.compress(body, compresslevel=self.compression_level)
+        try:
+            response = pool.urlopen(method, url, body=body, headers=self.headers, retries=False)
+        except urllib3.exceptions.ReadTimeoutError as e:
+            raise elasticsearch.ConnectionTimeout("TIMEOUT", str(e), e)
+        except urllib3.exceptions.HTTPError as e:
+            raise elasticsearch.ConnectionError("N/A", str(e), e)
+        data = response.data
+        if not 200 <= response.status < 300:
+            self._raise_error(response.status, data)
+        return data
+
+    @staticmethod
+    def _raise_error(status, data):
+        # mirrors elasticsearch.Connection#_raise_error
+        import elasticsearch
+        from elasticsearch.exceptions import HTTP_EXCEPTIONS
+
+        raw_data = data.decode("utf-8", errors="replace")
+        error_message = raw_data
+        additional_info = None
+        try:
+            additional_info = json.loads(raw_data)
+            error_message = additional_info.get("error", error_message)
+            if isinstance(error_message, dict) and "type" in error_message:
+                error_message = error_message["type"]
+        except (ValueError, TypeError, AttributeError):
+            pass
+        raise HTTP_EXCEPTIONS.get(status, elasticsearch.TransportError)(status, error_message, additional_info)
+
+    def bulk(self, path, params, body, parse_items=False):
+        """
+        Sends a bulk request.
+
+        :param path: The path of the bulk request, e.g. ``/_bulk`` or ``/logs/type/_bulk``.
+        :param params: A dict of query parameters.
+        :param body: The bulk request body as ``bytes``.
+        :param parse_items: If ``True``, the response is always parsed completely. Otherwise, the (potentially large) response is only
+                            parsed if it contains errors.
+        :return: The bulk response. If it is not parsed, only ``errors`` is contained.
+        """
+        data = self.perform_request("POST", path, params=params, body=body)
+        if not parse_items and LeanTransport.BULK_WITHOUT_ERRORS.match(data):
+            return {"errors": False}
+        return json.loads(data.decode("utf-8"))
+
 
 class EsClientFactory:
     """
     Abstracts how the Elasticsearch client is created. Intended for testing.
     """
-    def __init__(self, hosts, client_options):
+    def __init__(self, hosts, client_options, connection_pools=None):
         logger.info("Creating ES client connected to %s with options [%s]" % (hosts, client_options))
         self.hosts = hosts
         self.client_options = client_options
+        self.connection_pools = connection_pools
 
         if self._is_set(client_options, "use_ssl") and self._is_set(client_options, "verify_certs") and "ca_certs" not in client_options:
             self.client_options["ca_certs"] = certifi.where()
@@ -37,13 +253,17 @@ class EsClientFactory:
 
     def create(self):
         class PoolWrap(object):
-            def __init__(self, pool, compressed=False, **kwargs):
+            def __init__(self, pool, compressed=False, compression_level=compression.DEFAULT_COMPRESSION_LEVEL, **kwargs):
                 self.pool = pool
                 self.compressed = compressed
+                self.compression_level = compression_level
 
             def urlopen(self, method, url, body, retries, headers, **kw):
                 if body is not None and self.compressed:
-                    body = gzip.compress(body)
+                    if isinstance(body, compression.PrecompressedBody):
+                        body = body.compressed
+                    else:
+                        body = gzip.compress(body, compresslevel=self.compression_level)
                 return self.pool.urlopen(method, url, body=body, retries=retries, headers=headers, **kw)
 
             def __getattr__(self, attr_name):
@@ -51,12 +271,20 @@ class EsClientFactory:
 
         import elasticsearch
 
+        connection_pools = self.connection_pools
+
         class ConfigurableHttpConnection(elasticsearch.Urllib3HttpConnection):
             def __init__(self, compressed=False, **kwargs):
                 super(ConfigurableHttpConnection, self).__init__(**kwargs)
                 if compressed:
                     self.headers.update(urllib3.make_headers(accept_encoding=True))
                     self.headers.update({"Content-Encoding": "gzip"})
-                self.pool = PoolWrap(self.pool, **kwargs)
+                if connection_pools:
+                    self.pool = connection_pools.shared(self.pool)
+                self.pool = PoolWrap(self.pool, compressed=compressed, **kwargs)
 
-        return elasticsearch.Elasticsearch(hosts=self.hosts, connection_class=ConfigurableHttpConnection, **self.client_options)
+        client_options = {k: v for k, v in self.client_options.items() if k != "lean_transport"}
+        es = elasticsearch.Elasticsearch(hosts=self.hosts, connection_class=ConfigurableHttpConnection, **client_options)
+        if self._is_set(self.client_options, "lean_transport"):
+            es.lean_transport = LeanTransport(self.hosts, client_options, self.connection_pools)
+        return es
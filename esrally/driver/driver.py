@@ -1,15 +1,24 @@
+import array
+import asyncio
+import bisect
+import collections
 import concurrent.futures
 import threading
 import datetime
+import itertools
 import logging
+import math
+import pickle
 import queue
 import socket
+import sys
 import time
+import zlib
 
 import thespian.actors
 from esrally import actor, config, exceptions, metrics, track, client, paths, PROGRAM_NAME
 from esrally.driver import runner, scheduler
-from esrally.utils import convert, console, versions, net
+from esrally.utils import convert, console, versions, net, sysstats
 
 logger = logging.getLogger("rally.driver")
 profile_logger = logging.getLogger("rally.profile")
@@ -53,7 +62,15 @@ class PrepareTrack:
 
 
 class TrackPrepared:
-    pass
+    """
+    Tells the master that a load driver host has prepared the track.
+    """
+
+    def __init__(self, logical_cpu_cores=None):
+        """
+        :param logical_cpu_cores: The number of logical CPU cores of the load driver host.
+        """
+        self.logical_cpu_cores = logical_cpu_cores
 
 
 class StartLoadGenerator:
@@ -74,6 +91,24 @@ class StartLoadGenerator:
         self.tasks = tasks
 
 
+class StartAsyncLoadGenerator:
+    """
+    Starts a load generator that drives multiple clients within one process.
+    """
+
+    def __init__(self, worker_id, config, track, client_allocations):
+        """
+        :param worker_id: Id of the load generator.
+        :param config: Rally internal configuration object.
+        :param track: The track to use.
+        :param client_allocations: A dict mapping each client id that this load generator drives to the tasks of this client.
+        """
+        self.worker_id = worker_id
+        self.config = config
+        self.track = track
+        self.client_allocations = client_allocations
+
+
 class Drive:
     """
     Tells a load generator to drive (either after a join point or initially).
@@ -97,9 +132,15 @@ class UpdateSamples:
     Used to send samples from a load generator node to the master.
     """
 
-    def __init__(self, client_id, samples):
+    def __init__(self, client_id, samples, compressed=False):
+        """
+        :param client_id: The id of the sending load generator.
+        :param samples: Samples in the wire format of ``encode_samples``.
+        :param compressed: Whether ``samples`` is compressed with zlib.
+        """
         self.client_id = client_id
         self.samples = samples
+        self.compressed = compressed
 
 
 class JoinPointReached:
@@ -130,6 +171,19 @@ class TaskFinished:
         self.next_task_scheduled_in = next_task_scheduled_in
 
 
+class WorkersAllocated:
+    """
+    Tells the benchmark coordinator how many worker processes run on each load driver host.
+    """
+
+    def __init__(self, load_driver_workers):
+        """
+        :param load_driver_workers: The number of worker processes per load driver host or a list with one number per load driver host
+                                    if the hosts run a different number of worker processes.
+        """
+        self.load_driver_workers = load_driver_workers
+
+
 class DriverActor(actor.RallyActor):
     WAKEUP_INTERVAL_SECONDS = 1
     """
@@ -149,6 +203,7 @@ class DriverActor(actor.RallyActor):
             if isinstance(msg, StartBenchmark):
                 self.start_benchmark(msg, sender)
             elif isinstance(msg, TrackPrepared):
+                self.coordinator.load_driver_host_prepared(self.children.index(sender), msg.logical_cpu_cores)
                 self.transition_when_all_children_responded(sender, msg,
                                                             expected_status=None, new_status=None, transition=self.after_track_prepared)
             elif isinstance(msg, JoinPointReached):
@@ -210,9 +265,17 @@ class DriverActor(actor.RallyActor):
                                 globalName="/rally/driver/worker/%s" % str(client_id),
                                 targetActorRequirements=self._requirements(host))
 
+    def create_async_load_generator(self, worker_id, host):
+        return self.createActor(AsyncLoadGenerator,
+                                globalName="/rally/driver/async-worker/%s" % str(worker_id),
+                                targetActorRequirements=self._requirements(host))
+
     def start_load_generator(self, driver, client_id, cfg, track, allocations):
         self.send(driver, StartLoadGenerator(client_id, cfg, track, allocations))
 
+    def start_async_load_generator(self, driver, worker_id, cfg, track, client_allocations):
+        self.send(driver, StartAsyncLoadGenerator(worker_id, cfg, track, client_allocations))
+
     def drive_at(self, driver, client_start_timestamp):
         self.send(driver, Drive(client_start_timestamp))
 
@@ -252,8 +315,11 @@ class DriverActor(actor.RallyActor):
     def on_benchmark_complete(self, metrics):
         self.send(self.start_sender, BenchmarkComplete(metrics))
 
+    def on_workers_allocated(self, load_driver_workers):
+        self.send(self.start_sender, WorkersAllocated(load_driver_workers))
+
     def update_samples(self, msg):
-        self.coordinator.update_samples(msg.samples)
+        self.coordinator.update_samples(decode_samples(msg.samples, msg.compressed))
 
 
 def load_local_config(coordinator_config):
@@ -288,7 +354,7 @@ class TrackPreparationActor(actor.RallyActor):
                 # track plugins later on will fail on the load generator. We should revisit this in #292.
                 track.track_repo(cfg, fetch=True, update=True)
                 track.prepare_track(msg.track, cfg)
-                self.send(sender, TrackPrepared())
+                self.send(sender, TrackPrepared(sysstats.logical_cpu_cores()))
         except BaseException as e:
             logger.exception("TrackPreparationActor encountered a fatal exception. Shutting down.")
             self.send(self.start_sender, actor.BenchmarkFailure("Could not prepare track", e))
@@ -310,13 +376,24 @@ class Driver:
         self.challenge = None
         self.metrics_store = None
         self.load_driver_hosts = []
+        self.load_driver_mode = None
+        self.load_driver_workers = None
+        # the number of logical CPU cores of each load driver host as reported after preparing the track
+        self.load_driver_cpu_cores = []
         self.drivers = []
+        # the client ids that each driver (i.e. load generator) is responsible for
+        self.clients_per_driver = []
+        self.number_of_clients = 0
+        # whether any load generator drives several clients which share its connection pools
+        self.shared_connection_pools = False
 
         self.progress_reporter = console.progress()
         self.progress_counter = 0
         self.quiet = False
         self.allocations = None
-        self.raw_samples = []
+        # only the columns of samples that are needed to calculate throughput, per task of the current step
+        self.throughput_columns = {}
+        self.request_rates = RequestRates()
         self.most_recent_sample_per_client = {}
 
         self.number_of_steps = 0
@@ -330,6 +407,8 @@ class Driver:
         self.track = t
         self.challenge = select_challenge(self.config, self.track)
         self.quiet = self.config.opts("system", "quiet.mode", mandatory=False, default_value=False)
+        self.load_driver_mode = self.config.opts("driver", "load_driver_mode", mandatory=False, default_value="actor-per-client")
+        self.load_driver_workers = self.config.opts("driver", "load_driver_workers", mandatory=False)
         # create - but do not yet open - the metrics store as an internal timer starts when we open it.
         self.metrics_store = metrics.InMemoryMetricsStore(cfg=self.config, meta_info=metrics_meta_info, lap=lap)
         for host in self.config.opts("driver", "load_driver_hosts"):
@@ -337,10 +416,14 @@ class Driver:
                 self.load_driver_hosts.append(net.resolve(host))
             else:
                 self.load_driver_hosts.append(host)
+        self.load_driver_cpu_cores = [None] * len(self.load_driver_hosts)
 
         preps = [self.target.create_track_preparator(h) for h in self.load_driver_hosts]
         self.target.on_prepare_track(preps, self.config, self.track)
 
+    def load_driver_host_prepared(self, host_index, logical_cpu_cores):
+        self.load_driver_cpu_cores[host_index] = logical_cpu_cores
+
     def after_track_prepared(self):
         track_name = self.track.name
         challenge_name = self.challenge.name
@@ -360,24 +443,57 @@ class Driver:
         logger.info("Benchmark consists of [%d] steps executed by (at most) [%d] clients as specified by the allocation matrix:\n%s" %
                     (self.number_of_steps, len(self.allocations), self.allocations))
 
-        for client_id in range(allocator.clients):
-            # allocate clients round-robin to all defined hosts
-            host = self.load_driver_hosts[client_id % len(self.load_driver_hosts)]
-            logger.info("Allocating load generator [%d] on [%s]" % (client_id, host))
-            self.drivers.append(self.target.create_client(client_id, host))
-        for client_id, driver in enumerate(self.drivers):
-            logger.info("Starting load generator [%d]." % client_id)
-            self.target.start_load_generator(driver, client_id, self.config, self.track, self.allocations[client_id])
-
+        self.number_of_clients = allocator.clients
+        if self.load_driver_mode in ["asyncio", "process-pool"]:
+            # each load generator drives multiple clients that are allocated to the same host
+            workers_per_host = [self.workers_on(host_index) for host_index in range(len(self.load_driver_hosts))]
+            for host, workers in zip(self.load_driver_hosts, workers_per_host):
+                logger.info("Running clients in [%d] worker processes on load driver host [%s]." % (workers, host))
+            # record the resolved pool sizes as they may differ from the configured one (e.g. one worker per CPU core of each host)
+            self.target.on_workers_allocated(workers_per_host[0] if len(set(workers_per_host)) == 1 else workers_per_host)
+            worker_allocations = allocate_clients_to_workers(allocator.clients, self.load_driver_hosts, workers_per_host)
+            for worker_id, (host, client_ids) in enumerate(worker_allocations):
+                logger.info("Allocating load generator [%d] for clients %s on [%s]" % (worker_id, client_ids, host))
+                self.drivers.append(self.target.create_async_load_generator(worker_id, host))
+                self.clients_per_driver.append(client_ids)
+            for worker_id, driver in enumerate(self.drivers):
+                logger.info("Starting load generator [%d]." % worker_id)
+                client_allocations = {client_id: self.allocations[client_id] for client_id in self.clients_per_driver[worker_id]}
+                self.target.start_async_load_generator(driver, worker_id, self.config, self.track, client_allocations)
+        else:
+            for client_id in range(allocator.clients):
+                # allocate clients round-robin to all defined hosts
+                host = self.load_driver_hosts[client_id % len(self.load_driver_hosts)]
+                logger.info("Allocating load generator [%d] on [%s]" % (client_id, host))
+                self.drivers.append(self.target.create_client(client_id, host))
+                self.clients_per_driver.append([client_id])
+            for client_id, driver in enumerate(self.drivers):
+                logger.info("Starting load generator [%d]." % client_id)
+                self.target.start_load_generator(driver, client_id, self.config, self.track, self.allocations[client_id])
+
+        self.shared_connection_pools = any(len(client_ids) > 1 for client_ids in self.clients_per_driver)
         self.update_progress_message()
 
+    def workers_on(self, host_index):
+        """
+        :param host_index: The index of a load driver host.
+        :return: The number of worker processes on this load driver host if clients are driven by ``AsyncLoadGenerator``.
+        """
+        if self.load_driver_mode != "process-pool":
+            return 1
+        elif self.load_driver_workers:
+            return self.load_driver_workers
+        else:
+            # the pool size depends on the hardware of the load driver host, not on the one of the coordinator
+            return self.load_driver_cpu_cores[host_index] or 1
+
     def joinpoint_reached(self, client_id, client_local_timestamp, task):
         self.currently_completed += 1
         self.clients_completed_current_step[client_id] = (client_local_timestamp, time.perf_counter())
-        logger.info("[%d/%d] drivers reached join point [%d/%d]." %
-                    (self.currently_completed, len(self.drivers), self.current_step + 1, self.number_of_steps))
-        if self.currently_completed == len(self.drivers):
-            logger.info("All drivers completed their operations until join point [%d/%d]." %
+        logger.info("[%d/%d] clients reached join point [%d/%d]." %
+                    (self.currently_completed, self.number_of_clients, self.current_step + 1, self.number_of_steps))
+        if self.currently_completed == self.number_of_clients:
+            logger.info("All clients completed their operations until join point [%d/%d]." %
                         (self.current_step + 1, self.number_of_steps))
             # we can go on to the next step
             self.currently_completed = 0
@@ -390,12 +506,12 @@ class Driver:
             self.most_recent_sample_per_client = {}
             self.current_step += 1
 
-            # TODO #217: We should still postprocess samples only at the end of a task but maybe we can send latency and service_time
-            # samples in microbatches.
-            logger.info("Postprocessing samples...")
-            self.post_process_samples()
+            # latency and service time have already been stored when samples have arrived, only throughput needs all samples of a task.
+            self.post_process_throughput()
+            # the tasks of this step are finished so we don't need their throughput columns anymore
+            self.throughput_columns = {}
+            self.request_rates = RequestRates()
             m = self.metrics_store.to_externalizable(clear=True)
-            self.raw_samples = []
 
             if self.finished():
                 logger.info("All steps completed.")
@@ -419,11 +535,13 @@ class Driver:
                 # Using a perf_counter here is fine also in the distributed case as we subtract it from `master_received_msg_at` making it
                 # a relative instead of an absolute value.
                 start_next_task = time.perf_counter() + waiting_period
-                for client_id, driver in enumerate(self.drivers):
+                for driver_id, driver in enumerate(self.drivers):
+                    # all clients of a load generator share the same clock so it is sufficient to consider one of them
+                    client_id = self.clients_per_driver[driver_id][0]
                     client_ended_task_at, master_received_msg_at = clients_curr_step[client_id]
                     client_start_timestamp = client_ended_task_at + (start_next_task - master_received_msg_at)
-                    logger.info("Scheduling next task for client id [%d] at their timestamp [%f] (master timestamp [%f])" %
-                                (client_id, client_start_timestamp, start_next_task))
+                    logger.info("Scheduling next task for load generator [%d] at their timestamp [%f] (master timestamp [%f])" %
+                                (driver_id, client_start_timestamp, start_next_task))
                     self.target.drive_at(driver, client_start_timestamp)
         else:
             current_join_point = task
@@ -443,7 +561,7 @@ class Driver:
                     # memorize whether we have already sent it for the current step.
                     self.complete_current_task_sent = True
                     logger.info("All affected clients have finished. Notifying all clients to complete their current tasks.")
-                    for client_id, driver in enumerate(self.drivers):
+                    for driver in self.drivers:
                         self.target.complete_current_task(driver)
 
     def reset_relative_time(self):
@@ -467,11 +585,19 @@ class Driver:
             setup_index(es, index, self.challenge.index_settings)
         wait_for_status(es, expected_cluster_health)
 
-    def update_samples(self, samples):
-        self.raw_samples += samples
-        if len(samples) > 0:
-            most_recent = samples[-1]
-            self.most_recent_sample_per_client[most_recent.client_id] = most_recent
+    def update_samples(self, buffers):
+        """
+        :param buffers: A list of ``SampleBuffer``. A load generator may send samples of multiple clients.
+        """
+        buffers = [buffer for buffer in buffers if len(buffer) > 0]
+        for buffer in buffers:
+            # throughput can only be calculated when a task is finished so we keep the few columns that we need for it but not the buffer
+            if buffer.task not in self.throughput_columns:
+                self.throughput_columns[buffer.task] = ThroughputColumns()
+            self.throughput_columns[buffer.task].append(buffer)
+            self.request_rates.add(buffer)
+            self.most_recent_sample_per_client[buffer.client_id] = buffer.sample(len(buffer) - 1)
+        self.post_process_samples(buffers)
 
     def update_progress_message(self, task_finished=False):
         if not self.quiet and self.current_step >= 0:
@@ -492,28 +618,57 @@ class Driver:
             if task_finished:
                 self.progress_reporter.finish()
 
-    def post_process_samples(self):
-        logger.info("Storing latency and service time... ")
-        for sample in self.raw_samples:
-            meta_data = self.merge(
-                self.track.meta_data,
-                self.challenge.meta_data,
-                sample.operation.meta_data,
-                sample.task.meta_data,
-                sample.request_meta_data)
-
-            self.metrics_store.put_value_cluster_level(name="latency", value=sample.latency_ms, unit="ms", operation=sample.operation.name,
-                                                       operation_type=sample.operation.type, sample_type=sample.sample_type,
-                                                       absolute_time=sample.absolute_time, relative_time=sample.relative_time,
-                                                       meta_data=meta_data)
-
-            self.metrics_store.put_value_cluster_level(name="service_time", value=sample.service_time_ms, unit="ms",
-                                                       operation=sample.operation.name, operation_type=sample.operation.type,
-                                                       sample_type=sample.sample_type, absolute_time=sample.absolute_time,
-                                                       relative_time=sample.relative_time, meta_data=meta_data)
+    def post_process_samples(self, buffers):
+        """
+        Stores latency, service time, schedule lag and parameter wait time of the provided samples. This happens as soon as samples arrive
+        so we neither need to keep these metrics around until the end of a task nor do we need to process all of them at once then.
 
+        :param buffers: A list of ``SampleBuffer``.
+        """
+        for buffer in buffers:
+            size = len(buffer)
+            op = buffer.task.operation
+            task_meta_data = self.merge(self.track.meta_data, self.challenge.meta_data, op.meta_data, buffer.task.meta_data)
+            # all samples with the same request meta-data share the same merged meta-data
+            meta_data = [self.merge(task_meta_data, request_meta_data) for request_meta_data in buffer.meta_data]
+            meta_data_per_sample = list(map(meta_data.__getitem__, buffer.request_meta_data[:size]))
+            sample_types = buffer.sample_type[:size]
+            absolute_times = buffer.absolute_time[:size]
+            relative_times = buffer.relative_time[:size]
+
+            self.metrics_store.put_values_cluster_level(name="latency", values=buffer.latency_ms[:size], unit="ms", operation=op.name,
+                                                        operation_type=op.type, sample_types=sample_types, absolute_times=absolute_times,
+                                                        relative_times=relative_times, meta_data=meta_data_per_sample)
+
+            self.metrics_store.put_values_cluster_level(name="service_time", values=buffer.service_time_ms[:size], unit="ms",
+                                                        operation=op.name, operation_type=op.type, sample_types=sample_types,
+                                                        absolute_times=absolute_times, relative_times=relative_times,
+                                                        meta_data=meta_data_per_sample)
+
+            # requests of unthrottled tasks are not scheduled so there is no schedule lag
+            if target_throughput(buffer.task) is not None:
+                self.metrics_store.put_values_cluster_level(name="schedule_lag", values=buffer.schedule_lag_ms[:size], unit="ms",
+                                                            operation=op.name, operation_type=op.type, sample_types=sample_types,
+                                                            absolute_times=absolute_times, relative_times=relative_times,
+                                                            meta_data=meta_data_per_sample)
+
+            # only prefetching parameter sources can tell whether waiting for parameters limits throughput
+            if op.params and op.params.get("prefetch-depth"):
+                self.metrics_store.put_values_cluster_level(name="param_wait_time", values=buffer.param_wait_ms[:size], unit="ms",
+                                                            operation=op.name, operation_type=op.type, sample_types=sample_types,
+                                                            absolute_times=absolute_times, relative_times=relative_times,
+                                                            meta_data=meta_data_per_sample)
+
+            # clients can only wait for a connection if several of them share the connection pools of a load generator
+            if self.shared_connection_pools:
+                self.metrics_store.put_values_cluster_level(name="pool_wait_time", values=buffer.pool_wait_ms[:size], unit="ms",
+                                                            operation=op.name, operation_type=op.type, sample_types=sample_types,
+                                                            absolute_times=absolute_times, relative_times=relative_times,
+                                                            meta_data=meta_data_per_sample)
+
+    def post_process_throughput(self):
         logger.info("Calculating throughput... ")
-        aggregates = calculate_global_throughput(self.raw_samples)
+        aggregates = {task: columns.throughput(bucket_interval_secs=1) for task, columns in self.throughput_columns.items()}
         logger.info("Storing throughput... ")
         for task, samples in aggregates.items():
             meta_data = self.merge(
@@ -528,6 +683,15 @@ class Driver:
                                                            operation=op.name, operation_type=op.type, sample_type=sample_type,
                                                            absolute_time=absolute_time, relative_time=relative_time, meta_data=meta_data)
 
+        for task, (target, achieved) in self.request_rates.rates().items():
+            logger.info("Target throughput of [%s] is [%.2f] ops/s, achieved throughput is [%.2f] ops/s." % (task, target, achieved))
+            meta_data = self.merge(self.track.meta_data, self.challenge.meta_data, task.operation.meta_data, task.meta_data)
+            op = task.operation
+            self.metrics_store.put_value_cluster_level(name="target_throughput", value=target, unit="ops/s", operation=op.name,
+                                                       operation_type=op.type, meta_data=meta_data)
+            self.metrics_store.put_value_cluster_level(name="achieved_throughput", value=achieved, unit="ops/s", operation=op.name,
+                                                       operation_type=op.type, meta_data=meta_data)
+
     def merge(self, *args):
         result = {}
         for arg in args:
@@ -564,6 +728,7 @@ class LoadGenerator(actor.RallyActor):
         self.complete = threading.Event()
         self.executor_future = None
         self.sampler = None
+        self.compress_samples = False
         self.start_driving = False
         self.wakeup_interval = LoadGenerator.WAKEUP_INTERVAL_SECONDS
 
@@ -575,10 +740,13 @@ class LoadGenerator(actor.RallyActor):
                 self.master = sender
                 self.client_id = msg.client_id
                 self.config = load_local_config(msg.config)
-                self.es = client.EsClientFactory(self.config.opts("client", "hosts"), self.config.opts("client", "options")).create()
+                connection_pools = client.ConnectionPools(clients=connections_per_client(msg.tasks))
+                self.es = client.EsClientFactory(self.config.opts("client", "hosts"), self.config.opts("client", "options"),
+                                                 connection_pools).create()
                 self.track = msg.track
                 track.set_absolute_data_path(self.config, self.track)
                 self.tasks = msg.tasks
+                self.compress_samples = self.config.opts("driver", "samples.compression", mandatory=False, default_value=False)
                 self.current_task_index = 0
                 self.cancel.clear()
                 self.current_task = None
@@ -586,6 +754,8 @@ class LoadGenerator(actor.RallyActor):
                 if self.config.opts("track", "test.mode.enabled"):
                     self.wakeup_interval = 0.5
                 track.load_track_plugins(self.config, runner.register_runner, scheduler.register_scheduler)
+                # connect before the first task starts so requests do not need to wait for (TCP and TLS) handshakes
+                connection_pools.warm()
                 self.drive()
             elif isinstance(msg, Drive):
                 sleep_time = datetime.timedelta(seconds=msg.client_start_timestamp - time.perf_counter())
@@ -626,7 +796,7 @@ class LoadGenerator(actor.RallyActor):
                             self.drive()
                     else:
                         if current_samples and len(current_samples) > 0:
-                            most_recent_sample = current_samples[-1]
+                            most_recent_sample = current_samples.sample(len(current_samples) - 1)
                             if most_recent_sample.percent_completed is not None:
                                 logger.info("LoadGenerator[%s] is executing [%s] (%.2f%% complete)." %
                                             (str(self.client_id), most_recent_sample.task, most_recent_sample.percent_completed * 100.0))
@@ -675,9 +845,9 @@ class LoadGenerator(actor.RallyActor):
             else:
                 logger.info("LoadGenerator[%d] is executing [%s]." % (self.client_id, task))
                 self.sampler = Sampler(self.client_id, task, start_timestamp=time.perf_counter())
-                schedule = schedule_for(self.track, task, self.client_id)
+                schedule = schedule_for(self.track, task, self.client_id, self.config)
 
-                executor = Executor(task, schedule, self.es, self.sampler, self.cancel, self.complete)
+                executor = Executor(task, schedule, self.es, self.sampler, self.cancel, self.complete, wait_strategy_for(task))
                 final_executor = Profiler(executor, self.client_id, task.operation) if profiling_enabled else executor
 
                 self.executor_future = self.pool.submit(final_executor)
@@ -695,13 +865,243 @@ class LoadGenerator(actor.RallyActor):
 
     def send_samples(self):
         if self.sampler:
-            samples = self.sampler.samples
+            samples = self.sampler.drain()
             if len(samples) > 0:
-                self.send(self.master, UpdateSamples(self.client_id, samples))
+                self.send(self.master, UpdateSamples(self.client_id, encode_samples([samples], self.compress_samples),
+                                                     self.compress_samples))
             return samples
         return None
 
 
+class AsyncClient:
+    """
+    Holds the state of one logical client that is driven by an ``AsyncLoadGenerator``.
+    """
+
+    def __init__(self, client_id, tasks, es):
+        self.client_id = client_id
+        self.tasks = tasks
+        self.es = es
+        self.current_task_index = 0
+        self.current_task = None
+        # used to indicate that we want to prematurely consider the current task completed (see ``LoadGenerator``).
+        self.complete = threading.Event()
+        # one sampler per executed task. Only the most recent one may still receive samples.
+        self.samplers = []
+
+    def at_joinpoint(self):
+        return isinstance(self.current_task, JoinPoint)
+
+    def next_task(self):
+        task = None
+        # skip non-tasks in the task list
+        while task is None:
+            task = self.tasks[self.current_task_index]
+            self.current_task_index += 1
+        self.current_task = task
+        return task
+
+    def drain(self):
+        """
+        :return: A list of non-empty ``SampleBuffer`` instances with all samples that have been gathered since the last call.
+        """
+        samplers = self.samplers[:]
+        buffers = [buffer for buffer in (sampler.drain() for sampler in samplers) if len(buffer) > 0]
+        # all but the most recent sampler belong to tasks that are finished and have been drained completely
+        del self.samplers[:len(samplers) - 1]
+        return buffers
+
+
+class AsyncLoadGenerator(actor.RallyActor):
+    """
+    A load generator that drives multiple clients within a single process. Each client is modelled as a coroutine on an asyncio event
+    loop that runs in a dedicated thread. The event loop takes care of scheduling, throttling and sample collection whereas blocking
+    requests are dispatched to a thread pool that is sized according to the number of clients.
+    """
+
+    WAKEUP_INTERVAL_SECONDS = 5
+
+    def __init__(self):
+        super().__init__()
+        actor.RallyActor.configure_logging(logger)
+        self.master = None
+        self.worker_id = None
+        self.config = None
+        self.track = None
+        self.clients = []
+        # runs the event loop
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        # runs the (blocking) requests of all clients
+        self.request_pool = None
+        self.cancel = threading.Event()
+        self.step_future = None
+        # clients that have reached a join point but the master has not been notified yet
+        self.join_points_reached = queue.Queue()
+        self.compress_samples = False
+        self.start_driving = False
+        self.wakeup_interval = AsyncLoadGenerator.WAKEUP_INTERVAL_SECONDS
+
+    def receiveMessage(self, msg, sender):
+        try:
+            logger.debug("AsyncLoadGenerator[%s]#receiveMessage(msg = [%s], sender = [%s])" %
+                         (str(self.worker_id), str(type(msg)), str(sender)))
+            if isinstance(msg, StartAsyncLoadGenerator):
+                logger.info("AsyncLoadGenerator[%d] is about to start for clients %s." %
+                            (msg.worker_id, list(msg.client_allocations.keys())))
+                self.master = sender
+                self.worker_id = msg.worker_id
+                self.config = load_local_config(msg.config)
+                self.track = msg.track
+                track.set_absolute_data_path(self.config, self.track)
+                connections = [connections_per_client(tasks) for tasks in msg.client_allocations.values()]
+                connection_pools = client.ConnectionPools(clients=sum(connections))
+                es_client_factory = client.EsClientFactory(self.config.opts("client", "hosts"), self.config.opts("client", "options"),
+                                                           connection_pools)
+                self.clients = [AsyncClient(client_id, tasks, es_client_factory.create())
+                                for client_id, tasks in sorted(msg.client_allocations.items())]
+                # clients with several requests in flight also need to read parameters of their next request meanwhile
+                self.request_pool = concurrent.futures.ThreadPoolExecutor(max_workers=sum(c if c == 1 else c + 1 for c in connections))
+                self.compress_samples = self.config.opts("driver", "samples.compression", mandatory=False, default_value=False)
+                self.cancel.clear()
+                # we need to wake up more often in test mode
+                if self.config.opts("track", "test.mode.enabled"):
+                    self.wakeup_interval = 0.5
+                track.load_track_plugins(self.config, runner.register_runner, scheduler.register_scheduler)
+                # connect before the first task starts so requests do not need to wait for (TCP and TLS) handshakes
+                connection_pools.warm()
+                self.drive()
+            elif isinstance(msg, Drive):
+                sleep_time = datetime.timedelta(seconds=msg.client_start_timestamp - time.perf_counter())
+                logger.info("AsyncLoadGenerator[%d] is continuing its work on [%f], that is in [%s]." %
+                            (self.worker_id, msg.client_start_timestamp, sleep_time))
+                self.start_driving = True
+                self.wakeupAfter(sleep_time)
+            elif isinstance(msg, CompleteCurrentTask):
+                for c in self.clients:
+                    if c.at_joinpoint():
+                        logger.info("AsyncLoadGenerator[%d] has received CompleteCurrentTask but client [%d] is currently at [%s]. "
+                                    "Ignoring." % (self.worker_id, c.client_id, c.current_task))
+                    else:
+                        logger.info("AsyncLoadGenerator[%d] has received CompleteCurrentTask. Completing current task [%s] of client [%d]."
+                                    % (self.worker_id, c.current_task, c.client_id))
+                        c.complete.set()
+            elif isinstance(msg, thespian.actors.WakeupMessage):
+                if self.start_driving:
+                    logger.info("AsyncLoadGenerator[%d] starts driving now." % self.worker_id)
+                    self.start_driving = False
+                    self.drive()
+                else:
+                    # determine the status first so we never miss samples or join points that have been produced afterwards
+                    step_done = self.step_future is not None and self.step_future.done()
+                    join_points = self.drain_join_points_reached()
+                    # samples must arrive at the master before the corresponding join point
+                    self.send_samples()
+                    for client_id, task in join_points:
+                        logger.info("Client [%d] of AsyncLoadGenerator[%d] reached join point [%s]." % (client_id, self.worker_id, task))
+                        self.send(self.master, JoinPointReached(client_id, task))
+                    if self.cancel.is_set():
+                        logger.info("AsyncLoadGenerator[%d] has detected that benchmark has been cancelled. Notifying master..." %
+                                    self.worker_id)
+                        self.send(self.master, actor.BenchmarkCancelled())
+                    elif step_done:
+                        e = self.step_future.exception(timeout=0)
+                        if e:
+                            logger.info("AsyncLoadGenerator[%d] has detected a benchmark failure. Notifying master..." % self.worker_id)
+                            self.send(self.master, actor.BenchmarkFailure("Error in load generator [%d]" % self.worker_id, e))
+                        else:
+                            logger.info("All clients of AsyncLoadGenerator[%d] have reached a join point." % self.worker_id)
+                            self.step_future = None
+                    else:
+                        self.wakeupAfter(datetime.timedelta(seconds=self.wakeup_interval))
+            elif isinstance(msg, thespian.actors.ActorExitRequest):
+                logger.info("AsyncLoadGenerator[%s] is exiting due to ActorExitRequest." % str(self.worker_id))
+                if self.step_future is not None and self.step_future.running():
+                    self.cancel.set()
+                    self.pool.shutdown()
+                if self.request_pool:
+                    self.request_pool.shutdown()
+            else:
+                logger.info("AsyncLoadGenerator[%s] received unknown message [%s] (ignoring)." % (str(self.worker_id), str(msg)))
+        except Exception as e:
+            logger.exception("Fatal error in AsyncLoadGenerator[%s]" % str(self.worker_id))
+            self.send(self.master, actor.BenchmarkFailure("Fatal error in load generator [%s]" % str(self.worker_id), e))
+
+    def drive(self):
+        profiling_enabled = self.config.opts("driver", "profiling")
+        for c in self.clients:
+            c.complete.clear()
+        step = AsyncStep(self.track, self.clients, self.request_pool, self.cancel, self.join_points_reached, self.config)
+        final_step = Profiler(step, self.worker_id, "all operations until next join point") if profiling_enabled else step
+        self.step_future = self.pool.submit(final_step)
+        self.wakeupAfter(datetime.timedelta(seconds=self.wakeup_interval))
+
+    def drain_join_points_reached(self):
+        join_points = []
+        try:
+            while True:
+                join_points.append(self.join_points_reached.get_nowait())
+        except queue.Empty:
+            pass
+        return join_points
+
+    def send_samples(self):
+        buffers = []
+        for c in self.clients:
+            buffers += c.drain()
+        if len(buffers) > 0:
+            self.send(self.master, UpdateSamples(self.worker_id, encode_samples(buffers, self.compress_samples), self.compress_samples))
+        return buffers
+
+
+class AsyncStep:
+    def __init__(self, current_track, clients, request_pool, cancel, join_points_reached, cfg=None):
+        """
+        Runs all clients of an ``AsyncLoadGenerator`` concurrently until each of them has reached its next join point.
+
+        :param current_track: The current track.
+        :param clients: A list of ``AsyncClient`` instances.
+        :param request_pool: An executor that runs blocking requests.
+        :param cancel: A shared boolean that indicates we need to cancel execution.
+        :param join_points_reached: A queue that receives a tuple (client id, join point) whenever a client has reached a join point.
+        :param cfg: The config object of the load generator.
+        """
+        self.track = current_track
+        self.clients = clients
+        self.request_pool = request_pool
+        self.cancel = cancel
+        self.join_points_reached = join_points_reached
+        self.config = cfg
+
+    def __call__(self, *args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(asyncio.gather(*[self.run_client(loop, c) for c in self.clients], loop=loop))
+        finally:
+            loop.close()
+
+    @asyncio.coroutine
+    def run_client(self, loop, c):
+        while True:
+            task = c.next_task()
+            if isinstance(task, JoinPoint):
+                self.join_points_reached.put((c.client_id, task))
+                return
+            elif isinstance(task, track.Task):
+                if c.complete.is_set():
+                    logger.info("Client [%d] is skipping [%s] because it has been asked to complete all tasks until next join point." %
+                                (c.client_id, task))
+                else:
+                    logger.info("Client [%d] is executing [%s]." % (c.client_id, task))
+                    sampler = Sampler(c.client_id, task, start_timestamp=time.perf_counter())
+                    c.samplers.append(sampler)
+                    schedule = yield from loop.run_in_executor(self.request_pool, schedule_for, self.track, task, c.client_id,
+                                                               self.config)
+                    executor = AsyncExecutor(task, schedule, c.es, sampler, self.cancel, c.complete, loop, self.request_pool)
+                    yield from executor()
+            else:
+                raise exceptions.RallyAssertionError("Unknown task type [%s]" % type(task))
+
+
 class Sampler:
     """
     Encapsulates management of gathered samples.
@@ -711,30 +1111,215 @@ class Sampler:
         self.client_id = client_id
         self.task = task
         self.start_timestamp = start_timestamp
-        self.q = queue.Queue(maxsize=16384)
+        # guards against draining the buffer while a sample is added
+        self.lock = threading.Lock()
+        self.buffer = SampleBuffer(client_id, task)
 
-    def add(self, sample_type, request_meta_data, latency_ms, service_time_ms, total_ops, total_ops_unit, time_period, percent_completed):
-        try:
-            self.q.put_nowait(Sample(self.client_id, time.time(), time.perf_counter() - self.start_timestamp, self.task,
-                                     sample_type, request_meta_data, latency_ms, service_time_ms, total_ops, total_ops_unit, time_period,
-                                     percent_completed))
-        except queue.Full:
-            logger.warning("Dropping sample for [%s] due to a full sampling queue." % self.task.operation.name)
+    def add(self, sample_type, request_meta_data, latency_ms, service_time_ms, total_ops, total_ops_unit, time_period, percent_completed,
+            schedule_lag_ms=0, param_wait_ms=0, pool_wait_ms=0, completed_at=None):
+        """
+        Adds a sample for a request.
+
+        :param completed_at: The point in time when the request has completed (``time.perf_counter()``) if the sample is added later.
+                             Optional. Defaults to now.
+        """
+        now = time.perf_counter()
+        completed_at = now if completed_at is None else completed_at
+        absolute_time = time.time() - (now - completed_at)
+        relative_time = completed_at - self.start_timestamp
+        with self.lock:
+            self.buffer.add(absolute_time, relative_time, sample_type, request_meta_data, latency_ms, service_time_ms, total_ops,
+                            total_ops_unit, time_period, percent_completed, schedule_lag_ms, param_wait_ms, pool_wait_ms)
+
+    def drain(self):
+        """
+        :return: A ``SampleBuffer`` with all samples that have been gathered since the last call. The sampler continues with an empty one.
+        """
+        with self.lock:
+            buffer, self.buffer = self.buffer, SampleBuffer(self.client_id, self.task)
+        return buffer
 
     @property
     def samples(self):
-        samples = []
+        return self.drain().to_samples()
+
+
+class SampleBuffer:
+    """
+    Stores samples in parallel arrays instead of one object per sample. Request meta-data and units are interned, i.e. each distinct value
+    is only stored once and referenced by its index. The buffer grows in chunks and never drops samples.
+    """
+    CHUNK_SIZE = 1024
+
+    def __init__(self, client_id, task, chunk_size=CHUNK_SIZE):
+        """
+        :param client_id: The client id that gathers these samples.
+        :param task: The task for which these samples are gathered.
+        :param chunk_size: The number of samples by which the buffer grows.
+        """
+        self.client_id = client_id
+        self.task = task
+        self.chunk_size = chunk_size
+        self.size = 0
+        self.capacity = 0
+        self.absolute_time = array.array("d")
+        self.relative_time = array.array("d")
+        self.latency_ms = array.array("d")
+        self.service_time_ms = array.array("d")
+        # time between the scheduled and the actual start of a request
+        self.schedule_lag_ms = array.array("d")
+        # time that the client has waited for the parameters of a request
+        self.param_wait_ms = array.array("d")
+        # time that the request has waited for a free connection
+        self.pool_wait_ms = array.array("d")
+        self.total_ops = array.array("d")
+        self.time_period = array.array("d")
+        # NaN if completion is undefined (i.e. for eternal tasks)
+        self.percent_completed = array.array("d")
+        self.sample_type = array.array("b")
+        self.total_ops_unit = array.array("i")
+        self.request_meta_data = array.array("i")
+        self.units = []
+        self.meta_data = []
+        self._unit_ids = {}
+        self._meta_data_ids = {}
+
+    def _columns(self):
+        return [self.absolute_time, self.relative_time, self.latency_ms, self.service_time_ms, self.schedule_lag_ms, self.param_wait_ms,
+                self.pool_wait_ms, self.total_ops, self.time_period, self.percent_completed, self.sample_type, self.total_ops_unit,
+                self.request_meta_data]
+
+    def _grow(self):
+        for column in self._columns():
+            column.extend(array.array(column.typecode, [0]) * self.chunk_size)
+        self.capacity += self.chunk_size
+
+    def add(self, absolute_time, relative_time, sample_type, request_meta_data, latency_ms, service_time_ms, total_ops, total_ops_unit,
+            time_period, percent_completed, schedule_lag_ms=0, param_wait_ms=0, pool_wait_ms=0):
+        if self.size == self.capacity:
+            self._grow()
+        i = self.size
+        self.absolute_time[i] = absolute_time
+        self.relative_time[i] = relative_time
+        self.latency_ms[i] = latency_ms
+        self.service_time_ms[i] = service_time_ms
+        self.schedule_lag_ms[i] = schedule_lag_ms
+        self.param_wait_ms[i] = param_wait_ms
+        self.pool_wait_ms[i] = pool_wait_ms
+        self.total_ops[i] = total_ops
+        self.time_period[i] = time_period
+        self.percent_completed[i] = percent_completed if percent_completed is not None else float("nan")
+        self.sample_type[i] = sample_type
+        self.total_ops_unit[i] = self._intern(total_ops_unit, total_ops_unit, self.units, self._unit_ids)
+        self.request_meta_data[i] = self._intern_meta_data(request_meta_data)
+        self.size += 1
+
+    def _intern_meta_data(self, meta_data):
         try:
-            while True:
-                samples.append(self.q.get_nowait())
-        except queue.Empty:
-            pass
-        return samples
+            key = tuple(sorted(meta_data.items())) if meta_data is not None else None
+            return self._intern(meta_data, key, self.meta_data, self._meta_data_ids)
+        except TypeError:
+            # not hashable (e.g. nested structures), so we cannot intern it
+            self.meta_data.append(meta_data)
+            return len(self.meta_data) - 1
+
+    @staticmethod
+    def _intern(value, key, values, ids):
+        try:
+            return ids[key]
+        except KeyError:
+            values.append(value)
+            ids[key] = len(values) - 1
+            return ids[key]
+
+    def __len__(self):
+        return self.size
+
+    def sample(self, i):
+        """
+        :param i: The index of a sample in this buffer.
+        :return: The sample at index ``i`` as ``Sample`` object.
+        """
+        percent_completed = self.percent_completed[i]
+        return Sample(self.client_id, self.absolute_time[i], self.relative_time[i], self.task, metrics.SampleType(self.sample_type[i]),
+                      self.meta_data[self.request_meta_data[i]], self.latency_ms[i], self.service_time_ms[i],
+                      self._number(self.total_ops[i]), self.units[self.total_ops_unit[i]], self.time_period[i],
+                      None if math.isnan(percent_completed) else percent_completed, self.schedule_lag_ms[i], self.param_wait_ms[i],
+                      self.pool_wait_ms[i])
+
+    def to_samples(self):
+        """
+        :return: A list of ``Sample`` objects.
+        """
+        return [self.sample(i) for i in range(self.size)]
+
+    def raw_columns(self):
+        """
+        :return: The raw machine representation of all columns, truncated to the number of samples in this buffer.
+        """
+        return [column[:self.size].tobytes() for column in self._columns()]
+
+    @classmethod
+    def from_raw_columns(cls, client_id, task, size, units, meta_data, raw_columns, byteorder=sys.byteorder):
+        """
+        Restores a buffer from the result of ``raw_columns``.
+
+        :param byteorder: The byte order of the machine that has produced ``raw_columns``.
+        """
+        buffer = cls(client_id, task)
+        for column, raw_column in zip(buffer._columns(), raw_columns):
+            column.frombytes(raw_column)
+            if byteorder != sys.byteorder:
+                column.byteswap()
+        buffer.size = size
+        buffer.capacity = size
+        buffer.units = units
+        buffer.meta_data = meta_data
+        return buffer
+
+    @staticmethod
+    def _number(v):
+        return int(v) if v.is_integer() else v
+
+
+def encode_samples(buffers, compress=False):
+    """
+    Encodes sample buffers in a columnar wire format: Numeric columns are sent as raw arrays and each distinct task (including its
+    operation and meta-data) is only sent once per batch instead of once per sample.
+
+    :param buffers: A list of ``SampleBuffer``.
+    :param compress: Whether to compress the result with zlib.
+    :return: The encoded samples as ``bytes``.
+    """
+    tasks = []
+    task_ids = {}
+    segments = []
+    for buffer in buffers:
+        # equal tasks may still differ in their parameters, so we need to distinguish them by identity
+        task_id = SampleBuffer._intern(buffer.task, id(buffer.task), tasks, task_ids)
+        segments.append((buffer.client_id, task_id, len(buffer), buffer.units, buffer.meta_data, buffer.raw_columns()))
+    data = pickle.dumps((sys.byteorder, tasks, segments), protocol=pickle.HIGHEST_PROTOCOL)
+    return zlib.compress(data) if compress else data
+
+
+def decode_samples(data, compressed=False):
+    """
+    Decodes samples that have been encoded with ``encode_samples``.
+
+    :param data: The encoded samples.
+    :param compressed: Whether ``data`` is compressed with zlib.
+    :return: A list of ``SampleBuffer``.
+    """
+    if compressed:
+        data = zlib.decompress(data)
+    byteorder, tasks, segments = pickle.loads(data)
+    return [SampleBuffer.from_raw_columns(client_id, tasks[task_id], size, units, meta_data, raw_columns, byteorder)
+            for client_id, task_id, size, units, meta_data, raw_columns in segments]
 
 
 class Sample:
     def __init__(self, client_id, absolute_time, relative_time, task, sample_type, request_meta_data, latency_ms, service_time_ms,
-                 total_ops, total_ops_unit, time_period, percent_completed):
+                 total_ops, total_ops_unit, time_period, percent_completed, schedule_lag_ms=0, param_wait_ms=0, pool_wait_ms=0):
         self.client_id = client_id
         self.absolute_time = absolute_time
         self.relative_time = relative_time
@@ -743,6 +1328,9 @@ class Sample:
         self.request_meta_data = request_meta_data
         self.latency_ms = latency_ms
         self.service_time_ms = service_time_ms
+        self.schedule_lag_ms = schedule_lag_ms
+        self.param_wait_ms = param_wait_ms
+        self.pool_wait_ms = pool_wait_ms
         self.total_ops = total_ops
         self.total_ops_unit = total_ops_unit
         self.time_period = time_period
@@ -895,59 +1483,210 @@ def calculate_global_throughput(samples, bucket_interval_secs=1):
     :param bucket_interval_secs: The bucket interval for aggregations.
     :return: A global view of throughput samples.
     """
-    samples_per_task = {}
-    # first we group all warmup / measurement samples by operation.
+    buffers_per_task = {}
     for sample in samples:
         k = sample.task
-        if k not in samples_per_task:
-            samples_per_task[k] = []
-        samples_per_task[k].append(sample)
+        if k not in buffers_per_task:
+            buffers_per_task[k] = SampleBuffer(sample.client_id, k)
+        buffers_per_task[k].add(sample.absolute_time, sample.relative_time, sample.sample_type, sample.request_meta_data,
+                                sample.latency_ms, sample.service_time_ms, sample.total_ops, sample.total_ops_unit, sample.time_period,
+                                sample.percent_completed, sample.schedule_lag_ms, sample.param_wait_ms, sample.pool_wait_ms)
+    return calculate_global_throughput_of_buffers(buffers_per_task.values(), bucket_interval_secs)
+
+
+def calculate_global_throughput_of_buffers(buffers, bucket_interval_secs=1):
+    """
+    Calculates global throughput based on sample buffers gathered from multiple load generators. In contrast to
+    ``calculate_global_throughput`` it operates on whole columns and only inspects individual samples for which it emits a throughput
+    value.
+
+    :param buffers: A list containing the ``SampleBuffer`` instances of all load generators.
+    :param bucket_interval_secs: The bucket interval for aggregations.
+    :return: A global view of throughput samples.
+    """
+    columns_per_task = {}
+    # first we group all warmup / measurement samples by task.
+    for buffer in buffers:
+        if len(buffer) == 0:
+            continue
+        k = buffer.task
+        if k not in columns_per_task:
+            columns_per_task[k] = ThroughputColumns()
+        columns_per_task[k].append(buffer)
 
     global_throughput = {}
-    # with open("raw_samples.csv", "w") as sample_log:
-    #    print("client_id,absolute_time,relative_time,operation,sample_type,total_ops,time_period", file=sample_log)
-    for k, v in samples_per_task.items():
-        task = k
-        if task not in global_throughput:
-            global_throughput[task] = []
+    for task, columns in columns_per_task.items():
+        global_throughput[task] = columns.throughput(bucket_interval_secs)
+    return global_throughput
+
+
+def target_throughput(task):
+    """
+    :param task: A task.
+    :return: The number of requests per second that all clients of this task should issue in total or ``None`` if it is not throttled.
+    """
+    if task.params.get("target-throughput"):
+        return task.params["target-throughput"]
+    elif task.params.get("target-interval"):
+        return 1 / task.params["target-interval"]
+    else:
+        return None
+
+
+def max_in_flight(task):
+    """
+    :param task: A task.
+    :return: The maximum number of requests that each client of this task may have outstanding at the same time.
+    """
+    return task.params.get("max-in-flight", 1)
+
+
+def connections_per_client(tasks):
+    """
+    :param tasks: All tasks (and join points) that one client executes.
+    :return: The number of connections that the client needs at most.
+    """
+    return max([max_in_flight(t) for t in tasks if isinstance(t, track.Task)], default=1)
+
+
+def calculate_request_rates(buffers):
+    """
+    Calculates how many requests per second all clients have issued in total during measurement for each task with a target throughput.
+
+    :param buffers: A list containing the ``SampleBuffer`` instances of all load generators.
+    :return: A dict with a tuple (target throughput, achieved throughput) per task.
+    """
+    request_rates = RequestRates()
+    for buffer in buffers:
+        request_rates.add(buffer)
+    return request_rates.rates()
+
+
+class RequestRates:
+    """
+    Counts the requests of each client during measurement as sample buffers arrive so the buffers themselves need not be kept.
+    """
+
+    def __init__(self):
+        # (number of requests, first timestamp, last timestamp) per task and client
+        self.requests_per_client = {}
+
+    def add(self, buffer):
+        size = len(buffer)
+        sample_types = buffer.sample_type[:size]
+        if size == 0 or target_throughput(buffer.task) is None or metrics.SampleType.Normal not in sample_types:
+            return
+        # warmup samples always precede measurement samples
+        first = sample_types.index(metrics.SampleType.Normal)
+        key = (buffer.task, buffer.client_id)
+        count, start, end = self.requests_per_client.get(key, (0, float("inf"), float("-inf")))
+        self.requests_per_client[key] = (count + size - first, min(start, buffer.absolute_time[first]),
+                                         max(end, buffer.absolute_time[size - 1]))
+
+    def rates(self):
+        """
+        :return: A dict with a tuple (target throughput, achieved throughput) per task.
+        """
+        request_rates = {}
+        for (task, client_id), (count, start, end) in self.requests_per_client.items():
+            if task not in request_rates:
+                request_rates[task] = (target_throughput(task), 0)
+            # the rate between the first and the last request of a client
+            if end > start:
+                target, achieved = request_rates[task]
+                request_rates[task] = (target, achieved + (count - 1) / (end - start))
+        return request_rates
+
+
+class ElapsedTime:
+    """
+    A read-only sequence view that calculates the elapsed time since ``start_time`` only for the elements that are actually accessed.
+    """
+
+    def __init__(self, absolute_time, start_time):
+        self.absolute_time = absolute_time
+        self.start_time = start_time
+
+    def __len__(self):
+        return len(self.absolute_time)
+
+    def __getitem__(self, i):
+        return self.absolute_time[i] - self.start_time
+
+
+class ThroughputColumns:
+    """
+    Concatenates the columns of multiple ``SampleBuffer`` instances that are needed to calculate throughput. No references to the buffers
+    are kept so they can be released as soon as they have been appended.
+    """
+
+    def __init__(self):
+        self.absolute_time = array.array("d")
+        self.relative_time = array.array("d")
+        self.total_ops = array.array("d")
+        self.time_period = array.array("d")
+        self.sample_type = array.array("b")
+        self.total_ops_unit = array.array("i")
+        self.units = []
+
+    def append(self, buffer):
+        size = len(buffer)
+        self.absolute_time.extend(buffer.absolute_time[:size])
+        self.relative_time.extend(buffer.relative_time[:size])
+        self.total_ops.extend(buffer.total_ops[:size])
+        self.time_period.extend(buffer.time_period[:size])
+        self.sample_type.extend(buffer.sample_type[:size])
+        # units are interned per buffer so we need to map them to our own ids
+        unit_ids = [self._unit_id(unit) for unit in buffer.units]
+        if len(unit_ids) == 1:
+            self.total_ops_unit.extend(array.array("i", unit_ids) * size)
+        else:
+            self.total_ops_unit.extend(unit_ids[unit_id] for unit_id in buffer.total_ops_unit[:size])
+
+    def _unit_id(self, unit):
+        if unit not in self.units:
+            self.units.append(unit)
+        return self.units.index(unit)
+
+    def throughput(self, bucket_interval_secs):
         # sort all samples by time
-        current_samples = sorted(v, key=lambda s: s.absolute_time)
-
-        total_count = 0
-        interval = 0
-        current_bucket = 0
-        current_sample_type = current_samples[0].sample_type
-        sample_count_for_current_sample_type = 0
-        start_time = current_samples[0].absolute_time - current_samples[0].time_period
-        for sample in current_samples:
-            # print("%d,%f,%f,%s,%s,%d,%f" %
-            # (sample.client_id, sample.absolute_time, sample.relative_time, sample.operation, sample.sample_type,
-            #  sample.total_ops, sample.time_period), file=sample_log)
-
-            # once we have seen a new sample type, we stick to it.
-            if current_sample_type < sample.sample_type:
-                current_sample_type = sample.sample_type
-                sample_count_for_current_sample_type = 0
-
-            total_count += sample.total_ops
-            interval = max(sample.absolute_time - start_time, interval)
-
-            # avoid division by zero
-            if interval > 0 and interval >= current_bucket:
-                sample_count_for_current_sample_type += 1
-                current_bucket = int(interval) + bucket_interval_secs
-                throughput = (total_count / interval)
-                # we calculate throughput per second
-                global_throughput[task].append(
-                    (sample.absolute_time, sample.relative_time, current_sample_type, throughput, "%s/s" % sample.total_ops_unit))
+        unsorted_absolute_time = self.absolute_time.tolist()
+        order = sorted(range(len(unsorted_absolute_time)), key=unsorted_absolute_time.__getitem__)
+        absolute_time = list(map(unsorted_absolute_time.__getitem__, order))
+        total_count = list(itertools.accumulate(map(self.total_ops.tolist().__getitem__, order)))
+        start_time = absolute_time[0] - self.time_period[order[0]]
+        # as samples are sorted by time, the elapsed time never decreases. This allows us to find bucket boundaries with binary search.
+        interval = ElapsedTime(absolute_time, start_time)
+        # once we have seen a new sample type, we stick to it. Hence, the current sample type only changes at a few indices.
+        sample_types = list(map(self.sample_type.tolist().__getitem__, order))
+        sample_type_changes = []
+        sample_type_values = []
+        for first_idx, value in sorted((sample_types.index(value), value) for value in set(sample_types)):
+            if not sample_type_values or value > sample_type_values[-1]:
+                sample_type_changes.append(first_idx)
+                sample_type_values.append(value)
+
+        throughput = []
+
+        def add(i):
+            current_sample_type = sample_type_values[bisect.bisect_right(sample_type_changes, i) - 1]
+            throughput.append((absolute_time[i], self.relative_time[order[i]], metrics.SampleType(current_sample_type),
+                               total_count[i] / interval[i], "%s/s" % self.units[self.total_ops_unit[order[i]]]))
+
+        last = len(interval) - 1
+        last_added = -1
+        # avoid division by zero
+        i = bisect.bisect_right(interval, 0)
+        while i <= last:
+            add(i)
+            last_added = i
+            current_bucket = int(interval[i]) + bucket_interval_secs
+            i = bisect.bisect_left(interval, current_bucket, i + 1)
         # also include the last sample if we don't have one for the current sample type, even if it is below the bucket interval
         # (mainly needed to ensure we show throughput data in test mode)
-        if interval > 0 and sample_count_for_current_sample_type == 0:
-            throughput = (total_count / interval)
-            global_throughput[task].append(
-                (sample.absolute_time, sample.relative_time, current_sample_type, throughput, "%s/s" % sample.total_ops_unit))
-
-    return global_throughput
+        if interval[last] > 0 and last_added < sample_type_changes[-1]:
+            add(last)
+        return throughput
 
 
 class Profiler:
@@ -983,8 +1722,97 @@ class Profiler:
             profile_logger.info(profile)
 
 
+class SleepWaitStrategy:
+    """
+    Waits by sleeping. Its precision is limited by the granularity of the operating system's scheduler which is usually sufficient unless
+    a client needs to issue several hundred requests per second.
+    """
+
+    def wait_until(self, point_in_time):
+        """
+        :param point_in_time: The point in time (as returned by ``time.perf_counter()``) until which to wait.
+        """
+        rest = point_in_time - time.perf_counter()
+        if rest > 0:
+            time.sleep(rest)
+
+    def __str__(self):
+        return "sleep"
+
+
+class SpinWaitStrategy:
+    """
+    Sleeps until shortly before the requested point in time and busy-waits for the rest. This trades CPU time for precision.
+    """
+
+    def __init__(self, spin_time):
+        """
+        :param spin_time: The time period in seconds before the requested point in time during which we busy-wait.
+        """
+        self.spin_time = spin_time
+
+    def wait_until(self, point_in_time):
+        rest = point_in_time - time.perf_counter() - self.spin_time
+        if rest > 0:
+            time.sleep(rest)
+        while time.perf_counter() < point_in_time:
+            pass
+
+    def __str__(self):
+        return "spin (%d microseconds)" % round(self.spin_time * 1000 * 1000)
+
+
+class AdaptiveWaitStrategy:
+    """
+    Measures by how much sleeping overshoots on average and only sleeps until this time period before the requested point in time. It
+    busy-waits for the rest. Thus, it only spins as long as necessary on the current machine.
+    """
+
+    def __init__(self, initial_spin_time, max_spin_time=0.01):
+        """
+        :param initial_spin_time: The time period in seconds that we expect sleeping to overshoot initially.
+        :param max_spin_time: The maximum time period in seconds during which we busy-wait.
+        """
+        self.spin_time = initial_spin_time
+        self.max_spin_time = max_spin_time
+
+    def wait_until(self, point_in_time):
+        sleep_time = point_in_time - time.perf_counter() - self.spin_time
+        if sleep_time > 0:
+            start = time.perf_counter()
+            time.sleep(sleep_time)
+            overshoot = (time.perf_counter() - start) - sleep_time
+            # exponentially weighted moving average so single outliers do not dominate
+            self.spin_time = min(0.9 * self.spin_time + 0.1 * overshoot, self.max_spin_time)
+        while time.perf_counter() < point_in_time:
+            pass
+
+    def __str__(self):
+        return "adaptive"
+
+
+def wait_strategy_for(task):
+    """
+    Creates the strategy that a client uses to wait until the next request of the provided task is scheduled.
+
+    :param task: The task to execute. The task parameters ``wait-strategy`` (one of ``sleep`` (default), ``spin``, ``adaptive``) and
+                 ``spin-micros`` (defaults to 500) define the strategy.
+    :return: A wait strategy.
+    """
+    name = task.params.get("wait-strategy", "sleep")
+    spin_time = task.params.get("spin-micros", 500) / 1000 / 1000
+    if name == "sleep":
+        return SleepWaitStrategy()
+    elif name == "spin":
+        return SpinWaitStrategy(spin_time)
+    elif name == "adaptive":
+        return AdaptiveWaitStrategy(spin_time)
+    else:
+        raise exceptions.SystemSetupError("Unknown wait strategy [%s] for [%s]. Use one of 'sleep', 'spin' or 'adaptive'." % (name, task))
+
+
 class Executor:
-    def __init__(self, task, schedule, es, sampler, cancel, complete):
+    def __init__(self, task, schedule, es, sampler, cancel, complete, wait_strategy=None):
         """
         Executes tasks according to the schedule for a given operation.
 
@@ -994,6 +1822,155 @@ class Executor:
         :param sampler: A container to store raw samples.
         :param cancel: A shared boolean that indicates we need to cancel execution.
         :param complete: A shared boolean that indicates we need to prematurely complete execution.
+        :param wait_strategy: Determines how to wait until the next request is scheduled. Optional. Defaults to ``SleepWaitStrategy``.
+        """
+        self.task = task
+        self.op = task.operation
+        self.schedule = schedule
+        self.es = es
+        self.sampler = sampler
+        self.cancel = cancel
+        self.complete = complete
+        self.wait_strategy = wait_strategy if wait_strategy else SleepWaitStrategy()
+        self.max_in_flight = max_in_flight(task)
+
+    def __call__(self, *args, **kwargs):
+        total_start = time.perf_counter()
+        pending = PendingRequests(self.sampler, self.complete, total_start)
+        # requests are sent on separate threads if a client may have several of them in flight
+        request_pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_in_flight) if self.max_in_flight > 1 else None
+        schedule = iter(self.schedule)
+        # noinspection PyBroadException
+        try:
+            while True:
+                param_wait_start = time.perf_counter()
+                next_request = next(schedule, None)
+                param_wait = time.perf_counter() - param_wait_start
+                if next_request is None:
+                    break
+                expected_scheduled_time, sample_type, percent_completed, runner, params = next_request
+                if self.cancel.is_set():
+                    logger.info("User cancelled execution.")
+                    break
+                absolute_expected_schedule_time = total_start + expected_scheduled_time
+                throughput_throttled = expected_scheduled_time > 0
+                if throughput_throttled:
+                    self.wait_strategy.wait_until(absolute_expected_schedule_time)
+                if request_pool:
+                    while len(pending.in_flight()) >= self.max_in_flight:
+                        concurrent.futures.wait(pending.in_flight(), return_when=concurrent.futures.FIRST_COMPLETED)
+                        pending.record_completed()
+                    request = request_pool.submit(execute_single_timed, runner, self.es, params)
+                    pending.add(request, sample_type, percent_completed, absolute_expected_schedule_time, throughput_throttled, param_wait)
+                    pending.record_completed()
+                else:
+                    pending.record(execute_single_timed(runner, self.es, params), sample_type, percent_completed,
+                                   absolute_expected_schedule_time, throughput_throttled, param_wait)
+
+                if self.complete.is_set():
+                    logger.info("Task is considered completed due to external event.")
+                    break
+            concurrent.futures.wait(pending.in_flight())
+            pending.record_completed()
+        except BaseException:
+            logger.exception("Could not execute schedule")
+            raise
+        finally:
+            if request_pool:
+                request_pool.shutdown()
+            # Actively set it if this task completes its parent
+            if self.task.completes_parent:
+                self.complete.set()
+
+
+def schedule_lag(start, absolute_expected_schedule_time, throughput_throttled):
+    """
+    Calculates how late a request has been sent compared to its schedule. A growing schedule lag indicates that the load driver cannot
+    keep up with the target throughput.
+
+    :param start: The point in time when the request has been sent (``time.perf_counter()``).
+    :param absolute_expected_schedule_time: The point in time when the request should have been sent (``time.perf_counter()``).
+    :param throughput_throttled: Whether throughput is throttled. Requests of unthrottled tasks are sent immediately, i.e. they have no lag.
+    :return: The schedule lag in seconds.
+    """
+    if throughput_throttled:
+        return max(start - absolute_expected_schedule_time, 0)
+    else:
+        return 0
+
+
+class PendingRequests:
+    """
+    Records the samples of the requests that a client has sent. If a client has several requests in flight, they may complete in any
+    order but their samples are recorded in the order in which they have been sent so progress (``percent_completed``) never decreases.
+    """
+    def __init__(self, sampler, complete, total_start):
+        """
+        :param sampler: A container to store raw samples.
+        :param complete: A shared boolean that indicates we need to prematurely complete execution.
+        :param total_start: The point in time when the client has started to execute its task (``time.perf_counter()``).
+        """
+        self.sampler = sampler
+        self.complete = complete
+        self.total_start = total_start
+        self.pending = collections.deque()
+
+    def add(self, request, sample_type, percent_completed, absolute_expected_schedule_time, throughput_throttled, param_wait):
+        """
+        Adds a request that is still in flight.
+
+        :param request: A future with the result of ``execute_single_timed``.
+        """
+        self.pending.append((request, sample_type, percent_completed, absolute_expected_schedule_time, throughput_throttled, param_wait))
+
+    def in_flight(self):
+        """
+        :return: A list of futures of all requests that have not completed yet.
+        """
+        return [p[0] for p in self.pending if not p[0].done()]
+
+    def record_completed(self):
+        """
+        Records the samples of all completed requests that have been sent before the oldest request that is still in flight.
+        """
+        while self.pending and self.pending[0][0].done():
+            request, *sample = self.pending.popleft()
+            self.record(request.result(), *sample, deferred=True)
+
+    def record(self, timed_result, sample_type, percent_completed, absolute_expected_schedule_time, throughput_throttled, param_wait,
+               deferred=False):
+        """
+        Records the sample of a completed request.
+
+        :param timed_result: The return value of ``execute_single_timed``.
+        :param deferred: Whether the request has completed some time ago (and not just now).
+        """
+        start, stop, pool_wait, (total_ops, total_ops_unit, request_meta_data) = timed_result
+        service_time = stop - start
+        # Do not calculate latency separately when we don't throttle throughput. This metric is just confusing then.
+        latency = stop - absolute_expected_schedule_time if throughput_throttled else service_time
+        lag = schedule_lag(start, absolute_expected_schedule_time, throughput_throttled)
+        # last sample should bump progress to 100% if externally completed.
+        completed = percent_completed if not self.complete.is_set() else 1.0
+        self.sampler.add(sample_type, request_meta_data, convert.seconds_to_ms(latency), convert.seconds_to_ms(service_time),
+                         total_ops, total_ops_unit, (stop - self.total_start), completed, convert.seconds_to_ms(lag),
+                         convert.seconds_to_ms(param_wait), convert.seconds_to_ms(pool_wait), completed_at=stop if deferred else None)
+
+
+class AsyncExecutor:
+    def __init__(self, task, schedule, es, sampler, cancel, complete, loop, request_pool):
+        """
+        Executes tasks according to the schedule for a given operation as a coroutine. This executor has the same semantics as
+        ``Executor`` but it does not block the event loop while waiting for the next scheduled request or for a response.
+
+        :param task: The task that is executed.
+        :param schedule: The schedule for this task.
+        :param es: Elasticsearch client that will be used to execute the operation.
+        :param sampler: A container to store raw samples.
+        :param cancel: A shared boolean that indicates we need to cancel execution.
+        :param complete: A shared boolean that indicates we need to prematurely complete execution.
+        :param loop: The event loop on which this executor runs.
+        :param request_pool: An executor that runs blocking operations like requests or reading parameters.
         """
         self.task = task
         self.op = task.operation
@@ -1002,36 +1979,51 @@ class Executor:
         self.sampler = sampler
         self.cancel = cancel
         self.complete = complete
+        self.loop = loop
+        self.request_pool = request_pool
+        self.max_in_flight = max_in_flight(task)
 
+    @asyncio.coroutine
     def __call__(self, *args, **kwargs):
         total_start = time.perf_counter()
+        pending = PendingRequests(self.sampler, self.complete, total_start)
         # noinspection PyBroadException
         try:
-            for expected_scheduled_time, sample_type, percent_completed, runner, params in self.schedule:
+            while True:
                 if self.cancel.is_set():
                     logger.info("User cancelled execution.")
                     break
+                # determining parameters may involve I/O (e.g. reading bulk data)
+                param_wait_start = time.perf_counter()
+                next_request = yield from self.loop.run_in_executor(self.request_pool, next, self.schedule, None)
+                param_wait = time.perf_counter() - param_wait_start
+                if next_request is None:
+                    break
+                expected_scheduled_time, sample_type, percent_completed, runner, params = next_request
                 absolute_expected_schedule_time = total_start + expected_scheduled_time
                 throughput_throttled = expected_scheduled_time > 0
                 if throughput_throttled:
                     rest = absolute_expected_schedule_time - time.perf_counter()
                     if rest > 0:
-                        time.sleep(rest)
-                start = time.perf_counter()
-                total_ops, total_ops_unit, request_meta_data = execute_single(runner, self.es, params)
-                stop = time.perf_counter()
-
-                service_time = stop - start
-                # Do not calculate latency separately when we don't throttle throughput. This metric is just confusing then.
-                latency = stop - absolute_expected_schedule_time if throughput_throttled else service_time
-                # last sample should bump progress to 100% if externally completed.
-                completed = percent_completed if not self.complete.is_set() else 1.0
-                self.sampler.add(sample_type, request_meta_data, convert.seconds_to_ms(latency), convert.seconds_to_ms(service_time),
-                                 total_ops, total_ops_unit, (stop - total_start), completed)
+                        yield from asyncio.sleep(rest, loop=self.loop)
+                if self.max_in_flight > 1:
+                    while len(pending.in_flight()) >= self.max_in_flight:
+                        yield from asyncio.wait(pending.in_flight(), loop=self.loop, return_when=asyncio.FIRST_COMPLETED)
+                        pending.record_completed()
+                    request = self.loop.run_in_executor(self.request_pool, execute_single_timed, runner, self.es, params)
+                    pending.add(request, sample_type, percent_completed, absolute_expected_schedule_time, throughput_throttled, param_wait)
+                    pending.record_completed()
+                else:
+                    timed_result = yield from self.loop.run_in_executor(self.request_pool, execute_single_timed, runner, self.es, params)
+                    pending.record(timed_result, sample_type, percent_completed, absolute_expected_schedule_time, throughput_throttled,
+                                   param_wait)
 
                 if self.complete.is_set():
                     logger.info("Task is considered completed due to external event.")
                     break
+            if pending.in_flight():
+                yield from asyncio.wait(pending.in_flight(), loop=self.loop)
+            pending.record_completed()
         except BaseException:
             logger.exception("Could not execute schedule")
             raise
@@ -1041,6 +2033,20 @@ class Executor:
                 self.complete.set()
 
 
+def execute_single_timed(runner, es, params):
+    """
+    Invokes ``execute_single`` and measures the time it takes on the calling thread.
+
+    :return: a tuple of: start timestamp, stop timestamp, the time in seconds that the request has waited for a free connection and the
+             return value of ``execute_single``.
+    """
+    client.POOL_WAIT_TIME.pop()
+    start = time.perf_counter()
+    result = execute_single(runner, es, params)
+    stop = time.perf_counter()
+    return start, stop, client.POOL_WAIT_TIME.pop(), result
+
+
 def execute_single(runner, es, params):
     """
     Invokes the given runner once and provides the runner's return value in a uniform structure.
@@ -1214,6 +2220,29 @@ class Allocator:
         return max_clients
 
 
+def allocate_clients_to_workers(clients, hosts, workers_per_host=1):
+    """
+    Allocates clients round-robin to all load driver hosts and then round-robin to the workers on each host.
+
+    :param clients: The number of clients.
+    :param hosts: A list of load driver hosts.
+    :param workers_per_host: The number of workers per host. Either a single number for all hosts or a list with one number per host.
+                             Defaults to 1.
+    :return: A list of tuples (host, client ids) with one entry per worker. Workers without any clients are omitted.
+    """
+    if isinstance(workers_per_host, int):
+        workers_per_host = [workers_per_host] * len(hosts)
+    workers = []
+    for host_index, host in enumerate(hosts):
+        clients_on_host = list(range(host_index, clients, len(hosts)))
+        workers_on_host = workers_per_host[host_index]
+        for worker_index in range(workers_on_host):
+            client_ids = clients_on_host[worker_index::workers_on_host]
+            if client_ids:
+                workers.append((host, client_ids))
+    return workers
+
+
 #######################################
 #
 # Scheduler related stuff
@@ -1223,21 +2252,25 @@ class Allocator:
 
 # Runs a concrete schedule on one worker client
 # Needs to determine the runners and concrete iterations per client.
-def schedule_for(current_track, task, client_index):
+def schedule_for(current_track, task, client_index, cfg=None):
     """
     Calculates a client's schedule for a given task.
 
     :param current_track: The current track.
     :param task: The task that should be executed.
     :param client_index: The current client index.  Must be in the range [0, `task.clients').
+    :param cfg: The config object. If provided, it determines whether bulks are read from the bulk cache.
     :return: A generator for the operations the given client needs to perform for this task.
     """
     op = task.operation
     num_clients = task.clients
-    sched = scheduler.scheduler_for(task.schedule, task.params)
+    # schedulers may need to behave differently per client (e.g. to generate reproducible but different random sequences)
+    scheduler_params = dict(task.params)
+    scheduler_params["client-index"] = client_index
+    sched = scheduler.scheduler_for(task.schedule, scheduler_params)
     logger.info("Choosing [%s] for [%s]." % (sched, task))
     runner_for_op = runner.runner_for(op.type)
-    params_for_op = track.operation_parameters(current_track, op).partition(client_index, num_clients)
+    params_for_op = track.operation_parameters(current_track, op, cfg).partition(client_index, num_clients)
 
     if task.warmup_time_period is not None or task.time_period is not None:
         warmup_time_period = task.warmup_time_period if task.warmup_time_period else 0
@@ -1262,34 +2295,30 @@ def time_period_based(sched, warmup_time_period, time_period, runner, params):
     :param params: The parameter source for a given operation.
     :return: A generator for the corresponding parameters.
     """
-    next_scheduled = 0
     start = time.perf_counter()
     if time_period is None:
         iterations = params.size()
         if iterations:
-            for it in range(0, iterations):
+            for it, next_scheduled in enumerate(scheduler.scheduled_times(sched, iterations)):
                 sample_type = metrics.SampleType.Warmup if time.perf_counter() - start < warmup_time_period else metrics.SampleType.Normal
                 percent_completed = (it + 1) / iterations
                 yield (next_scheduled, sample_type, percent_completed, runner, params.params())
-                next_scheduled = sched.next(next_scheduled)
         else:
-            while True:
+            for next_scheduled in scheduler.scheduled_times(sched):
                 sample_type = metrics.SampleType.Warmup if time.perf_counter() - start < warmup_time_period else metrics.SampleType.Normal
                 # does not contribute at all to completion. Hence, we cannot define completion.
                 percent_completed = None
                 yield (next_scheduled, sample_type, percent_completed, runner, params.params())
-                next_scheduled = sched.next(next_scheduled)
     else:
         end = start + warmup_time_period + time_period
-        it = 0
 
-        while time.perf_counter() < end:
+        for next_scheduled in scheduler.scheduled_times(sched):
             now = time.perf_counter()
+            if now >= end:
+                break
             sample_type = metrics.SampleType.Warmup if now - start < warmup_time_period else metrics.SampleType.Normal
             percent_completed = (now - start) / (warmup_time_period + time_period)
             yield (next_scheduled, sample_type, percent_completed, runner, params.params())
-            next_scheduled = sched.next(next_scheduled)
-            it += 1
 
 
 def iteration_count_based(sched, warmup_iterations, iterations, runner, params):
@@ -1303,12 +2332,10 @@ def iteration_count_based(sched, warmup_iterations, iterations, runner, params):
     :param params: The parameter source for a given operation.
     :return: A generator for the corresponding parameters.
     """
-    next_scheduled = 0
     total_iterations = warmup_iterations + iterations
     if total_iterations == 0:
         raise exceptions.RallyAssertionError("Operation must run at least for one iteration.")
-    for it in range(0, total_iterations):
+    for it, next_scheduled in enumerate(scheduler.scheduled_times(sched, total_iterations)):
         sample_type = metrics.SampleType.Warmup if it < warmup_iterations else metrics.SampleType.Normal
         percent_completed = (it + 1) / total_iterations
         yield (next_scheduled, sample_type, percent_completed, runner, params.params())
-        next_scheduled = sched.next(next_scheduled)
@@ -3,7 +3,8 @@ import types
 import logging
 from collections import Counter, OrderedDict
 
-from esrally import exceptions, track
+from esrally import client, exceptions, track
+from esrally.utils import convert, compression
 
 logger = logging.getLogger("rally.driver")
 
@@ -12,10 +13,15 @@ __RUNNERS = {}
 
 
 def runner_for(operation_type):
+    """
+    :param operation_type: The operation type.
+    :return: The runner that one client uses for one task of the provided operation type.
+    """
     try:
-        return __RUNNERS[operation_type]
+        r = __RUNNERS[operation_type]
     except KeyError:
         raise exceptions.RallyError("No runner available for operation type [%s]" % operation_type)
+    return r.for_task() if isinstance(r, Runner) else r
 
 
 def register_runner(operation_type, runner):
@@ -44,6 +50,13 @@ class Runner:
     def __enter__(self):
         return self
 
+    def for_task(self):
+        """
+        :return: The runner instance that one client uses for one task. Runners that keep state between requests need to return a new
+                 instance so the state of one client or task does not affect others.
+        """
+        return self
+
     def __call__(self, *args):
         """
         Runs the actual method that should be benchmarked.
@@ -76,9 +89,18 @@ class BulkIndex(Runner):
     """
     Bulk indexes the given documents.
     """
+    # Unless detailed results are requested, Elasticsearch only returns whether there are errors and the failed items. We also keep
+    # top-level errors so error responses are not stripped in case Elasticsearch applies the filter to them.
+    FILTER_PATH = "errors,items.*.error,error,status"
 
     def __init__(self):
         super().__init__()
+        # Items that have been processed but whose replication has failed on some shards are not contained in filtered responses so we
+        # request full responses as soon as Elasticsearch reports errors (for the rest of the current task of this client).
+        self.filter_responses = True
+
+    def for_task(self):
+        return BulkIndex()
 
     def __call__(self, es, params):
         """
@@ -90,7 +112,8 @@ class BulkIndex(Runner):
 
         It expects a parameter dict with the following mandatory keys:
 
-        * ``body``: containing all documents for the current bulk request.
+        * ``body``: containing all documents for the current bulk request. Either a list of lines or a ready-to-send ``bytes`` object
+        (including line separators). ``bytes`` bodies are sent with the lean transport if the client option ``lean_transport`` is enabled.
         * ``bulk-size``: the number of documents in this bulk.
         * ``action_metadata_present``: if ``True``, assume that an action and metadata line is present (meaning only half of the lines
         contain actual documents to index)
@@ -105,7 +128,9 @@ class BulkIndex(Runner):
         be very cautious enabling this feature. Our own measurements have shown a median overhead of several thousand times (execution time
          is in the single digit microsecond range when this feature is disabled and in the single digit millisecond range when this feature
          is enabled; numbers based on a bulk size of 500 elements and no errors). For details please refer to the respective benchmarks
-         in ``benchmarks/driver``.
+         in ``benchmarks/driver``. Unless ``detailed-results`` is ``True``, Rally lets Elasticsearch filter the response (see
+         ``filter_path``) so it contains only the failed items. After the first bulk response with errors, the runner requests full
+         responses again for the rest of the task.
 
 
         Returned meta data
@@ -122,6 +147,12 @@ class BulkIndex(Runner):
         * ``success-count``: Number of successfully processed items for this request (denoted in ``unit``).
         * ``error-count``: Number of failed items for this request (denoted in ``unit``).
 
+        If the body has been compressed before (see the bulk parameter ``compression-level``), the following meta data are returned in
+        addition:
+
+        * ``compression-ratio``: The ratio of the uncompressed to the compressed size of the bulk request body.
+        * ``compression-time-ms``: The time it took to compress the bulk request body. Not available for bodies from the bulk cache.
+
         If ``detailed-results`` is ``True`` the following meta data are returned in addition:
 
         * ``ops``: A hash with the operation name as key (e.g. index, update, delete) and various counts as values. ``item-count`` contains
@@ -244,6 +275,8 @@ class BulkIndex(Runner):
         bulk_params = {}
         if "pipeline" in params:
             bulk_params["pipeline"] = params["pipeline"]
+        if self.filter_responses and not detailed_results:
+            bulk_params["filter_path"] = BulkIndex.FILTER_PATH
 
         with_action_metadata = params["action_metadata_present"]
         try:
@@ -252,7 +285,18 @@ class BulkIndex(Runner):
             raise exceptions.DataError(
                 "Bulk parameter source did not provide a 'bulk-size' parameter. Please add it to your parameter source.")
 
-        if with_action_metadata:
+        if isinstance(params["body"], bytes):
+            # elasticsearch-py would try to join the body with a string separator so we hand it directly to the transport.
+            if with_action_metadata:
+                path = "/_bulk"
+            else:
+                path = "/%s/%s/_bulk" % (index, params["type"])
+            lean_transport = getattr(es, "lean_transport", None)
+            if isinstance(lean_transport, client.LeanTransport):
+                response = lean_transport.bulk(path, bulk_params, params["body"], parse_items=detailed_results)
+            else:
+                response = es.transport.perform_request("POST", path, params=bulk_params, body=params["body"])
+        elif with_action_metadata:
             # only half of the lines are documents
             response = es.bulk(body=params["body"], params=bulk_params)
         else:
@@ -267,6 +311,11 @@ class BulkIndex(Runner):
             "bulk-size": bulk_size
         }
         meta_data.update(stats)
+        if isinstance(params["body"], compression.PrecompressedBody):
+            meta_data["compression-ratio"] = params["body"].compression_ratio
+            # bodies from the bulk cache have been compressed before the benchmark
+            if params["body"].compression_time is not None:
+                meta_data["compression-time-ms"] = convert.seconds_to_ms(params["body"].compression_time)
         return meta_data
 
     def detailed_stats(self, params, bulk_size, response):
@@ -276,9 +325,15 @@ class BulkIndex(Runner):
         bulk_request_size_bytes = 0
         total_document_size_bytes = 0
 
-        for line_number, data in enumerate(params["body"]):
+        body = params["body"]
+        if isinstance(body, bytes):
+            lines = body.splitlines()
+        else:
+            lines = [data.encode("utf-8") for data in body]
+
+        for line_number, data in enumerate(lines):
 
-            line_size = len(data.encode('utf-8'))
+            line_size = len(data)
             if params["action_metadata_present"]:
                 if line_number % 2 == 1:
                     total_document_size_bytes += line_size
@@ -320,9 +375,13 @@ class BulkIndex(Runner):
     def simple_stats(self, bulk_size, response):
         bulk_error_count = 0
         if response["errors"]:
-            for idx, item in enumerate(response["items"]):
+            if self.filter_responses:
+                logger.info("Bulk response contains errors. Requesting full bulk responses from now on.")
+                self.filter_responses = False
+            # filtered responses contain only the failed items
+            for idx, item in enumerate(response.get("items", [])):
                 data = next(iter(item.values()))
-                if data["status"] > 299 or data["_shards"]["failed"] > 0:
+                if "error" in data or data["status"] > 299 or data["_shards"]["failed"] > 0:
                     bulk_error_count += 1
         return {
             "success": bulk_error_count == 0,
@@ -417,7 +476,12 @@ class Query(Runner):
     For scroll queries we also return:
 
     * ``pages``: Total number of pages that have been retrieved.
+
+    Unless ``request_params`` define a ``filter_path`` already, Elasticsearch is asked to return only the response fields that are needed
+    for the meta data above of request body queries.
     """
+    # we also keep top-level errors so error responses are not stripped in case Elasticsearch applies the filter to them
+    FILTER_PATH = "hits.total,timed_out,took,error,status"
 
     def __init__(self):
         self.scroll_id = None
@@ -431,6 +495,8 @@ class Query(Runner):
 
     def request_body_query(self, es, params):
         request_params = params.get("request_params", {})
+        if "filter_path" not in request_params:
+            request_params = dict(request_params, filter_path=Query.FILTER_PATH)
         r = es.search(
             index=params["index"],
             doc_type=params["type"],
@@ -1,3 +1,5 @@
+import functools
+import itertools
 import logging
 import types
 import random
@@ -44,6 +46,31 @@ def register_scheduler(name, scheduler):
         __SCHEDULERS[name] = scheduler
 
 
+def scheduled_times(sched, iterations=None, block_size=1000):
+    """
+    Provides all points in time at which a request should be issued, i.e. ``0``, ``sched.next(0)``, ``sched.next(sched.next(0))`` and so
+    on. If the scheduler supports it, points in time are calculated in blocks with ``next_n``.
+
+    :param sched: A scheduler.
+    :param iterations: The number of points in time to provide. ``None`` if the number is not known up front.
+    :param block_size: The maximum number of points in time that are calculated at once.
+    :return: A generator for points in time.
+    """
+    next_n = getattr(sched, "next_n", None)
+    if next_n is None:
+        # schedulers that have been registered by tracks are not required to implement ``next_n``.
+        next_n = functools.partial(Scheduler.next_n, sched)
+    current = 0
+    provided = 0
+    while iterations is None or provided < iterations:
+        count = block_size if iterations is None else min(block_size, iterations - provided)
+        # the first point in time is always zero
+        block = [current] + next_n(current, count - 1) if provided == 0 else next_n(current, count)
+        yield from block
+        provided += count
+        current = block[-1]
+
+
 class Scheduler:
     def __init__(self, params):
         self.params = params
@@ -51,6 +78,21 @@ class Scheduler:
     def next(self, current):
         raise NotImplementedError("abstract method")
 
+    def next_n(self, current, count):
+        """
+        Calculates the next ``count`` points in time at once. Subclasses should override this method if they can avoid calling ``next``
+        for each point in time.
+
+        :param current: The current point in time.
+        :param count: The number of points in time to calculate.
+        :return: A list with the ``count`` points in time that follow ``current``.
+        """
+        result = []
+        for _ in range(count):
+            current = self.next(current)
+            result.append(current)
+        return result
+
 
 class DelegatingScheduler(Scheduler):
     def __init__(self, params, delegate):
@@ -94,6 +136,12 @@ class DeterministicScheduler(Scheduler):
         else:
             return 0
 
+    def next_n(self, current, count):
+        if self.wait_time > 0:
+            return list(itertools.accumulate(itertools.chain([current], itertools.repeat(self.wait_time, count))))[1:]
+        else:
+            return [0] * count
+
     def __str__(self):
         return "deterministic scheduler"
 
@@ -105,20 +153,32 @@ class PoissonScheduler(Scheduler):
     for modelling access in open systems.
     
     See also http://preshing.com/20111007/how-to-generate-random-timings-for-a-poisson-process/
+
+    If the parameter ``schedule-seed`` is set, each client generates the same sequence of arrivals in each run.
     """
 
     def __init__(self, params):
         super().__init__(params)
         wait_time = _calculate_wait_time(params)
         self.rate = 1 / wait_time if wait_time > 0 else 0
+        seed = params.get("schedule-seed")
+        # clients need to generate different sequences as they would arrive simultaneously otherwise
+        self.random = random.Random("%s-%s" % (seed, params.get("client-index", 0)) if seed is not None else None)
 
     def next(self, current):
         # no need for calculations when we are not rate limiting
         if self.rate > 0:
-            return current + random.expovariate(self.rate)
+            return current + self.random.expovariate(self.rate)
         else:
             return 0
 
+    def next_n(self, current, count):
+        if self.rate > 0:
+            wait_times = map(self.random.expovariate, itertools.repeat(self.rate, count))
+            return list(itertools.accumulate(itertools.chain([current], wait_times)))[1:]
+        else:
+            return [0] * count
+
     def __str__(self):
         return "Poisson scheduler"
 
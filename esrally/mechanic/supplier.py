@@ -44,7 +44,8 @@ def from_distribution(version, repo_name, distribution_config, distributions_roo
         try:
             logger.info("Starting download of Elasticsearch [%s]" % version)
             progress = net.Progress("[INFO] Downloading Elasticsearch %s" % version)
-            net.download(download_url, distribution_path, progress_indicator=progress)
+            net.download(download_url, distribution_path, progress_indicator=progress,
+                         expected_checksum=net.retrieve_checksum(download_url))
             progress.finish()
             logger.info("Successfully downloaded Elasticsearch [%s]." % version)
         except urllib.error.HTTPError:
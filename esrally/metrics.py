@@ -430,8 +430,27 @@ class MetricsStore:
         self._put(MetaInfoScope.node, node_name, name, value, unit, operation, operation_type, sample_type, absolute_time, relative_time,
                   meta_data)
 
-    def _put(self, level, level_key, name, value, unit, operation, operation_type, sample_type, absolute_time=None, relative_time=None,
-             meta_data=None):
+    def put_values_cluster_level(self, name, values, unit, operation=None, operation_type=None, sample_types=None, absolute_times=None,
+                                 relative_times=None, meta_data=None):
+        """
+        Adds multiple cluster level value metrics with the same name, unit and operation at once. This is considerably cheaper than calling
+        ``put_value_cluster_level`` for each value.
+
+        :param name: The name of the metric.
+        :param values: A sequence of metric values. They are expected to be of type float.
+        :param unit: The unit of all metric values (e.g. ms, docs/s).
+        :param operation The operation name to which these values apply. Optional. Defaults to None.
+        :param operation_type The operation type to which these values apply. Optional. Defaults to None.
+        :param sample_types A sequence with the sample type of each value. Mandatory.
+        :param absolute_times A sequence with the absolute timestamp in seconds since epoch of each value. Mandatory.
+        :param relative_times A sequence with the relative timestamp in seconds since the start of the benchmark of each value. Mandatory.
+        :param meta_data: A sequence with one dict per value, containing additional key-value pairs. Values may share the same dict instance
+               in which case it is merged with the meta info of the metrics store only once. Defaults to None.
+        """
+        self._put_bulk(MetaInfoScope.cluster, None, name, values, unit, operation, operation_type, sample_types, absolute_times,
+                       relative_times, meta_data)
+
+    def _meta_info_for(self, level, level_key, name):
         if level == MetaInfoScope.cluster:
             meta = self._meta_info[MetaInfoScope.cluster].copy()
         elif level == MetaInfoScope.node:
@@ -440,6 +459,11 @@ class MetricsStore:
                 meta.update(self._meta_info[MetaInfoScope.node][level_key])
         else:
             raise exceptions.SystemSetupError("Unknown meta info level [%s] for metric [%s]" % (level, name))
+        return meta
+
+    def _put(self, level, level_key, name, value, unit, operation, operation_type, sample_type, absolute_time=None, relative_time=None,
+             meta_data=None):
+        meta = self._meta_info_for(level, level_key, name)
         if meta_data:
             meta.update(meta_data)
 
@@ -448,6 +472,37 @@ class MetricsStore:
         if relative_time is None:
             relative_time = self._stop_watch.split_time()
 
+        doc = self._create_doc(name, value, unit, operation, operation_type, sample_type.name.lower(), absolute_time, relative_time, meta)
+        assert self.lap is not None, "Attempting to store [%s] without a lap." % doc
+        self._add(doc)
+
+    def _put_bulk(self, level, level_key, name, values, unit, operation, operation_type, sample_types, absolute_times, relative_times,
+                  meta_data=None):
+        assert self.lap is not None, "Attempting to store [%s] without a lap." % name
+        meta_info = self._meta_info_for(level, level_key, name)
+        # merged meta-data by identity of the provided meta-data. It is only valid for this call as the provided meta-data are kept alive
+        # by ``meta_data`` until then.
+        merged_meta_data = {}
+        sample_type_names = {}
+        for i, value in enumerate(values):
+            value_meta_data = meta_data[i] if meta_data is not None else None
+            try:
+                meta = merged_meta_data[id(value_meta_data)]
+            except KeyError:
+                meta = meta_info.copy()
+                if value_meta_data:
+                    meta.update(value_meta_data)
+                merged_meta_data[id(value_meta_data)] = meta
+            sample_type = sample_types[i]
+            try:
+                sample_type_name = sample_type_names[sample_type]
+            except KeyError:
+                sample_type_name = SampleType(sample_type).name.lower()
+                sample_type_names[sample_type] = sample_type_name
+            self._add(self._create_doc(name, value, unit, operation, operation_type, sample_type_name, absolute_times[i], relative_times[i],
+                                       meta))
+
+    def _create_doc(self, name, value, unit, operation, operation_type, sample_type_name, absolute_time, relative_time, meta):
         doc = {
             "@timestamp": time.to_epoch_millis(absolute_time),
             "relative-time": int(relative_time * 1000 * 1000),
@@ -460,16 +515,14 @@ class MetricsStore:
             "name": name,
             "value": value,
             "unit": unit,
-            "sample-type": sample_type.name.lower(),
+            "sample-type": sample_type_name,
             "meta": meta
         }
         if operation:
             doc["operation"] = operation
         if operation_type:
             doc["operation-type"] = operation_type
-
-        assert self.lap is not None, "Attempting to store [%s] without a lap." % doc
-        self._add(doc)
+        return doc
 
     def bulk_add(self, memento):
         """
@@ -978,7 +1031,7 @@ def create_race(cfg, track, challenge):
 
 class Race:
     def __init__(self, rally_version, environment_name, trial_timestamp, pipeline, user_tag, track, challenge, car, total_laps,
-                 cluster=None, lap_results=None, results=None):
+                 cluster=None, lap_results=None, results=None, load_driver_workers=None):
         if results is None:
             results = {}
         if lap_results is None:
@@ -992,6 +1045,9 @@ class Race:
         self.challenge = challenge
         self.car = car
         self.total_laps = total_laps
+        # number of worker processes per load driver host (or a list with one entry per host if they differ) as resolved by the driver.
+        # None if each client runs in a dedicated process.
+        self.load_driver_workers = load_driver_workers
         # will be set later - contains hosts, revision, distribution_version, ...s
         self.cluster = cluster
         self.lap_results = lap_results
@@ -1028,7 +1084,7 @@ class Race:
         """
         :return: A dict representation suitable for persisting this race instance as JSON.
         """
-        return {
+        d = {
             "rally-version": self.rally_version,
             "environment": self.environment_name,
             "trial-timestamp": time.to_iso8601(self.trial_timestamp),
@@ -1041,6 +1097,9 @@ class Race:
             "cluster": self.cluster.as_dict(),
             "results": self.results.as_dict()
         }
+        if self.load_driver_workers:
+            d["load-driver-workers"] = self.load_driver_workers
+        return d
 
     def to_result_dicts(self):
         """
@@ -1066,6 +1125,9 @@ class Race:
         if plugins:
             result_template["plugins"] = list(plugins)
 
+        if self.load_driver_workers:
+            result_template["load-driver-workers"] = self.load_driver_workers
+
         all_results = []
 
         for item in self.results.as_flat_list():
@@ -1080,7 +1142,8 @@ class Race:
         # Don't restore a few properties like cluster because they (a) cannot be reconstructed easily without knowledge of other modules
         # and (b) it is not necessary for this use case.
         return Race(d["rally-version"], d["environment"], time.from_is8601(d["trial-timestamp"]), d["pipeline"], d["user-tag"],
-                    d["track"], d["challenge"], d["car"], d["total-laps"], results=d["results"])
+                    d["track"], d["challenge"], d["car"], d["total-laps"], results=d["results"],
+                    load_driver_workers=d.get("load-driver-workers"))
 
 
 class RaceStore:
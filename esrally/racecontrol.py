@@ -107,6 +107,9 @@ class BenchmarkActor(actor.RallyActor):
                              % (self.race.track_name, self.race.challenge_name, self.race.car))
                 # start running we assume that each race has at least one lap
                 self.run()
+            elif isinstance(msg, driver.WorkersAllocated):
+                logger.info("Load driver hosts run %s worker processes." % str(msg.load_driver_workers))
+                self.race.load_driver_workers = msg.load_driver_workers
             elif isinstance(msg, driver.TaskFinished):
                 logger.info("Task has finished.")
                 logger.info("Bulk adding request metrics to metrics store.")
@@ -212,6 +212,24 @@ def parse_args():
             "--load-driver-hosts",
             help="define a comma-separated list of hosts which should generate load (default: localhost).",
             default="localhost")
+        p.add_argument(
+            "--load-driver-mode",
+            choices=["actor-per-client", "asyncio", "process-pool"],
+            help="define how clients are executed on load driver hosts. 'actor-per-client' runs each client in a dedicated process, "
+                 "'asyncio' drives all clients of a load driver host within one process and 'process-pool' distributes them across a "
+                 "fixed number of worker processes per load driver host (default: actor-per-client).",
+            default="actor-per-client")
+        p.add_argument(
+            "--load-driver-workers",
+            type=positive_number,
+            help="define the number of worker processes per load driver host if the load driver mode is 'process-pool' "
+                 "(default: number of logical CPU cores of each load driver host).",
+            default=None)
+        p.add_argument(
+            "--compress-samples",
+            help="compress samples with zlib before load driver hosts send them to the coordinator (default: false).",
+            default=False,
+            action="store_true")
         p.add_argument(
             "--client-options",
             help="define a comma-separated list of client options to use. The options will be passed to the Elasticsearch Python client "
@@ -236,6 +254,11 @@ def parse_args():
             "--report-file",
             help="write the command line report also to the provided file",
             default="")
+        p.add_argument(
+            "--schedule-lag-warning-threshold",
+            type=positive_number,
+            help="warn if the 90th percentile schedule lag of an operation exceeds this number of milliseconds (default: 10).",
+            default=10)
         p.add_argument(
             "--quiet",
             help="suppress as much as output as possible (default: false).",
@@ -251,6 +274,22 @@ def parse_args():
             help="runs the given track in 'test mode'. Meant to check a track for errors but not for real benchmarks (default: false).",
             default=False,
             action="store_true")
+        p.add_argument(
+            "--cache-bulk-bodies",
+            help="compiles ready-to-send bulk request bodies once and reuses them in subsequent races (default: false).",
+            default=False,
+            action="store_true")
+        p.add_argument(
+            "--block-compress-data",
+            help="stores track data in independently compressed blocks instead of decompressing them (default: false).",
+            default=False,
+            action="store_true")
+        p.add_argument(
+            "--offset-table-stride",
+            type=positive_number,
+            help="define the number of lines between two entries of the file offset table of track data files (default: %d)."
+                 % io.DEFAULT_OFFSET_TABLE_STRIDE,
+            default=io.DEFAULT_OFFSET_TABLE_STRIDE)
 
     for p in [parser, list_parser, race_parser]:
         p.add_argument(
@@ -516,6 +555,19 @@ def kv_to_map(kvs):
     return result
 
 
+def load_driver_workers(args):
+    """
+    :return: The number of worker processes per load driver host or ``None`` if each client runs in a dedicated process or if each
+             load driver host should start one worker process per logical CPU core (the default for the load driver mode process-pool).
+    """
+    if args.load_driver_mode == "process-pool":
+        return args.load_driver_workers
+    elif args.load_driver_mode == "asyncio":
+        return 1
+    else:
+        return None
+
+
 def main():
     check_python_version()
 
@@ -576,10 +628,14 @@ def main():
     cfg.add(config.Scope.applicationOverride, "track", "challenge.name", args.challenge)
     cfg.add(config.Scope.applicationOverride, "track", "include.tasks", csv_to_list(args.include_tasks))
     cfg.add(config.Scope.applicationOverride, "track", "test.mode.enabled", args.test_mode)
+    cfg.add(config.Scope.applicationOverride, "track", "bulk.cache.enabled", args.cache_bulk_bodies)
+    cfg.add(config.Scope.applicationOverride, "track", "block.compression.enabled", args.block_compress_data)
+    cfg.add(config.Scope.applicationOverride, "track", "offset.table.stride", args.offset_table_stride)
     cfg.add(config.Scope.applicationOverride, "track", "auto_manage_indices", to_bool(args.auto_manage_indices))
 
     cfg.add(config.Scope.applicationOverride, "reporting", "format", args.report_format)
     cfg.add(config.Scope.applicationOverride, "reporting", "output.path", args.report_file)
+    cfg.add(config.Scope.applicationOverride, "reporting", "schedule.lag.warning.threshold", args.schedule_lag_warning_threshold)
     if sub_command == "compare":
         cfg.add(config.Scope.applicationOverride, "reporting", "baseline.timestamp", args.baseline)
         cfg.add(config.Scope.applicationOverride, "reporting", "contender.timestamp", args.contender)
@@ -590,6 +646,9 @@ def main():
     cfg.add(config.Scope.applicationOverride, "driver", "cluster.health", args.cluster_health)
     cfg.add(config.Scope.applicationOverride, "driver", "profiling", args.enable_driver_profiling)
     cfg.add(config.Scope.applicationOverride, "driver", "load_driver_hosts", csv_to_list(args.load_driver_hosts))
+    cfg.add(config.Scope.applicationOverride, "driver", "load_driver_mode", args.load_driver_mode)
+    cfg.add(config.Scope.applicationOverride, "driver", "load_driver_workers", load_driver_workers(args))
+    cfg.add(config.Scope.applicationOverride, "driver", "samples.compression", args.compress_samples)
     if sub_command != "list":
         # Also needed by mechanic (-> telemetry) - duplicate by module?
         cfg.add(config.Scope.applicationOverride, "client", "hosts", _normalize_hosts(csv_to_list(args.target_hosts)))
@@ -98,7 +98,8 @@ class StatsCalculator:
                     self.summary_stats("throughput", op),
                     self.single_latency(op),
                     self.single_latency(op, metric_name="service_time"),
-                    self.error_rate(op)
+                    self.error_rate(op),
+                    self.single_latency(op, metric_name="schedule_lag")
                 )
 
         logger.debug("Gathering indexing metrics.")
@@ -262,6 +263,8 @@ class Stats:
                         all_results.append({"operation": item["operation"], "name": "latency", "value": item["latency"]})
                     if "service_time" in item:
                         all_results.append({"operation": item["operation"], "name": "service_time", "value": item["service_time"]})
+                    if item.get("schedule_lag"):
+                        all_results.append({"operation": item["operation"], "name": "schedule_lag", "value": item["schedule_lag"]})
                     if "error_rate" in item:
                         all_results.append({"operation": item["operation"], "name": "error_rate", "value": {"single": item["error_rate"]}})
             elif value is not None:
@@ -278,13 +281,14 @@ class Stats:
     def v(self, d, k, default=None):
         return d.get(k, default) if d else default
 
-    def add_op_metrics(self, operation, throughput, latency, service_time, error_rate):
+    def add_op_metrics(self, operation, throughput, latency, service_time, error_rate, schedule_lag=None):
         self.op_metrics.append({
             "operation": operation,
             "throughput": throughput,
             "latency": latency,
             "service_time": service_time,
-            "error_rate": error_rate
+            "error_rate": error_rate,
+            "schedule_lag": schedule_lag
         })
 
     def operations(self):
@@ -317,6 +321,10 @@ class Stats:
 
 
 class SummaryReporter:
+    # If requests are sent later than scheduled by more than this threshold, the load driver is likely saturated. The default is well above
+    # the typical sleep inaccuracy of the load driver (~1 ms) but still small compared to the latency of most requests.
+    DEFAULT_SCHEDULE_LAG_WARNING_THRESHOLD_MS = 10
+
     def __init__(self, results, config, revision, current_lap, total_laps):
         self.results = results
         self._config = config
@@ -377,6 +385,7 @@ class SummaryReporter:
             metrics_table += self.report_throughput(record, operation)
             metrics_table += self.report_latency(record, operation)
             metrics_table += self.report_service_time(record, operation)
+            metrics_table += self.report_schedule_lag(record, operation)
             metrics_table += self.report_error_rate(record, operation)
             self.add_warnings(warnings, record, operation)
 
@@ -396,6 +405,18 @@ class SummaryReporter:
                                 % (op, error_rate * 100))
             else:
                 warnings.append("No throughput metrics available for [%s]. Likely cause: The benchmark ended already during warmup." % op)
+        schedule_lag = values.get("schedule_lag")
+        if schedule_lag:
+            # look at the bulk of requests; single outliers (e.g. due to GC pauses) do not indicate saturation
+            percentile = "90" if "90" in schedule_lag else "50" if "50" in schedule_lag else "100"
+            lag = schedule_lag[percentile]
+            threshold = self._config.opts("reporting", "schedule.lag.warning.threshold", mandatory=False,
+                                          default_value=SummaryReporter.DEFAULT_SCHEDULE_LAG_WARNING_THRESHOLD_MS)
+            if lag > threshold:
+                warnings.append("%sth percentile schedule lag for [%s] is %.2f ms which exceeds %d ms. Likely cause: The load driver "
+                                "cannot keep up with the target throughput. Please consider reducing the target throughput or adding "
+                                "load driver capacity (see --load-driver-workers and --load-driver-hosts)." %
+                                (self.decode_percentile_key(percentile), op, lag, threshold))
 
     def write_report(self, metrics_table, meta_info_table):
         report_file = self._config.opts("reporting", "output.path")
@@ -436,6 +457,14 @@ class SummaryReporter:
                 lines.append([self.lap, "%sth percentile service time" % self.decode_percentile_key(percentile), operation, value, "ms"])
         return lines
 
+    def report_schedule_lag(self, values, operation):
+        lines = []
+        schedule_lag = values.get("schedule_lag")
+        if schedule_lag:
+            for percentile, value in schedule_lag.items():
+                lines.append([self.lap, "%sth percentile schedule lag" % self.decode_percentile_key(percentile), operation, value, "ms"])
+        return lines
+
     def decode_percentile_key(self, k):
         return k.replace("_", ".")
 
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+from esrally.utils import io
+
+logger = logging.getLogger("rally.track")
+
+# name of the metadata index file in the root directory of the dataset cache
+INDEX_FILE_NAME = "dataset-cache.json"
+# number of bytes that are read at once when calculating checksums
+CHECKSUM_BUFFER_SIZE = 1024 * 1024
+
+
+def checksum(path):
+    """
+    :return: The SHA-1 checksum of the provided file as hex string.
+    """
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for data in iter(lambda: f.read(CHECKSUM_BUFFER_SIZE), b""):
+            h.update(data)
+    return h.hexdigest()
+
+
+class DatasetCache:
+    """
+    DatasetCache is a content-addressed metadata index over all track data archives in the local dataset cache directory. Entries are keyed
+    by the SHA-1 checksum of the archive and record the following:
+
+    * the size, modification time, source URLs and all paths (relative to the cache root) of the archive. Identical archives of different
+      tracks are stored only once and hard-linked to each path.
+    * the size, modification time and number of lines of the decompressed data file and the stride of its file offset table. The data file
+      of an archive is always stored next to it without the archive's file extension and is shared via hard links as well.
+    * the time when the entry has been used last. If a maximum size is set, the least recently used entries are evicted first.
+
+    Files are considered unchanged as long as their size and modification time match the index so validation does not need to read them.
+    The index is replaced atomically so readers never see a partially written index. However, it is loaded only once and written without
+    any locking so the cache directory must only be used by one Rally process at a time and must not be shared by several hosts.
+    """
+    def __init__(self, root, max_size_in_bytes=None):
+        """
+        :param root: The root directory of the dataset cache.
+        :param max_size_in_bytes: The maximum total size of all cached files. ``None`` if the size is unlimited.
+        """
+        self.root = root
+        self.max_size_in_bytes = max_size_in_bytes
+        self.index_path = os.path.join(root, INDEX_FILE_NAME)
+        self.entries = self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "rt") as f:
+                return json.load(f)["entries"]
+        except (OSError, ValueError, KeyError):
+            logger.exception("Could not read dataset cache index [%s]. Starting with an empty index." % self.index_path)
+            return {}
+
+    def _store(self):
+        io.ensure_dir(self.root)
+        # unique per process so a concurrent writer can never replace the index with a partially written file
+        tmp_index_path = "%s.%d.tmp" % (self.index_path, os.getpid())
+        with open(tmp_index_path, "wt") as f:
+            json.dump({"entries": self.entries}, f, indent=2, sort_keys=True)
+        os.replace(tmp_index_path, self.index_path)
+
+    def _relative(self, path):
+        return os.path.relpath(path, self.root)
+
+    def _absolute(self, relative_path):
+        return os.path.join(self.root, relative_path)
+
+    def _archive_paths(self, entry):
+        """
+        :return: The absolute paths of all archives of this entry that are still unchanged.
+        """
+        return [self._absolute(p) for p in entry["paths"] if self._is_unchanged(self._absolute(p), entry["size"], entry["mtime"])]
+
+    @staticmethod
+    def _is_unchanged(path, size, mtime):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return stat.st_size == size and stat.st_mtime == mtime
+
+    def key(self, archive_path):
+        """
+        :return: The cache key of the archive at the provided path if it is known and unchanged, ``None`` otherwise.
+        """
+        relative_path = self._relative(archive_path)
+        for key, entry in self.entries.items():
+            if relative_path in entry["paths"] and self._is_unchanged(archive_path, entry["size"], entry["mtime"]):
+                return key
+        return None
+
+    def provide_archive(self, url, archive_path):
+        """
+        Makes an archive that has been downloaded from the same URL before available at ``archive_path`` without downloading it again.
+
+        :param url: The URL from which the archive would be downloaded.
+        :param archive_path: The absolute path where the archive is expected.
+        :return: True iff the archive has been provided from the cache.
+        """
+        if os.path.exists(archive_path):
+            return False
+        for key, entry in self.entries.items():
+            if url in entry["urls"]:
+                for cached_archive_path in self._archive_paths(entry):
+                    logger.info("Providing [%s] from dataset cache entry [%s] at [%s]." % (archive_path, key, cached_archive_path))
+                    io.ensure_dir(os.path.dirname(archive_path))
+                    io.link(cached_archive_path, archive_path)
+                    return True
+        return False
+
+    def add_archive(self, url, archive_path):
+        """
+        Registers an archive with the cache. If the cache already contains an identical archive at a different path, the archive is
+        replaced by a hard link to it.
+
+        :param url: The URL from which the archive has been downloaded. May be ``None``.
+        :param archive_path: The absolute path of the archive.
+        :return: The cache key of the archive.
+        """
+        key = self.key(archive_path)
+        if key is None:
+            logger.info("Calculating checksum of [%s] for the dataset cache." % archive_path)
+            key = checksum(archive_path)
+            relative_path = self._relative(archive_path)
+            # the path may have referred to a different archive before
+            for entry in self.entries.values():
+                if relative_path in entry["paths"]:
+                    entry["paths"].remove(relative_path)
+            entry = self.entries.get(key)
+            cached_archive_paths = self._archive_paths(entry) if entry else []
+            if cached_archive_paths:
+                logger.info("Replacing [%s] with a link to the identical file [%s]." % (archive_path, cached_archive_paths[0]))
+                io.link(cached_archive_paths[0], archive_path)
+            else:
+                stat = os.stat(archive_path)
+                entry = {"size": stat.st_size, "mtime": stat.st_mtime, "urls": [], "paths": []}
+                self.entries[key] = entry
+            entry["paths"].append(relative_path)
+        entry = self.entries[key]
+        if url and url not in entry["urls"]:
+            entry["urls"].append(url)
+        entry["last_used"] = time.time()
+        self._store()
+        return key
+
+    def _is_valid_data_file(self, data_file_path, data, offset_table_stride):
+        return self._is_unchanged(data_file_path, data["size"], data["mtime"]) and \
+            data["offset_table_stride"] == offset_table_stride and io.is_file_offset_table_valid(data_file_path)
+
+    def provide_data_file(self, key, archive_path, offset_table_stride):
+        """
+        Makes the decompressed data file of an archive available next to it, including its file offset table. If another track has the
+        same archive, its data file and file offset table are hard-linked.
+
+        :param key: The cache key of the archive.
+        :param archive_path: The absolute path of the archive.
+        :param offset_table_stride: The required stride of the file offset table.
+        :return: The number of lines in the data file if it is available, ``None`` if the archive needs to be decompressed.
+        """
+        data = self.entries[key].get("data")
+        if not data:
+            return None
+        data_file_path = io.splitext(archive_path)[0]
+        if self._is_valid_data_file(data_file_path, data, offset_table_stride):
+            return data["lines"]
+        for cached_archive_path in self._archive_paths(self.entries[key]):
+            cached_data_file_path = io.splitext(cached_archive_path)[0]
+            if cached_data_file_path != data_file_path and self._is_valid_data_file(cached_data_file_path, data, offset_table_stride):
+                logger.info("Providing [%s] from dataset cache entry [%s] at [%s]." % (data_file_path, key, cached_data_file_path))
+                io.link(cached_data_file_path, data_file_path)
+                io.link_file_offset_table(cached_data_file_path, data_file_path)
+                return data["lines"]
+        return None
+
+    def add_data_file(self, key, archive_path, number_of_lines, offset_table_stride):
+        """
+        Records the decompressed data file of an archive after its number of lines has been verified.
+
+        :param key: The cache key of the archive.
+        :param archive_path: The absolute path of the archive.
+        :param number_of_lines: The number of lines in the data file.
+        :param offset_table_stride: The stride of the file offset table of the data file.
+        """
+        stat = os.stat(io.splitext(archive_path)[0])
+        self.entries[key]["data"] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "lines": number_of_lines,
+            "offset_table_stride": offset_table_stride
+        }
+        self._store()
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries including all their files until the total size of the cache is below its maximum size.
+        Entries whose archives have all been removed are dropped from the index.
+
+        :param keep: Cache keys of entries that must not be evicted (e.g. because they are used by the current benchmark).
+        """
+        keep = keep or []
+        for key in [k for k, entry in self.entries.items() if k not in keep and not self._archive_paths(entry)]:
+            logger.info("Dropping dataset cache entry [%s] as its files are gone." % key)
+            del self.entries[key]
+
+        if self.max_size_in_bytes is not None:
+            total_size = sum(self._size(entry) for entry in self.entries.values())
+            candidates = sorted([k for k in self.entries.keys() if k not in keep], key=lambda k: self.entries[k].get("last_used", 0))
+            for key in candidates:
+                if total_size <= self.max_size_in_bytes:
+                    break
+                entry = self.entries.pop(key)
+                logger.info("Evicting dataset cache entry [%s] (%d bytes)." % (key, self._size(entry)))
+                total_size -= self._size(entry)
+                self._remove_files(entry)
+            if total_size > self.max_size_in_bytes:
+                logger.warning("Dataset cache at [%s] needs [%d] bytes which is more than its maximum size of [%d] bytes." %
+                               (self.root, total_size, self.max_size_in_bytes))
+        self._store()
+
+    @staticmethod
+    def _size(entry):
+        # hard links are stored only once so we count each file only once
+        return entry["size"] + entry.get("data", {}).get("size", 0)
+
+    def _remove_files(self, entry):
+        for archive_path in self._archive_paths(entry):
+            data_file_path = io.splitext(archive_path)[0]
+            for path in [archive_path, data_file_path]:
+                if os.path.isfile(path):
+                    os.remove(path)
+            io.remove_file_offset_table(data_file_path)
+            io.remove_block_compressed_file(data_file_path)
+            # bulk body caches of this data file (see params.bulk_cache_path)
+            shutil.rmtree("%s.bulks" % data_file_path, ignore_errors=True)
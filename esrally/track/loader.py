@@ -9,8 +9,8 @@ import jinja2.exceptions
 import jsonschema
 import tabulate
 from esrally import exceptions, time, PROGRAM_NAME
-from esrally.track import params, track
-from esrally.utils import io, convert, net, console, modules, repo
+from esrally.track import params, track, dataset_cache
+from esrally.utils import io, convert, net, console, modules, repo, compression
 
 logger = logging.getLogger("rally.track")
 
@@ -135,13 +135,23 @@ def track_file(repo, track_name):
     return os.path.join(track_dir(repo, track_name), "track.json")
 
 
-def operation_parameters(t, op):
+def operation_parameters(t, op, cfg=None):
     if op.param_source:
         logger.debug("Creating parameter source with name [%s]" % op.param_source)
-        return params.param_source_for_name(op.param_source, t.indices, op.params)
+        param_source = params.param_source_for_name(op.param_source, t.indices, op.params)
     else:
         logger.debug("Creating parameter source for operation type [%s]" % op.type)
-        return params.param_source_for_operation(op.type, t.indices, op.params)
+        param_source = params.param_source_for_operation(op.type, t.indices, op.params)
+    # bulks are only read from the cache if the user has asked for it, otherwise an outdated cache could be used unnoticed
+    if cfg and isinstance(param_source, params.BulkIndexParamSource) and \
+            cfg.opts("track", "bulk.cache.enabled", mandatory=False, default_value=False):
+        param_source.use_bulk_cache(bulk_cache_compression_level(cfg))
+    # compressing bulks ahead of time would only waste CPU if the client sends them uncompressed anyway
+    if cfg and isinstance(param_source, params.BulkIndexParamSource) and param_source.compression_level is not None and \
+            not cfg.opts("client", "options", mandatory=False, default_value={}).get("compressed", False):
+        raise exceptions.SystemSetupError("Operation [%s] defines a 'compression-level' but the client does not compress requests. Please "
+                                          "set the client option 'compressed' to true or remove 'compression-level'." % op.name)
+    return param_source
 
 
 def prepare_track(track, cfg):
@@ -199,9 +209,8 @@ def prepare_track(track, cfg):
     def decompress(data_set_path, expected_size_in_bytes):
         # we assume that track data are always compressed and try to decompress them before running the benchmark
         basename, extension = io.splitext(data_set_path)
-        decompressed = False
+        lines_read = None
         if not os.path.isfile(basename) or os.path.getsize(basename) != expected_size_in_bytes:
-            decompressed = True
             if type.uncompressed_size_in_bytes:
                 console.info("Decompressing track data from [%s] to [%s] (resulting size: %.2f GB) ... " %
                              (data_set_path, basename, convert.bytes_to_gb(type.uncompressed_size_in_bytes)),
@@ -210,24 +219,34 @@ def prepare_track(track, cfg):
                 console.info("Decompressing track data from [%s] to [%s] ... " % (data_set_path, basename), end='',
                              flush=True, logger=logger)
 
-            io.decompress(data_set_path, io.dirname(data_set_path))
+            # the file offset table is built in the same pass for single-file archives
+            lines_read = io.decompress(data_set_path, io.dirname(data_set_path), offset_table_stride=offset_table_stride)
             console.println("[OK]")
             extracted_bytes = os.path.getsize(basename)
             if expected_size_in_bytes is not None and extracted_bytes != expected_size_in_bytes:
                 raise exceptions.DataError("[%s] is corrupt. Extracted [%d] bytes but [%d] bytes are expected." %
                                            (basename, extracted_bytes, expected_size_in_bytes))
-        return basename, decompressed
+        return basename, lines_read
 
     if not track.source_root_url:
         logger.info("Track [%s] does not specify a source root URL. Assuming data are available locally." % track.name)
 
     data_root = cfg.opts("benchmarks", "local.dataset.cache")
+    offset_table_stride = int(cfg.opts("track", "offset.table.stride", mandatory=False,
+                                       default_value=io.DEFAULT_OFFSET_TABLE_STRIDE))
+    block_compression = cfg.opts("track", "block.compression.enabled", mandatory=False, default_value=False)
+    max_cache_size_gb = cfg.opts("benchmarks", "local.dataset.cache.max.size.gb", mandatory=False, default_value=None)
+    cache = dataset_cache.DatasetCache(data_root, convert.gb_to_bytes(float(max_cache_size_gb)) if max_cache_size_gb else None)
+    cache_keys = []
     for index in track.indices:
         for type in index.types:
             if type.document_archive:
                 absolute_archive_path = os.path.join(data_root, type.document_archive)
+                data_url = None
                 if track.source_root_url:
                     data_url = "%s/%s" % (track.source_root_url, os.path.basename(absolute_archive_path))
+                    # other tracks may have downloaded the same file already
+                    cache.provide_archive(data_url, absolute_archive_path)
                     download(cfg, data_url, absolute_archive_path, type.compressed_size_in_bytes)
                 if not os.path.exists(absolute_archive_path):
                     if cfg.opts("track", "test.mode.enabled"):
@@ -238,17 +257,70 @@ def prepare_track(track, cfg):
                     else:
                         logger.error("[%s] does not exist." % absolute_archive_path)
                         raise exceptions.DataError("Track data file [%s] is missing." % absolute_archive_path)
-                decompressed_file_path, was_decompressed = decompress(absolute_archive_path, type.uncompressed_size_in_bytes)
-                # just rebuild the file every time for the time being. Later on, we might check the data file fingerprint to avoid it
-                lines_read = io.prepare_file_offset_table(decompressed_file_path)
+                cache_key = cache.add_archive(data_url, absolute_archive_path)
+                cache_keys.append(cache_key)
+                # a validated data file (maybe of another track) avoids decompressing the archive and checking the data file again
+                cached_lines = None if block_compression else cache.provide_data_file(cache_key, absolute_archive_path,
+                                                                                      offset_table_stride)
+                if cached_lines is not None:
+                    decompressed_file_path = io.splitext(absolute_archive_path)[0]
+                    lines_read = cached_lines
+                elif block_compression:
+                    # documents are read directly from the compressed blocks so there is no need for a file offset table
+                    decompressed_file_path = io.splitext(absolute_archive_path)[0]
+                    lines_read = io.compress_blocks(absolute_archive_path, decompressed_file_path, offset_table_stride)
+                else:
+                    decompressed_file_path, lines_read = decompress(absolute_archive_path, type.uncompressed_size_in_bytes)
+                    if lines_read is None:
+                        # just rebuild the file every time for the time being. Later on, we might check the data file fingerprint
+                        lines_read = io.prepare_file_offset_table(decompressed_file_path, offset_table_stride)
                 if lines_read and lines_read != type.number_of_lines:
                     io.remove_file_offset_table(decompressed_file_path)
+                    io.remove_block_compressed_file(decompressed_file_path)
                     raise exceptions.DataError("Data in [%s] for track [%s] are invalid. Expected [%d] lines but got [%d]."
                                                % (decompressed_file_path, track, type.number_of_lines, lines_read))
+                if cached_lines is None and not block_compression and lines_read == type.number_of_lines:
+                    # only register data files whose lines we have just counted. An existing file offset table is not rebuilt so we
+                    # would otherwise trust the declared number of lines.
+                    cache.add_data_file(cache_key, absolute_archive_path, lines_read, offset_table_stride)
             else:
                 logger.info("Type [%s] in index [%s] does not define a document archive. No data are indexed from a file for this type." %
                             (type.name, index.name))
 
+    cache.evict(keep=cache_keys)
+
+    if cfg.opts("track", "bulk.cache.enabled", mandatory=False, default_value=False):
+        compile_bulk_bodies(track, cfg)
+
+
+def compile_bulk_bodies(t, cfg):
+    """
+    Compiles ready-to-send bulk bodies for all bulk-indexing tasks of the selected challenge.
+
+    :param t: A track that is about to be run. Its track data must be available already.
+    :param cfg: The config object.
+    """
+    challenge = t.find_challenge_or_default(cfg.opts("track", "challenge.name"))
+    compression_level = bulk_cache_compression_level(cfg)
+    for tasks in challenge.schedule:
+        for task in tasks:
+            param_source = operation_parameters(t, task.operation)
+            if isinstance(param_source, params.BulkIndexParamSource):
+                console.info("Compiling bulks for task [%s] ... " % task, end="", flush=True, logger=logger)
+                param_source.compile(task.clients, compression_level)
+                console.println("[OK]")
+
+
+def bulk_cache_compression_level(cfg):
+    """
+    :return: The compression level of compressed bodies in the bulk cache or ``None`` if the client does not compress requests.
+    """
+    # we only cache compressed bodies if the client compresses requests anyway
+    client_options = cfg.opts("client", "options", mandatory=False, default_value={})
+    if client_options.get("compressed", False):
+        return client_options.get("compression_level", compression.DEFAULT_COMPRESSION_LEVEL)
+    return None
+
 
 def render_template(loader, template_name, glob_helper=lambda f: [], clock=time.Clock):
     macros = """
@@ -663,6 +735,20 @@ class TrackSpecificationReader:
             self._error("Operation '%s' in challenge '%s' defines a warmup time period of '%d' seconds and '%d' iterations. Please do not "
                         "mix time periods and iterations." % (op_name, challenge_name, task.warmup_time_period, task.iterations))
 
+        max_in_flight = self._r(task_spec, "max-in-flight", error_ctx=op_name, mandatory=False, default_value=1)
+        if max_in_flight > 1 and task.operation.type != track.OperationType.Index.name:
+            self._error("Operation '%s' in challenge '%s' defines '%d' requests in flight but only bulk-index operations support more than "
+                        "one request in flight." % (op_name, challenge_name, max_in_flight))
+
+        wait_strategy = self._r(task_spec, "wait-strategy", error_ctx=op_name, mandatory=False, default_value="sleep")
+        if wait_strategy not in ["sleep", "spin", "adaptive"]:
+            self._error("Operation '%s' in challenge '%s' defines an unknown wait strategy '%s'. Please use one of 'sleep', 'spin' or "
+                        "'adaptive'." % (op_name, challenge_name, wait_strategy))
+        spin_micros = self._r(task_spec, "spin-micros", error_ctx=op_name, mandatory=False, default_value=500)
+        if isinstance(spin_micros, bool) or not isinstance(spin_micros, (int, float)) or spin_micros < 0:
+            self._error("Operation '%s' in challenge '%s' defines '%s' spin microseconds but it must be a non-negative number."
+                        % (op_name, challenge_name, spin_micros))
+
         return task
 
     def parse_operations(self, ops_specs):
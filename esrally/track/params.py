@@ -1,12 +1,20 @@
+import array
+import glob
+import gzip
 import logging
+import multiprocessing
+import os
+import queue
 import random
+import threading
 import time
 import types
+import weakref
 from enum import Enum
 
 from esrally import exceptions
 from esrally.track import track
-from esrally.utils import io
+from esrally.utils import io, compression
 
 logger = logging.getLogger("rally.track")
 
@@ -211,22 +219,77 @@ class BulkIndexParamSource(ParamSource):
                 raise exceptions.InvalidSyntax("'batch-size' must be a multiple of 'bulk-size'")
         except ValueError:
             raise exceptions.InvalidSyntax("'batch-size' must be numeric")
+
+        try:
+            self.prefetch_depth = int(params.get("prefetch-depth", 0))
+            if self.prefetch_depth < 0:
+                raise exceptions.InvalidSyntax("'prefetch-depth' must be non-negative but was %d" % self.prefetch_depth)
+        except ValueError:
+            raise exceptions.InvalidSyntax("'prefetch-depth' must be numeric")
+
+        self.prefetch_mode = params.get("prefetch-mode", "thread")
+        if self.prefetch_mode not in Prefetcher.MODES:
+            raise exceptions.InvalidSyntax("Unknown 'prefetch-mode' [%s]. Use one of %s." %
+                                           (self.prefetch_mode, ", ".join("'%s'" % m for m in Prefetcher.MODES)))
+
+        try:
+            self.conflicts_seed = int(params["conflicts-seed"]) if "conflicts-seed" in params else None
+        except ValueError:
+            raise exceptions.InvalidSyntax("'conflicts-seed' must be numeric")
+
+        try:
+            self.compression_level = int(params["compression-level"]) if "compression-level" in params else None
+            if self.compression_level is not None and not 1 <= self.compression_level <= 9:
+                raise exceptions.InvalidSyntax("'compression-level' must be between 1 and 9 but was %d" % self.compression_level)
+        except ValueError:
+            raise exceptions.InvalidSyntax("'compression-level' must be numeric")
         if len(indices) == 1 and len(indices[0].types) == 1:
             default_index = indices[0].name
         else:
             default_index = None
         self.index_name = params.get("index", default_index)
+        # only read bulks from the bulk cache if the user has asked for it (see ``use_bulk_cache``)
+        self.bulk_cache = False
+        self.bulk_cache_compression_level = None
 
-    def partition(self, partition_index, total_partitions):
+    def use_bulk_cache(self, compression_level=None):
+        """
+        Lets all partitions read bulk bodies from the bulk cache (see ``compile``) if it is valid.
+
+        :param compression_level: The compression level of the compressed bodies to read from the cache. If ``None``, compressed bodies
+                                  are not read.
+        """
+        self.bulk_cache = True
+        self.bulk_cache_compression_level = compression_level
+
+    def chosen_indices(self):
         chosen_indices = [idx for idx in self.indices if idx.matches(self.index_name)]
         if not chosen_indices:
             raise exceptions.RallyAssertionError("The provided index [%s] does not match any of the indices [%s]." %
                                                  (self.index_name, ",".join([str(i) for i in self.indices])))
+        return chosen_indices
 
+    def partition(self, partition_index, total_partitions):
+        chosen_indices = self.chosen_indices()
         logger.info("Choosing indices [%s] for partition [%d] of [%d]." %
                     (",".join([str(i) for i in chosen_indices]), partition_index, total_partitions))
         return PartitionBulkIndexParamSource(chosen_indices, partition_index, total_partitions, self.batch_size, self.bulk_size,
-                                             self.id_conflicts, self.pipeline, self._params)
+                                             self.id_conflicts, self.pipeline, self._params, self.prefetch_depth, self.conflicts_seed,
+                                             self.compression_level, self.bulk_cache, self.bulk_cache_compression_level,
+                                             self.prefetch_mode)
+
+    def compile(self, total_partitions, compression_level=None):
+        """
+        Compiles ready-to-send bulk bodies for all partitions and caches them next to the document files. Partitions will read them
+        from the cache instead of building each bulk body on the fly.
+
+        :param total_partitions: The total number of partitions (i.e. clients).
+        :param compression_level: If set, gzip-compressed bulk bodies with this compression level are cached as well.
+        """
+        chosen_indices = self.chosen_indices()
+        for partition_index in range(total_partitions):
+            create_readers(total_partitions, partition_index, chosen_indices, self.batch_size, self.bulk_size, self.id_conflicts,
+                           lambda *args: compile_bulk_bodies(*args, compression_level=compression_level), self.conflicts_seed)
 
     def params(self):
         raise exceptions.RallyError("Do not use a BulkIndexParamSource without partitioning")
@@ -237,7 +300,8 @@ class BulkIndexParamSource(ParamSource):
 
 class PartitionBulkIndexParamSource(ParamSource):
     def __init__(self, indices, partition_index, total_partitions, batch_size, bulk_size, id_conflicts=None,
-                 pipeline=None, original_params=None):
+                 pipeline=None, original_params=None, prefetch_depth=0, conflicts_seed=None, compression_level=None, bulk_cache=False,
+                 bulk_cache_compression_level=None, prefetch_mode="thread"):
         """
 
         :param indices: Specification of affected indices.
@@ -247,6 +311,14 @@ class PartitionBulkIndexParamSource(ParamSource):
         :param bulk_size: The size of bulk index operations (number of documents per bulk).
         :param id_conflicts: The type of id conflicts.
         :param pipeline: The name of the ingest pipeline to run.
+        :param prefetch_depth: The number of bulks to read ahead in the background. 0 disables prefetching.
+        :param conflicts_seed: The seed for random id conflicts. If ``None``, ids differ between runs.
+        :param compression_level: If set, bulk bodies are gzip-compressed with this level while they are prepared (i.e. in the background
+                                  thread if prefetching is enabled) instead of when they are sent.
+        :param bulk_cache: Whether to read bulk bodies from the bulk cache if it is valid.
+        :param bulk_cache_compression_level: The compression level of the compressed bodies to read from the bulk cache. If ``None``,
+                                             compressed bodies are not read.
+        :param prefetch_mode: Whether bulks are read ahead in a background ``thread`` or in a background ``process``.
         """
         super().__init__(indices, {})
         self.partition_index = partition_index
@@ -256,7 +328,12 @@ class PartitionBulkIndexParamSource(ParamSource):
         self.id_conflicts = id_conflicts
         self.pipeline = pipeline
         self.internal_params = bulk_data_based(total_partitions, partition_index, indices, batch_size,
-                                               bulk_size, id_conflicts, pipeline, original_params)
+                                               bulk_size, id_conflicts, pipeline, original_params,
+                                               create_reader=lambda *args: create_default_reader(*args, bulk_cache=bulk_cache,
+                                                                                                 compression_level=bulk_cache_compression_level),
+                                               conflicts_seed=conflicts_seed, compression_level=compression_level)
+        if prefetch_depth > 0:
+            self.internal_params = Prefetcher(self.internal_params, prefetch_depth, prefetch_mode)
 
     def partition(self, partition_index, total_partitions):
         raise exceptions.RallyError("Cannot partition a PartitionBulkIndexParamSource further")
@@ -283,18 +360,54 @@ def number_of_bulks(indices, partition_index, total_partitions, bulk_size):
     return bulks
 
 
-def build_conflicting_ids(conflicts, docs_to_index, offset, rand=random.randint):
+def build_conflicting_ids(conflicts, docs_to_index, offset, seed=None):
     if conflicts is None or conflicts == IndexIdConflict.NoConflicts:
         return None
     logger.info("building ids with id conflicts of type [%s]" % conflicts)
-    all_ids = [0] * docs_to_index
-    for i in range(docs_to_index):
+    return ConflictingIds(conflicts, docs_to_index, offset, seed)
+
+
+class ConflictingIds:
+    """
+    A read-only sequence of the (formatted) ids of all documents that a client indexes when it simulates id conflicts. Ids are computed on
+    access so memory usage does not depend on the number of documents.
+    """
+    MASK = (1 << 64) - 1
+
+    def __init__(self, conflicts, docs_to_index, offset, seed=None):
+        """
+        :param conflicts: The type of id conflicts.
+        :param docs_to_index: The number of documents that the client indexes.
+        :param offset: The id of the first document of this client.
+        :param seed: The seed for random ids. If ``None``, ids differ between runs.
+        """
+        self.conflicts = conflicts
+        self.docs_to_index = docs_to_index
+        self.offset = offset
+        self.seed = random.getrandbits(64) if seed is None else seed
+
+    def __len__(self):
+        return self.docs_to_index
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.docs_to_index
+        if not 0 <= i < self.docs_to_index:
+            raise IndexError("id index [%d] out of range" % i)
         # always consider the offset as each client will index its own range and we don't want uncontrolled conflicts across clients
-        if conflicts == IndexIdConflict.SequentialConflicts:
-            all_ids[i] = "%10d" % (offset + i)
+        if self.conflicts == IndexIdConflict.SequentialConflicts:
+            return "%10d" % (self.offset + i)
         else:  # RandomConflicts
-            all_ids[i] = "%10d" % rand(offset, offset + docs_to_index)
-    return all_ids
+            # the random id only depends on the seed and the position so we get the same id on each access without storing it
+            return "%10d" % (self.offset + self._mix(self.seed + i) % (self.docs_to_index + 1))
+
+    @staticmethod
+    def _mix(x):
+        # SplitMix64 finalizer: maps consecutive numbers to uniformly distributed 64 bit numbers
+        x = (x + 0x9E3779B97F4A7C15) & ConflictingIds.MASK
+        x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & ConflictingIds.MASK
+        x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & ConflictingIds.MASK
+        return x ^ (x >> 31)
 
 
 def chain(*iterables):
@@ -311,18 +424,208 @@ def chain(*iterables):
                 yield element
 
 
-def create_default_reader(index, type, offset, num_lines, num_docs, batch_size, bulk_size, id_conflicts):
-    source = Slice(io.FileSource, offset, num_lines)
+class Prefetcher:
+    """
+    Iterates over the provided iterator in a background thread or process and buffers up to ``depth`` elements ahead of the consumer. This
+    takes file I/O and the assembly of request bodies off the critical path between two requests. A background process also takes this work
+    off the consumer's CPU core (and its global interpreter lock) at the expense of pickling each element.
+    """
+    MODES = ["thread", "process"]
+    # marks the end of the iteration. A string (instead of a sentinel object) survives the transfer from a background process.
+    _END = "__rally_prefetcher_end__"
+
+    def __init__(self, iterator, depth, mode="thread"):
+        """
+        :param iterator: The iterator to read ahead. It is only accessed by the background thread or process.
+        :param depth: The maximum number of elements to read ahead.
+        :param mode: Either ``thread`` (default) or ``process``. A background process is forked so it inherits ``iterator`` and all
+                     elements need to be picklable.
+        """
+        if mode == "process":
+            # iterators (e.g. generators) cannot be pickled so the background process needs to inherit them
+            context = multiprocessing.get_context("fork")
+            self.queue = context.Queue(maxsize=depth)
+            self.stopped = context.Event()
+            self.producer = context.Process(target=Prefetcher._produce_in_process, args=(iterator, self.queue, self.stopped),
+                                            daemon=True, name="rally-prefetcher")
+        elif mode == "thread":
+            self.queue = queue.Queue(maxsize=depth)
+            self.stopped = threading.Event()
+            # The background thread must not reference this object. Otherwise we could never stop it when the consumer is gone.
+            self.producer = threading.Thread(target=Prefetcher._produce, args=(iterator, self.queue, self.stopped), daemon=True,
+                                             name="rally-prefetcher")
+        else:
+            raise exceptions.RallyAssertionError("Unknown prefetch mode [%s]" % mode)
+        weakref.finalize(self, self.stopped.set)
+        self.producer.start()
+
+    @staticmethod
+    def _produce_in_process(iterator, q, stopped):
+        Prefetcher._produce(iterator, q, stopped)
+        if stopped.is_set():
+            # nobody consumes buffered elements anymore so we must not wait for them to be flushed when this process exits
+            q.cancel_join_thread()
+
+    @staticmethod
+    def _produce(iterator, q, stopped):
+        def offer(element):
+            # do not block forever if nobody consumes elements anymore
+            while not stopped.is_set():
+                try:
+                    q.put(element, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            for element in iterator:
+                if not offer((element, None)):
+                    return
+            offer((Prefetcher._END, None))
+        except BaseException as e:
+            logger.exception("Could not prefetch next element.")
+            offer((Prefetcher._END, e))
+        finally:
+            # run the cleanup of partially consumed generators (e.g. closing files) in this thread
+            if isinstance(iterator, types.GeneratorType):
+                iterator.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        element, error = self.queue.get()
+        if isinstance(element, str) and element == Prefetcher._END:
+            # keep signalling the end to subsequent calls
+            self.queue.put((element, error))
+            if error:
+                raise error
+            raise StopIteration()
+        return element
+
+    def close(self):
+        self.stopped.set()
+
+
+def create_default_reader(index, type, offset, num_lines, num_docs, batch_size, bulk_size, id_conflicts, conflicts_seed=None,
+                          bulk_cache=False, compression_level=None):
+    if bulk_cache:
+        cache_path = bulk_cache_path(index, type, offset, num_lines, bulk_size, id_conflicts, conflicts_seed)
+        if is_bulk_cache_valid(type.document_file, cache_path, compression_level):
+            logger.info("Reading bulks for [%s/%s] from cache [%s]." % (index, type, cache_path))
+            return CachedIndexDataReader(cache_path, batch_size, index, type, compression_level)
+        logger.info("Bulk cache [%s] for [%s/%s] is invalid. Reading bulks from the document file." % (cache_path, index, type))
+    return create_mmap_reader(index, type, offset, num_lines, num_docs, batch_size, bulk_size, id_conflicts, conflicts_seed)
+
+
+def create_mmap_reader(index, type, offset, num_lines, num_docs, batch_size, bulk_size, id_conflicts, conflicts_seed=None):
+    # documents are read directly from the compressed blocks if the document file has been converted
+    source_class = io.BlockCompressedSource if io.is_block_compressed(type.document_file) else io.MmapSource
+    source = Slice(source_class, offset, num_lines)
 
     if type.includes_action_and_meta_data:
         am_handler = SourceActionMetaData(source)
     else:
-        am_handler = GenerateActionMetaData(index, type, build_conflicting_ids(id_conflicts, num_docs, offset))
+        # each client derives its own seed so clients don't replace documents in lockstep
+        seed = None if conflicts_seed is None else conflicts_seed + offset
+        am_handler = GenerateActionMetaData(index, type, build_conflicting_ids(id_conflicts, num_docs, offset, seed),
+                                            rand=random.Random(seed).randint)
 
-    return IndexDataReader(type.document_file, batch_size, bulk_size, source, am_handler, index, type)
+    return MmapIndexDataReader(type.document_file, batch_size, bulk_size, source, am_handler, index, type)
 
 
-def create_readers(num_clients, client_index, indices, batch_size, bulk_size, id_conflicts, create_reader):
+# increase this whenever the layout of the bulk cache files or the contents of bulk bodies change so caches of older versions are not read
+# anymore
+BULK_CACHE_FORMAT_VERSION = 2
+
+
+def bulk_cache_path(index, type, offset, num_lines, bulk_size, id_conflicts, conflicts_seed=None):
+    """
+    :return: The path prefix of all cache files that contain the bulk bodies for the provided slice of a document file.
+    """
+    conflicts = id_conflicts.name if id_conflicts else IndexIdConflict.NoConflicts.name
+    # ids of random conflicts depend on the seed so bodies compiled with a different (or without a) seed must not be reused
+    seed = "unseeded" if conflicts_seed is None else str(conflicts_seed)
+    return os.path.join("%s.bulks" % type.document_file, "v%d-%s-%s-%d-%d-%d-%s-%s" % (BULK_CACHE_FORMAT_VERSION, index.name, type.name,
+                                                                                       bulk_size, offset, num_lines, conflicts, seed))
+
+
+def compressed_bulk_cache_path(cache_path, compression_level):
+    """
+    :return: The path of the file with all compressed bulk bodies. The compression level is part of the name so bodies are compressed again
+             if it changes.
+    """
+    return "%s.bulk.%d.gz" % (cache_path, compression_level)
+
+
+def existing_compressed_bulk_cache_paths(cache_path):
+    """
+    :return: The paths of all files with compressed bulk bodies of the provided cache, regardless of their compression level.
+    """
+    return glob.glob("%s.bulk.*.gz" % glob.escape(cache_path))
+
+
+def is_bulk_cache_valid(data_file_path, cache_path, compression_level=None):
+    offsets_path = "%s.offsets" % cache_path
+    if not os.path.exists(offsets_path):
+        return False
+    if io.is_block_compressed(data_file_path):
+        data_file_mtime = io.block_compressed_mtime(data_file_path)
+    else:
+        data_file_mtime = os.path.getmtime(data_file_path)
+    if os.path.getmtime(offsets_path) < data_file_mtime:
+        return False
+    return compression_level is None or os.path.exists(compressed_bulk_cache_path(cache_path, compression_level))
+
+
+def compile_bulk_bodies(index, type, offset, num_lines, num_docs, batch_size, bulk_size, id_conflicts, conflicts_seed=None,
+                        compression_level=None):
+    """
+    Compiles all bulk bodies for the provided slice of a document file into a cache. The cache consists of the following files:
+
+    * ``<cache_path>.bulk``: All bulk bodies, concatenated.
+    * ``<cache_path>.bulk.<compression_level>.gz``: All gzip-compressed bulk bodies, concatenated (only if ``compression_level`` is set).
+    * ``<cache_path>.offsets``: For each bulk the number of documents and the end offsets in the two files above (as unsigned longs).
+
+    Note that the cache contains the id conflicts of one run. Subsequent runs reuse them.
+
+    :return: The path prefix of all cache files.
+    """
+    cache_path = bulk_cache_path(index, type, offset, num_lines, bulk_size, id_conflicts, conflicts_seed)
+    if is_bulk_cache_valid(type.document_file, cache_path, compression_level):
+        logger.info("Skipping compilation of bulks at [%s] as the cache is still valid." % cache_path)
+        return cache_path
+
+    logger.info("Compiling bulks for [%s/%s] to [%s]." % (index, type, cache_path))
+    io.ensure_dir(os.path.dirname(cache_path))
+    # the offsets file marks the cache as valid so we must not keep it while we overwrite the bulk bodies
+    offsets_path = "%s.offsets" % cache_path
+    if os.path.exists(offsets_path):
+        os.remove(offsets_path)
+    # compressed bodies of a different compression level do not match the new offsets
+    for stale_path in existing_compressed_bulk_cache_paths(cache_path):
+        os.remove(stale_path)
+    compressed_path = compressed_bulk_cache_path(cache_path, compression_level) if compression_level is not None else os.devnull
+    offsets = array.array("Q")
+    end = 0
+    compressed_end = 0
+    reader = create_mmap_reader(index, type, offset, num_lines, num_docs, bulk_size, bulk_size, id_conflicts, conflicts_seed)
+    with reader, open("%s.bulk" % cache_path, "wb") as bulks, open(compressed_path, "wb") as compressed_bulks:
+        for _, _, batch in reader:
+            for docs_in_bulk, body in batch:
+                bulks.write(body)
+                end += len(body)
+                if compression_level is not None:
+                    compressed_end += compressed_bulks.write(gzip.compress(body, compresslevel=compression_level))
+                offsets.extend([docs_in_bulk, end, compressed_end])
+    # the offsets file marks the cache as valid so we write it last
+    with open(offsets_path, "wb") as offsets_file:
+        offsets.tofile(offsets_file)
+    return cache_path
+
+
+def create_readers(num_clients, client_index, indices, batch_size, bulk_size, id_conflicts, create_reader, conflicts_seed=None):
     readers = []
     for index in indices:
         for type in index.types:
@@ -330,7 +633,8 @@ def create_readers(num_clients, client_index, indices, batch_size, bulk_size, id
             if num_docs > 0:
                 logger.info("Client [%d] will index [%d] docs starting from line offset [%d] for [%s/%s]" %
                             (client_index, num_docs, offset, index, type))
-                readers.append(create_reader(index, type, offset, num_lines, num_docs, batch_size, bulk_size, id_conflicts))
+                readers.append(create_reader(index, type, offset, num_lines, num_docs, batch_size, bulk_size, id_conflicts,
+                                             conflicts_seed))
             else:
                 logger.info("Client [%d] skips [%s/%s] (no documents to read)." % (client_index, index, type))
     return readers
@@ -362,12 +666,15 @@ def bounds(total_docs, client_index, num_clients, includes_action_and_meta_data)
     return offset, docs_per_client, lines_per_client
 
 
-def bulk_generator(readers, client_index, pipeline, original_params):
+def bulk_generator(readers, client_index, pipeline, original_params, compression_level=None):
     bulk_id = 0
     for index, type, batch in readers:
         # each batch can contain of one or more bulks
         for docs_in_bulk, bulk in batch:
             bulk_id += 1
+            # bodies from a compressed bulk cache are compressed already
+            if compression_level is not None and isinstance(bulk, bytes) and not isinstance(bulk, compression.PrecompressedBody):
+                bulk = compression.compress(bulk, compression_level)
             bulk_params = {
                 "index": index,
                 "type": type,
@@ -389,7 +696,7 @@ def bulk_generator(readers, client_index, pipeline, original_params):
 
 
 def bulk_data_based(num_clients, client_index, indices, batch_size, bulk_size, id_conflicts, pipeline, original_params,
-                    create_reader=create_default_reader):
+                    create_reader=create_default_reader, conflicts_seed=None, compression_level=None):
     """
     Calculates the necessary schedule for bulk operations.
 
@@ -403,10 +710,12 @@ def bulk_data_based(num_clients, client_index, indices, batch_size, bulk_size, i
     :param original_params: A dict of original parameters that were passed from the track. They will be merged into the returned parameters.
     :param create_reader: A function to create the index reader. By default a file based index reader will be created. This parameter is
                       intended for testing only.
+    :param conflicts_seed: The seed for random id conflicts. If ``None``, ids differ between runs.
+    :param compression_level: If set, bulk bodies are gzip-compressed with this level when they are generated.
     :return: A generator for the bulk operations of the given client.
     """
-    readers = create_readers(num_clients, client_index, indices, batch_size, bulk_size, id_conflicts, create_reader)
-    return bulk_generator(chain(*readers), client_index, pipeline, original_params)
+    readers = create_readers(num_clients, client_index, indices, batch_size, bulk_size, id_conflicts, create_reader, conflicts_seed)
+    return bulk_generator(chain(*readers), client_index, pipeline, original_params, compression_level)
 
 
 class GenerateActionMetaData:
@@ -479,6 +788,18 @@ class Slice:
                 raise StopIteration()
             return line.strip()
 
+    def read_lines(self, number_of_lines):
+        """
+        Reads up to ``number_of_lines`` lines in one go without crossing the end of this slice. The underlying source needs to support
+        ``read_lines`` (see ``io.MmapSource``).
+
+        :param number_of_lines: The maximum number of lines to read.
+        :return: A tuple of the number of lines that have been read and these lines as one block (including line separators).
+        """
+        lines_read, data = self.source.read_lines(min(number_of_lines, self.number_of_lines - self.current_line))
+        self.current_line += lines_read
+        return lines_read, data
+
     def __str__(self):
         return "%s[%d;%d]" % (self.source, self.offset, self.offset + self.number_of_lines)
 
@@ -545,6 +866,117 @@ class IndexDataReader:
         return False
 
 
+class MmapIndexDataReader(IndexDataReader):
+    """
+    Reads a memory-mapped file in bulks. In contrast to ``IndexDataReader`` it does not decode individual lines but returns each bulk as one
+    ready-to-send ``bytes`` body including action and meta-data lines. Lines are only stripped (like ``IndexDataReader`` does) if the
+    bulk contains carriage returns, i.e. the file has Windows line endings. Other whitespace at the start or end of lines is kept in files
+    with Unix line endings as it is insignificant in JSON.
+    """
+
+    def __enter__(self):
+        self.file_source.open(self.data_file, "rb")
+        return self
+
+    def read_bulk(self):
+        if isinstance(self.action_metadata, SourceActionMetaData):
+            lines_read, body = self.file_source.read_lines(2 * self.bulk_size)
+            return lines_read // 2, self._terminated(self._normalized(body))
+
+        docs_in_bulk, documents = self.file_source.read_lines(self.bulk_size)
+        if docs_in_bulk == 0:
+            return 0, b""
+        # strip the last line separator so we do not produce an empty document
+        documents = self._terminated(self._normalized(documents))[:-1].split(b"\n")
+        if self.action_metadata.conflicting_ids is None:
+            # the action and meta-data line is the same for all documents so we can interleave all of them in one go
+            action_metadata_line = ("%s\n" % next(self.action_metadata)).encode("utf-8")
+            body = action_metadata_line + (b"\n" + action_metadata_line).join(documents) + b"\n"
+        else:
+            # iterate documents first so we never generate more ids than needed
+            body = b"".join([("%s\n" % action_metadata_line).encode("utf-8") + document + b"\n"
+                             for document, action_metadata_line in zip(documents, self.action_metadata)])
+        return docs_in_bulk, body
+
+    @staticmethod
+    def _normalized(data):
+        # splitting into lines is expensive so we only do it for files with Windows line endings
+        if b"\r" not in data:
+            return data
+        return b"\n".join(line.strip() for line in data.split(b"\n"))
+
+    @staticmethod
+    def _terminated(data):
+        # the last line of a file may lack a line separator but the bulk API requires it
+        return data if len(data) == 0 or data.endswith(b"\n") else data + b"\n"
+
+
+class CachedIndexDataReader:
+    """
+    Reads pre-compiled bulk bodies from a cache (see ``compile_bulk_bodies``). Bodies are sliced directly from the memory-mapped cache so
+    no per-request body construction is necessary.
+    """
+
+    def __init__(self, cache_path, batch_size, index_name, type_name, compression_level=None):
+        """
+        :param cache_path: The path prefix of all cache files.
+        :param batch_size: The number of documents to read in one go.
+        :param index_name: The name of the index.
+        :param type_name: The name of the type.
+        :param compression_level: If set, compressed bodies of this compression level are read as well. They must exist in the cache.
+        """
+        self.cache_path = cache_path
+        self.compression_level = compression_level
+        self.batch_size = batch_size
+        self.index_name = index_name
+        self.type_name = type_name
+        self.offsets = None
+        self.bulks = None
+        self.compressed_bulks = None
+        self.current_bulk = 0
+
+    def __enter__(self):
+        self.offsets = array.array("Q")
+        with open("%s.offsets" % self.cache_path, "rb") as offsets_file:
+            self.offsets.frombytes(offsets_file.read())
+        self.bulks = io.MmapSource("%s.bulk" % self.cache_path).open()
+        if self.compression_level is not None:
+            self.compressed_bulks = io.MmapSource(compressed_bulk_cache_path(self.cache_path, self.compression_level)).open()
+        self.current_bulk = 0
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        batch = []
+        docs_in_batch = 0
+        number_of_bulks = len(self.offsets) // 3
+        while docs_in_batch < self.batch_size and self.current_bulk < number_of_bulks:
+            batch.append(self.read_bulk(self.current_bulk))
+            docs_in_batch += batch[-1][0]
+            self.current_bulk += 1
+        if docs_in_batch == 0:
+            raise StopIteration()
+        return self.index_name, self.type_name, batch
+
+    def read_bulk(self, i):
+        docs_in_bulk, end, compressed_end = self.offsets[3 * i:3 * i + 3]
+        start, compressed_start = self.offsets[3 * i - 2:3 * i] if i > 0 else (0, 0)
+        body = self.bulks.mm[start:end]
+        if self.compressed_bulks:
+            body = compression.PrecompressedBody(body, self.compressed_bulks.mm[compressed_start:compressed_end])
+        return docs_in_bulk, body
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.bulks.close()
+        if self.compressed_bulks:
+            self.compressed_bulks.close()
+        self.bulks = None
+        self.compressed_bulks = None
+        return False
+
+
 register_param_source_for_operation(track.OperationType.Index, BulkIndexParamSource)
 register_param_source_for_operation(track.OperationType.Search, SearchParamSource)
 
@@ -0,0 +1,43 @@
+import gzip
+import time
+
+# the gzip compression level of request bodies unless the client option ``compression_level`` is set (same as the gzip module)
+DEFAULT_COMPRESSION_LEVEL = 9
+
+
+class PrecompressedBody(bytes):
+    """
+    A request body that also carries its gzip-compressed representation so it does not need to be compressed on each request.
+    """
+    def __new__(cls, body, compressed, compression_time=None):
+        """
+        :param body: The uncompressed body.
+        :param compressed: The gzip-compressed body.
+        :param compression_time: The time in seconds it took to compress the body. ``None`` if unknown.
+        """
+        instance = super().__new__(cls, body)
+        instance.compressed = compressed
+        instance.compression_time = compression_time
+        return instance
+
+    def __reduce__(self):
+        # bodies are pickled when they are prefetched in a background process
+        return PrecompressedBody, (bytes(self), self.compressed, self.compression_time)
+
+    @property
+    def compression_ratio(self):
+        """
+        :return: The ratio of the uncompressed to the compressed size of this body.
+        """
+        return len(self) / len(self.compressed) if len(self.compressed) > 0 else 1.0
+
+
+def compress(body, compression_level=DEFAULT_COMPRESSION_LEVEL):
+    """
+    :param body: A request body as ``bytes``.
+    :param compression_level: The gzip compression level (1-9).
+    :return: A ``PrecompressedBody`` for ``body`` that also records how long compression took.
+    """
+    start = time.perf_counter()
+    compressed = gzip.compress(body, compresslevel=compression_level)
+    return PrecompressedBody(body, compressed, time.perf_counter() - start)
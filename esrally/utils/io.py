@@ -1,9 +1,16 @@
+import array
+import bisect
+import concurrent.futures
+import itertools
 import os
 import errno
+import mmap
 import re
+import shutil
 import subprocess
 import bz2
 import gzip
+import zlib
 import zipfile
 import tarfile
 import logging
@@ -52,6 +59,88 @@ class FileSource:
         return self.file_name
 
 
+class MmapSource:
+    """
+    MmapSource is a read-only wrapper around a memory-mapped file. In contrast to ``FileSource`` it returns ``bytes`` and finds line
+    boundaries directly in the mapped memory instead of decoding the file line by line.
+    """
+    def __init__(self, file_name, mode="rb"):
+        """
+        :param file_name: The name of the file to map.
+        :param mode: The file mode. It is ignored in this implementation as files are always mapped read-only in binary mode but kept to
+        implement the same interface as ``FileSource``.
+        """
+        self.file_name = file_name
+        self.mode = mode
+        self.f = None
+        self.mm = None
+        self.position = 0
+
+    def open(self):
+        self.f = open(self.file_name, mode="rb")
+        # empty files cannot be mapped
+        if os.fstat(self.f.fileno()).st_size > 0:
+            self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.mm = b""
+        self.position = 0
+        # allow for chaining
+        return self
+
+    def seek(self, offset):
+        self.position = offset
+
+    def tell(self):
+        return self.position
+
+    def read(self):
+        data = self.mm[self.position:]
+        self.position += len(data)
+        return data
+
+    def readline(self):
+        start = self.position
+        end = self.mm.find(b"\n", start)
+        self.position = len(self.mm) if end == -1 else end + 1
+        return self.mm[start:self.position]
+
+    def read_lines(self, number_of_lines):
+        """
+        Reads up to ``number_of_lines`` lines in one go.
+
+        :param number_of_lines: The maximum number of lines to read.
+        :return: A tuple of the number of lines that have been read and these lines as one ``bytes`` object including line separators.
+        """
+        start = self.position
+        end = start
+        size = len(self.mm)
+        lines_read = 0
+        while lines_read < number_of_lines and end < size:
+            line_end = self.mm.find(b"\n", end)
+            end = size if line_end == -1 else line_end + 1
+            lines_read += 1
+        self.position = end
+        return lines_read, self.mm[start:end]
+
+    def close(self):
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self.mm = None
+        self.f.close()
+        self.f = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def __str__(self, *args, **kwargs):
+        return self.file_name
+
+
 class DictStringFileSourceFactory:
     """
     Factory that can create `StringAsFileSource` for tests. Based on the provided dict, it will create a proper `StringAsFileSource`.
@@ -165,7 +254,16 @@ def compress(source_directory, archive_name):
     _zipdir(source_directory, archive)
 
 
-def decompress(zip_name, target_directory):
+# external decompressors which use multiple cores, in order of preference. They all understand "-d -c".
+PARALLEL_DECOMPRESSORS = {
+    ".bz2": ["pbzip2", "lbzip2"],
+    ".gz": ["pigz"]
+}
+# number of bytes that are read at once when decompressing single files
+DECOMPRESSION_BUFFER_SIZE = 1024 * 1024
+
+
+def decompress(zip_name, target_directory, offset_table_stride=None):
     """
     Decompresses the provided archive to the target directory. The following file extensions are supported:
 
@@ -177,34 +275,99 @@ def decompress(zip_name, target_directory):
     * tgz
     * tar.bz2
 
-    The decompression method is chosen based on the file extension.
+    The decompression method is chosen based on the file extension. Single bz2 and gz files are decompressed with a parallel
+    decompressor if one is available on the PATH (see ``PARALLEL_DECOMPRESSORS``) and with Python's own modules otherwise.
 
     :param zip_name: The full path name to the file that should be decompressed.
     :param target_directory: The directory to which files should be decompressed. May or may not exist prior to calling
     this function.
+    :param offset_table_stride: If set, a file offset table (see #prepare_file_offset_table()) with the provided stride is created while
+    decompressing single bz2 and gz files so the decompressed file does not need to be read again.
+    :return: The number of lines in the decompressed file if a file offset table has been created, ``None`` otherwise.
     """
     path_without_extension, extension = splitext(zip_name)
     filename = basename(path_without_extension)
     if extension == ".zip":
         _do_decompress(target_directory, zipfile.ZipFile(zip_name))
-    elif extension == ".bz2":
-        _do_decompress_manually(target_directory, filename, bz2.open(zip_name))
-    elif extension == ".gz":
-        _do_decompress_manually(target_directory, filename, gzip.open(zip_name))
+    elif extension in [".bz2", ".gz"]:
+        return _decompress_single_file(zip_name, lambda compressed_file: _do_decompress_manually(target_directory, filename,
+                                                                                               compressed_file, offset_table_stride))
     elif extension in [".tar", ".tar.gz", ".tgz", ".tar.bz2"]:
         _do_decompress(target_directory, tarfile.open(zip_name))
     else:
         raise RuntimeError("Unsupported file extension [%s]. Cannot decompress [%s]" % (extension, zip_name))
+    return None
+
+
+def _decompress_single_file(zip_name, consumer):
+    """
+    Decompresses a single bz2 or gz file.
 
+    :param zip_name: The full path name to the file that should be decompressed.
+    :param consumer: A function that reads the decompressed data from the file-like object that it gets passed.
+    :return: The return value of ``consumer``.
+    """
+    _, extension = splitext(zip_name)
+    decompressor = _parallel_decompressor(extension)
+    if decompressor:
+        try:
+            return _do_decompress_externally(decompressor, zip_name, consumer)
+        except RuntimeError as e:
+            logger.warning("Falling back to single-threaded decompression of [%s]: %s" % (zip_name, e))
+    compressed_file = bz2.open(zip_name) if extension == ".bz2" else gzip.open(zip_name)
+    try:
+        return consumer(compressed_file)
+    finally:
+        compressed_file.close()
 
-def _do_decompress_manually(target_directory, filename, compressed_file):
+
+def _parallel_decompressor(extension):
+    for decompressor in PARALLEL_DECOMPRESSORS.get(extension, []):
+        path = shutil.which(decompressor)
+        if path:
+            return path
+    return None
+
+
+def _do_decompress_externally(decompressor, zip_name, consumer):
+    logger.info("Decompressing [%s] with [%s]." % (zip_name, decompressor))
+    try:
+        p = subprocess.Popen([decompressor, "-d", "-c", zip_name], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError as e:
+        raise RuntimeError("Could not start [%s]: %s" % (decompressor, e))
+    try:
+        result = consumer(p.stdout)
+    except BaseException:
+        # don't leave the decompressor behind if we could not consume its output
+        p.kill()
+        p.wait()
+        raise
+    finally:
+        p.stdout.close()
+    return_code = p.wait()
+    if return_code != 0:
+        raise RuntimeError("[%s] exited with code [%d]." % (decompressor, return_code))
+    return result
+
+
+def _do_decompress_manually(target_directory, filename, compressed_file, offset_table_stride=None):
     ensure_dir(target_directory)
+    data_file_path = "%s/%s" % (target_directory, filename)
+    offset_table = _OffsetTableBuilder(0, 0, offset_table_stride) if offset_table_stride else None
     try:
-        with open("%s/%s" % (target_directory, filename), 'wb') as new_file:
-            for data in iter(lambda: compressed_file.read(100 * 1024), b''):
+        with open(data_file_path, 'wb') as new_file:
+            for data in iter(lambda: compressed_file.read(DECOMPRESSION_BUFFER_SIZE), b''):
                 new_file.write(data)
+                if offset_table:
+                    offset_table.add(data)
     finally:
         compressed_file.close()
+    if offset_table:
+        # written after the data file so it is considered up to date by #prepare_file_offset_table()
+        with open(_offset_table_path(data_file_path), mode="wb") as offset_file:
+            offset_file.write(offset_table.entries.tobytes())
+        return offset_table.number_of_lines()
+    return None
 
 
 def _do_decompress(target_directory, compressed_file):
@@ -229,6 +392,17 @@ def exists(path):
     return os.path.exists(path)
 
 
+def link(source_path, target_path):
+    """
+    Creates a hard link at ``target_path`` to ``source_path``. An existing file at ``target_path`` is replaced atomically.
+    """
+    tmp_path = "%s.%d.tmp-link" % (target_path, os.getpid())
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    os.link(source_path, tmp_path)
+    os.replace(tmp_path, target_path)
+
+
 def normalize_path(path, cwd="."):
     """
     Normalizes a path by removing redundant "../" and also expanding the "~" character to the user home directory.
@@ -265,28 +439,68 @@ def has_extension(file_name, extension):
     return ext == extension
 
 
-def prepare_file_offset_table(data_file_path):
+# number of lines between two entries in the file offset table
+DEFAULT_OFFSET_TABLE_STRIDE = 1000
+# number of bytes that are read at once when creating a file offset table
+OFFSET_TABLE_CHUNK_SIZE = 1024 * 1024
+# files are only scanned in parallel if each worker process can scan at least that many bytes
+OFFSET_TABLE_MIN_RANGE_SIZE = 64 * 1024 * 1024
+
+
+def _offset_table_path(data_file_path):
+    return "%s.offset.bin" % data_file_path
+
+
+def _legacy_offset_table_path(data_file_path):
+    return "%s.offset" % data_file_path
+
+
+def prepare_file_offset_table(data_file_path, stride=DEFAULT_OFFSET_TABLE_STRIDE, workers=None):
     """
     Creates a file that contains a mapping from line numbers to file offsets for the provided path. This file is used internally by
     #skip_lines(data_file_path, data_file) to speed up line skipping.
 
+    The file is a flat array of unsigned longs in native byte order. It contains a pair of line number and file offset of the following
+    line for every ``stride`` lines.
+
+    Large files are split into byte ranges which are scanned in parallel by worker processes.
+
     :param data_file_path: The path to a text file that is readable by this process.
+    :param stride: The number of lines between two entries in the file offset table.
+    :param workers: The maximum number of worker processes. Defaults to the number of CPUs.
     :return The number of lines read or ``None`` if it did not have to build the file offset table.
     """
-    offset_file_path = "%s.offset" % data_file_path
+    offset_file_path = _offset_table_path(data_file_path)
     # recreate only if necessary as this can be time-consuming
-    if not os.path.exists(offset_file_path) or os.path.getmtime(offset_file_path) < os.path.getmtime(data_file_path):
+    if not is_file_offset_table_valid(data_file_path):
         console.info("Preparing file offset table for [%s] ... " % data_file_path, end="", flush=True, logger=logger)
-        line_number = 0
-        with open(offset_file_path, mode="w") as offset_file:
-            with open(data_file_path, mode="rt") as data_file:
-                while True:
-                    line = data_file.readline()
-                    if len(line) == 0:
-                        break
+        size = os.path.getsize(data_file_path)
+        number_of_ranges = min(workers or os.cpu_count() or 1, -(-size // OFFSET_TABLE_MIN_RANGE_SIZE))
+        if number_of_ranges > 1:
+            starts = [size * i // number_of_ranges for i in range(number_of_ranges)]
+            ends = starts[1:] + [size]
+            with concurrent.futures.ProcessPoolExecutor(max_workers=number_of_ranges) as pool:
+                counts = list(pool.map(_count_lines, itertools.repeat(data_file_path), starts, ends))
+                # we need to know the line number at the start of each range before we can determine its entries
+                first_line_numbers = [0] + list(itertools.accumulate(counts))[:-1]
+                entries = list(pool.map(_offset_table_entries, itertools.repeat(data_file_path), starts, ends, first_line_numbers,
+                                        itertools.repeat(stride)))
+            line_number = sum(counts)
+            # the last line may not be terminated
+            with open(data_file_path, mode="rb") as data_file:
+                data_file.seek(size - 1)
+                if data_file.read(1) != b"\n":
                     line_number += 1
-                    if line_number % 50000 == 0:
-                        print("%d;%d" % (line_number, data_file.tell()), file=offset_file)
+        else:
+            # without parallelism we can count lines and determine entries in a single pass
+            offset_table = _OffsetTableBuilder(0, 0, stride)
+            for _, chunk in _chunks(data_file_path, 0, size):
+                offset_table.add(chunk)
+            entries = [offset_table.entries.tobytes()]
+            line_number = offset_table.number_of_lines()
+        with open(offset_file_path, mode="wb") as offset_file:
+            for raw_entries in entries:
+                offset_file.write(raw_entries)
         console.println("[OK]")
         return line_number
     else:
@@ -294,6 +508,92 @@ def prepare_file_offset_table(data_file_path):
         return None
 
 
+def is_file_offset_table_valid(data_file_path):
+    """
+    :param data_file_path: The path to a text file that is readable by this process.
+    :return: True iff a file offset table exists for the provided file and is at least as recent as the file itself.
+    """
+    offset_file_path = _offset_table_path(data_file_path)
+    return os.path.exists(offset_file_path) and os.path.getmtime(offset_file_path) >= os.path.getmtime(data_file_path)
+
+
+def link_file_offset_table(source_data_file_path, target_data_file_path):
+    """
+    Makes the file offset table of one text file available for another (identical) text file by creating a hard link.
+
+    :param source_data_file_path: The path to a text file that has a file offset table.
+    :param target_data_file_path: The path to an identical text file.
+    """
+    link(_offset_table_path(source_data_file_path), _offset_table_path(target_data_file_path))
+
+
+def _chunks(data_file_path, start, end):
+    """
+    :return: A generator of tuples of the absolute position and contents of all chunks in the range [``start``, ``end``).
+    """
+    if start == end:
+        return
+    with open(data_file_path, mode="rb") as data_file:
+        with mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for position in range(start, end, OFFSET_TABLE_CHUNK_SIZE):
+                yield position, mm[position:min(position + OFFSET_TABLE_CHUNK_SIZE, end)]
+
+
+def _count_lines(data_file_path, start, end):
+    """
+    :return: The number of line separators in the byte range [``start``, ``end``) of the provided file.
+    """
+    return sum(chunk.count(b"\n") for _, chunk in _chunks(data_file_path, start, end))
+
+
+def _offset_table_entries(data_file_path, start, end, first_line_number, stride):
+    """
+    :return: The raw file offset table entries for all line separators in the byte range [``start``, ``end``) of the provided file.
+    """
+    offset_table = _OffsetTableBuilder(start, first_line_number, stride)
+    for _, chunk in _chunks(data_file_path, start, end):
+        offset_table.add(chunk)
+    return offset_table.entries.tobytes()
+
+
+class _OffsetTableBuilder:
+    """
+    Determines file offset table entries for consecutive chunks of a file.
+    """
+    def __init__(self, position, line_number, stride):
+        """
+        :param position: The absolute position of the first chunk in the file.
+        :param line_number: The number of lines before the first chunk.
+        :param stride: The number of lines between two entries in the file offset table.
+        """
+        self.position = position
+        self.line_number = line_number
+        self.stride = stride
+        self.entries = array.array("Q")
+        self.last_byte = b"\n"
+
+    def add(self, chunk):
+        lines_in_chunk = chunk.count(b"\n")
+        # index of the first line separator in this chunk that completes a multiple of stride lines
+        first_entry = self.stride - self.line_number % self.stride - 1
+        # only look at individual lines if the chunk contains an entry
+        if first_entry < lines_in_chunk:
+            # the i-th line separator in this chunk is at position line_lengths[i] + i
+            line_lengths = list(itertools.accumulate(map(len, chunk.split(b"\n"))))
+            for i in range(first_entry, lines_in_chunk, self.stride):
+                self.entries.extend([self.line_number + i + 1, self.position + line_lengths[i] + i + 1])
+        self.line_number += lines_in_chunk
+        self.position += len(chunk)
+        if chunk:
+            self.last_byte = chunk[-1:]
+
+    def number_of_lines(self):
+        """
+        :return: The number of lines in all chunks so far including a last line that is not terminated.
+        """
+        return self.line_number if self.last_byte == b"\n" else self.line_number + 1
+
+
 def remove_file_offset_table(data_file_path):
     """
 
@@ -301,11 +601,54 @@ def remove_file_offset_table(data_file_path):
 
     :param data_file_path: The path to a text file that is readable by this process.
     """
-    offset_file_path = "%s.offset" % data_file_path
-    try:
-        os.remove(offset_file_path)
-    except OSError as e:
-        logger.debug("Error while attempting to delete [%s]: [%s]" % (offset_file_path, e))
+    for offset_file_path in [_offset_table_path(data_file_path), _legacy_offset_table_path(data_file_path)]:
+        try:
+            os.remove(offset_file_path)
+        except OSError as e:
+            logger.debug("Error while attempting to delete [%s]: [%s]" % (offset_file_path, e))
+
+
+class _LineNumbers:
+    """
+    A read-only sequence view of the line numbers in a file offset table so we can search them without copying.
+    """
+    def __init__(self, entries):
+        self.entries = entries
+
+    def __getitem__(self, i):
+        return self.entries[2 * i]
+
+    def __len__(self):
+        return len(self.entries) // 2
+
+
+def _closest_offset(data_file_path, number_of_lines_to_skip):
+    """
+    :return: A tuple of the closest line number that is less than or equal to ``number_of_lines_to_skip`` and its file offset according to
+    the file offset table.
+    """
+    offset_file_path = _offset_table_path(data_file_path)
+    if os.path.exists(offset_file_path):
+        with open(offset_file_path, mode="rb") as offset_file:
+            if os.fstat(offset_file.fileno()).st_size == 0:
+                return 0, 0
+            with mmap.mmap(offset_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as raw_entries, raw_entries.cast("Q") as entries:
+                    i = bisect.bisect_right(_LineNumbers(entries), number_of_lines_to_skip) - 1
+                    return (entries[2 * i], entries[2 * i + 1]) if i >= 0 else (0, 0)
+
+    # file offset tables of older versions are text files with one "line_number;offset" entry per line
+    line_number, offset = 0, 0
+    legacy_offset_file_path = _legacy_offset_table_path(data_file_path)
+    if os.path.exists(legacy_offset_file_path):
+        with open(legacy_offset_file_path) as offsets:
+            for line in offsets:
+                entry_line_number, entry_offset = [int(i) for i in line.strip().split(";")]
+                if entry_line_number <= number_of_lines_to_skip:
+                    line_number, offset = entry_line_number, entry_offset
+                else:
+                    break
+    return line_number, offset
 
 
 def skip_lines(data_file_path, data_file, number_of_lines_to_skip):
@@ -318,26 +661,244 @@ def skip_lines(data_file_path, data_file, number_of_lines_to_skip):
     """
     if number_of_lines_to_skip == 0:
         return
+    # block-compressed files can find lines on their own and don't need a file offset table
+    if isinstance(data_file, BlockCompressedSource):
+        data_file.skip_lines(number_of_lines_to_skip)
+        return
 
-    offset_file_path = "%s.offset" % data_file_path
-    offset = 0
-    remaining_lines = number_of_lines_to_skip
-    # can we fast forward?
-    if os.path.exists(offset_file_path):
-        with open(offset_file_path) as offsets:
-            for line in offsets:
-                line_number, offset_in_bytes = [int(i) for i in line.strip().split(";")]
-                if line_number <= number_of_lines_to_skip:
-                    offset = offset_in_bytes
-                    remaining_lines = number_of_lines_to_skip - line_number
-                else:
-                    break
+    line_number, offset = _closest_offset(data_file_path, number_of_lines_to_skip)
     # fast forward to the last known file offset
     data_file.seek(offset)
     # forward the last remaining lines if needed
-    if remaining_lines > 0:
-        for line in range(remaining_lines):
-            data_file.readline()
+    for _ in range(number_of_lines_to_skip - line_number):
+        data_file.readline()
+
+
+# compression level of blocks in block-compressed data files
+BLOCK_COMPRESSION_LEVEL = 6
+
+
+def _blocks_path(data_file_path):
+    return "%s.blocks.gz" % data_file_path
+
+
+def _block_index_path(data_file_path):
+    return "%s.blocks.idx" % data_file_path
+
+
+def is_block_compressed(data_file_path):
+    """
+    :param data_file_path: The path of a (possibly absent) text file.
+    :return: True iff the text file itself is absent but a block-compressed version of it (see #compress_blocks()) is available.
+    """
+    return not os.path.exists(data_file_path) and os.path.exists(_block_index_path(data_file_path))
+
+
+def block_compressed_mtime(data_file_path):
+    """
+    :return: The last modification time of the block-compressed version of the provided text file.
+    """
+    return os.path.getmtime(_block_index_path(data_file_path))
+
+
+def compress_blocks(source_path, data_file_path, lines_per_block=DEFAULT_OFFSET_TABLE_STRIDE):
+    """
+    Converts a text file into a block-compressed file so it can be read with random access without storing it uncompressed. The source
+    is either the text file itself or an archive that contains it. The result consists of two files:
+
+    * ``<data_file_path>.blocks.gz``: Independently gzip-compressed blocks of ``lines_per_block`` lines each. The file as a whole is also a
+      valid (multi-member) gzip file.
+    * ``<data_file_path>.blocks.idx``: The number of lines per block, the total number of lines and the end offset of each compressed
+      block (as unsigned longs).
+
+    After a successful conversion the uncompressed text file (if any) is removed.
+
+    :param source_path: The path to the uncompressed text file or an archive that contains it. Single bz2 and gz files are decompressed
+    on the fly, all other archives are decompressed to ``data_file_path`` first.
+    :param data_file_path: The path of the uncompressed text file.
+    :param lines_per_block: The number of lines in each block.
+    :return: The number of lines read or ``None`` if the block-compressed file is still valid.
+    """
+    index_path = _block_index_path(data_file_path)
+    # recreate only if necessary as this can be time-consuming
+    # the source may have been the (now removed) text file itself
+    if os.path.exists(index_path) and (not os.path.exists(source_path) or os.path.getmtime(index_path) >= os.path.getmtime(source_path)):
+        logger.info("Skipping creation of block-compressed file for [%s] as it is still valid." % data_file_path)
+        return None
+
+    console.info("Converting [%s] to a block-compressed file ... " % source_path, end="", flush=True, logger=logger)
+    _, extension = splitext(source_path)
+    blocks_path = _blocks_path(data_file_path)
+
+    def write_blocks(source):
+        with open(blocks_path, mode="wb") as blocks:
+            return _write_blocks(source, blocks, lines_per_block)
+
+    if extension in [".bz2", ".gz"]:
+        index = _decompress_single_file(source_path, write_blocks)
+    else:
+        if is_archive(source_path):
+            decompress(source_path, dirname(data_file_path))
+        with open(data_file_path, mode="rb") as source:
+            index = write_blocks(source)
+    # the index marks the block-compressed file as valid so we write it last
+    with open(index_path, mode="wb") as index_file:
+        index.tofile(index_file)
+    if os.path.exists(data_file_path):
+        logger.info("Removing [%s] as it is now available as a block-compressed file." % data_file_path)
+        os.remove(data_file_path)
+        remove_file_offset_table(data_file_path)
+    console.println("[OK]")
+    return index[1]
+
+
+def _write_blocks(source, blocks, lines_per_block):
+    """
+    Writes the contents of ``source`` to ``blocks`` as a sequence of independently compressed blocks.
+
+    :return: The block index as an array of unsigned longs.
+    """
+    index = array.array("Q", [lines_per_block, 0])
+    # lines of the current block (without line separators)
+    lines = []
+    # the last, possibly incomplete line that we have read so far
+    pending = b""
+
+    def write_block(block):
+        compressor = zlib.compressobj(BLOCK_COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        blocks.write(compressor.compress(block))
+        blocks.write(compressor.flush())
+        index.append(blocks.tell())
+
+    for data in iter(lambda: source.read(DECOMPRESSION_BUFFER_SIZE), b""):
+        index[1] += data.count(b"\n")
+        lines.extend((pending + data).split(b"\n"))
+        pending = lines.pop()
+        while len(lines) >= lines_per_block:
+            write_block(b"\n".join(lines[:lines_per_block]) + b"\n")
+            del lines[:lines_per_block]
+    if pending:
+        index[1] += 1
+        lines.append(pending)
+        write_block(b"\n".join(lines))
+    elif lines:
+        write_block(b"\n".join(lines) + b"\n")
+    return index
+
+
+def remove_block_compressed_file(data_file_path):
+    """
+    Attempts to remove the block-compressed version of the provided text file.
+
+    :param data_file_path: The path of the uncompressed text file.
+    """
+    for path in [_block_index_path(data_file_path), _blocks_path(data_file_path)]:
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.debug("Error while attempting to delete [%s]: [%s]" % (path, e))
+
+
+class BlockCompressedSource:
+    """
+    BlockCompressedSource reads the block-compressed version of a text file (see #compress_blocks()). It decompresses one block at a time
+    and can skip to any line by decompressing at most one block. Otherwise it implements the same interface as ``MmapSource``.
+    """
+    def __init__(self, file_name, mode="rb"):
+        """
+        :param file_name: The name of the uncompressed text file.
+        :param mode: The file mode. It is ignored in this implementation as block-compressed files are always read in binary mode.
+        """
+        self.file_name = file_name
+        self.mode = mode
+        self.f = None
+        self.lines_per_block = 0
+        self.block_ends = None
+        self.block_number = 0
+        self.block = b""
+        self.position = 0
+
+    def open(self):
+        index = array.array("Q")
+        with open(_block_index_path(self.file_name), mode="rb") as index_file:
+            index.frombytes(index_file.read())
+        self.lines_per_block = index[0]
+        self.block_ends = index[2:]
+        self.f = open(_blocks_path(self.file_name), mode="rb")
+        self._load_block(0)
+        # allow for chaining
+        return self
+
+    def _load_block(self, block_number):
+        self.block_number = block_number
+        self.position = 0
+        if block_number < len(self.block_ends):
+            start = self.block_ends[block_number - 1] if block_number > 0 else 0
+            self.f.seek(start)
+            self.block = zlib.decompress(self.f.read(self.block_ends[block_number] - start), 16 + zlib.MAX_WBITS)
+        else:
+            self.block = b""
+
+    def _ensure_data(self):
+        """
+        :return: True iff there is data left to read in the current block (after advancing to the next block if necessary).
+        """
+        if self.position >= len(self.block) and self.block_number < len(self.block_ends):
+            self._load_block(self.block_number + 1)
+        return self.position < len(self.block)
+
+    def skip_lines(self, number_of_lines_to_skip):
+        """
+        Skips the first ``number_of_lines_to_skip`` lines. The source needs to be positioned at the beginning of the file.
+        """
+        self._load_block(number_of_lines_to_skip // self.lines_per_block)
+        for _ in range(number_of_lines_to_skip % self.lines_per_block):
+            self.readline()
+
+    def readline(self):
+        if not self._ensure_data():
+            return b""
+        start = self.position
+        end = self.block.find(b"\n", start)
+        self.position = len(self.block) if end == -1 else end + 1
+        return self.block[start:self.position]
+
+    def read_lines(self, number_of_lines):
+        """
+        Reads up to ``number_of_lines`` lines in one go.
+
+        :param number_of_lines: The maximum number of lines to read.
+        :return: A tuple of the number of lines that have been read and these lines as one ``bytes`` object including line separators.
+        """
+        parts = []
+        lines_read = 0
+        while lines_read < number_of_lines and self._ensure_data():
+            start = self.position
+            end = start
+            size = len(self.block)
+            while lines_read < number_of_lines and end < size:
+                line_end = self.block.find(b"\n", end)
+                end = size if line_end == -1 else line_end + 1
+                lines_read += 1
+            self.position = end
+            parts.append(self.block[start:end])
+        return lines_read, b"".join(parts)
+
+    def close(self):
+        self.f.close()
+        self.f = None
+        self.block = b""
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def __str__(self, *args, **kwargs):
+        return _blocks_path(self.file_name)
 
 
 def get_size(start_path="."):
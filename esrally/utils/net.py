@@ -1,5 +1,10 @@
+import concurrent.futures
+import hashlib
+import json
 import logging
 import os
+import threading
+import urllib.error
 
 import certifi
 import urllib3
@@ -42,51 +47,260 @@ class Progress:
         self.p.finish()
 
 
-def download(url, local_path, expected_size_in_bytes=None, progress_indicator=None):
+# number of bytes that are read from the network and written to disk at once
+DOWNLOAD_BUFFER_SIZE = 1024 * 1024
+# large files are downloaded over up to that many connections in parallel
+DEFAULT_DOWNLOAD_CONNECTIONS = 4
+# files are only downloaded in parallel if each connection can fetch at least that many bytes
+PARALLEL_DOWNLOAD_MIN_SEGMENT_SIZE = 32 * 1024 * 1024
+# number of attempts to download a segment before giving up
+SEGMENT_DOWNLOAD_ATTEMPTS = 3
+
+
+def download(url, local_path, expected_size_in_bytes=None, progress_indicator=None, expected_checksum=None,
+             connections=DEFAULT_DOWNLOAD_CONNECTIONS):
     """
     Downloads a single file from a URL to the provided local path.
 
+    Data are written to ``local_path`` + ".tmp" first. If the server supports range requests, large files are split into segments which
+    are downloaded over several connections and an interrupted download is resumed from where it has stopped the next time this function
+    is called. The progress of all segments is tracked in ``local_path`` + ".tmp.state".
+
     :param url: The remote URL specifying one file that should be downloaded. May be either a HTTP or HTTPS URL.
     :param local_path: The local file name of the file that should be downloaded.
     :param expected_size_in_bytes: The expected file size in bytes if known. It will be used to verify that all data have been downloaded.
     :param progress_indicator A callable that can be use to report progress to the user. It is expected to take two parameters 
     ``bytes_read`` and ``total_bytes``. If not provided, no progress is shown. Note that ``total_bytes`` is derived from 
     the ``Content-Length`` header and not from the parameter ``expected_size_in_bytes``.
+    :param expected_checksum: An optional tuple of a hash algorithm name (as understood by ``hashlib``) and the expected hex digest of the
+    file. The checksum is calculated while the file is downloaded.
+    :param connections: The maximum number of parallel connections.
     """
     tmp_data_set_path = local_path + ".tmp"
+    state_path = tmp_data_set_path + ".state"
+    size_from_content_header, etag, ranges_supported = _probe(url)
+    # we can only resume or split downloads if we know what we get
+    resumable = ranges_supported and size_from_content_header is not None
+    segments = _resumable_segments(tmp_data_set_path, state_path, url, size_from_content_header, etag) if resumable else None
+    if segments:
+        logger.info("Resuming download of [%s] to [%s] at [%d] bytes." % (url, tmp_data_set_path, sum(s.done for s in segments)))
+    else:
+        if resumable:
+            segments = _segments(size_from_content_header, connections)
+        else:
+            segments = [_Segment(0, size_from_content_header)]
+        with open(tmp_data_set_path, "wb") as out_file:
+            if resumable:
+                out_file.truncate(size_from_content_header)
+    logger.info("Downloading [%s] to [%s] over [%d] connection(s)." % (url, tmp_data_set_path, len(segments)))
+
+    checksum = _StreamingChecksum(expected_checksum[0], tmp_data_set_path, segments) if expected_checksum else None
+    stopped = threading.Event()
+    # segments of a resumed download may be complete already. A range request for them would be invalid.
+    incomplete_segments = [segment for segment in segments if not segment.complete]
     try:
-        with __http().request("GET", url, preload_content=False, retries=10,
-                              timeout=urllib3.Timeout(connect=45, read=240)) as r, open(tmp_data_set_path, "wb") as out_file:
-            # noinspection PyBroadException
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(incomplete_segments))) as pool:
+            futures = [pool.submit(_download_segment, url, tmp_data_set_path, segment, resumable, stopped)
+                       for segment in incomplete_segments]
             try:
-                size_from_content_header = int(r.getheader("Content-Length"))
-            except BaseException:
-                size_from_content_header = None
-
-            chunk_size = 16 * 1014
-            bytes_read = 0
-            while True:
-                chunk = r.read(chunk_size)
-                if not chunk:
-                    break
-                out_file.write(chunk)
-                bytes_read += len(chunk)
-                if progress_indicator and size_from_content_header:
-                    progress_indicator(bytes_read, size_from_content_header)
-    except:
-        if os.path.isfile(tmp_data_set_path):
+                pending = futures
+                while pending:
+                    done, pending = concurrent.futures.wait(pending, timeout=0.5, return_when=concurrent.futures.FIRST_EXCEPTION)
+                    if any(f.exception() for f in done):
+                        break
+                    if progress_indicator and size_from_content_header:
+                        progress_indicator(sum(s.done for s in segments), size_from_content_header)
+                    if checksum:
+                        checksum.update()
+                    if resumable:
+                        _save_state(state_path, url, size_from_content_header, etag, segments)
+            finally:
+                # let all other connections stop early if one has failed or we got interrupted
+                stopped.set()
+        for f in futures:
+            f.result()
+    except BaseException:
+        if resumable:
+            _save_state(state_path, url, size_from_content_header, etag, segments)
+            logger.info("Keeping [%s] to resume the download later." % tmp_data_set_path)
+        elif os.path.isfile(tmp_data_set_path):
             os.remove(tmp_data_set_path)
         raise
     else:
+        if checksum:
+            checksum.update(final=True)
+        _remove(state_path)
         download_size = os.path.getsize(tmp_data_set_path)
         if expected_size_in_bytes is not None and download_size != expected_size_in_bytes:
-            if os.path.isfile(tmp_data_set_path):
-                os.remove(tmp_data_set_path)
+            _remove(tmp_data_set_path)
             raise exceptions.DataError("Download of [%s] is corrupt. Downloaded [%d] bytes but [%d] bytes are expected. Please retry." %
                                        (local_path, download_size, expected_size_in_bytes))
+        if checksum and checksum.hexdigest() != expected_checksum[1].lower():
+            _remove(tmp_data_set_path)
+            raise exceptions.DataError("Download of [%s] is corrupt. Expected %s checksum [%s] but got [%s]. Please retry." %
+                                       (local_path, expected_checksum[0], expected_checksum[1], checksum.hexdigest()))
         os.rename(tmp_data_set_path, local_path)
 
 
+class _Segment:
+    """
+    A byte range [``start``, ``end``) of a file that is downloaded over one connection. ``end`` is ``None`` if the file size is unknown.
+    """
+    def __init__(self, start, end, done=0):
+        self.start = start
+        self.end = end
+        # number of bytes of this segment that have been written to disk
+        self.done = done
+
+    @property
+    def position(self):
+        return self.start + self.done
+
+    @property
+    def complete(self):
+        return self.end is not None and self.position >= self.end
+
+
+def _segments(size, connections):
+    count = max(1, min(connections, size // PARALLEL_DOWNLOAD_MIN_SEGMENT_SIZE))
+    return [_Segment(size * i // count, size * (i + 1) // count) for i in range(count)]
+
+
+def _probe(url):
+    """
+    :return: A tuple of the file size (if known), its entity tag (if any) and whether the server supports range requests for ``url``.
+    """
+    # noinspection PyBroadException
+    try:
+        r = __http().request("HEAD", url, retries=10, timeout=urllib3.Timeout(connect=45, read=240))
+        if r.status != 200:
+            return None, None, False
+        size = r.headers.get("Content-Length")
+        return int(size) if size else None, r.headers.get("ETag"), r.headers.get("Accept-Ranges") == "bytes"
+    except BaseException:
+        logger.exception("Could not determine whether [%s] supports range requests." % url)
+        return None, None, False
+
+
+def _resumable_segments(tmp_data_set_path, state_path, url, size, etag):
+    """
+    :return: The segments of an interrupted download of the same file or ``None`` if the download cannot be resumed.
+    """
+    if not os.path.isfile(tmp_data_set_path):
+        return None
+    if os.path.isfile(state_path):
+        with open(state_path, "rt") as f:
+            state = json.load(f)
+        if state["url"] != url or state["size"] != size or state["etag"] != etag:
+            logger.info("Cannot resume download of [%s] as the remote file has changed." % url)
+            return None
+        return [_Segment(start, end, done) for start, end, done in state["segments"]]
+    # a plain partial download (e.g. from earlier versions)
+    partial_size = os.path.getsize(tmp_data_set_path)
+    if 0 < partial_size < size:
+        return [_Segment(0, size, partial_size)]
+    return None
+
+
+def _save_state(state_path, url, size, etag, segments):
+    with open(state_path, "wt") as f:
+        json.dump({"url": url, "size": size, "etag": etag, "segments": [[s.start, s.end, s.done] for s in segments]}, f)
+
+
+def _remove(path):
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+def _download_segment(url, tmp_data_set_path, segment, resumable, stopped):
+    if segment.complete:
+        return
+    for attempt in range(1, SEGMENT_DOWNLOAD_ATTEMPTS + 1):
+        try:
+            _do_download_segment(url, tmp_data_set_path, segment, resumable, stopped)
+            return
+        except (urllib3.exceptions.HTTPError, exceptions.DataError):
+            # we can only continue where we have stopped if the server supports range requests and we know the file size
+            if attempt == SEGMENT_DOWNLOAD_ATTEMPTS or not resumable or stopped.is_set():
+                raise
+            logger.exception("Attempt [%d] to download bytes [%d, %d) of [%s] has failed. Retrying." %
+                             (attempt, segment.position, segment.end, url))
+
+
+def _do_download_segment(url, tmp_data_set_path, segment, resumable, stopped):
+    headers = {"Range": "bytes=%d-%d" % (segment.position, segment.end - 1)} if resumable else None
+    with __http().request("GET", url, headers=headers, preload_content=False, retries=10,
+                          timeout=urllib3.Timeout(connect=45, read=240)) as r, open(tmp_data_set_path, "r+b", buffering=0) as out_file:
+        if r.status not in [200, 206]:
+            raise urllib.error.HTTPError(url, r.status, r.reason, r.headers, None)
+        if resumable and r.status != 206:
+            raise exceptions.DataError("Cannot download bytes [%d, %d) of [%s] as the server has ignored the range request." %
+                                       (segment.position, segment.end, url))
+        out_file.seek(segment.position)
+        while not stopped.is_set() and not segment.complete:
+            chunk = r.read(DOWNLOAD_BUFFER_SIZE)
+            if not chunk:
+                break
+            # data are on disk before we mark them as done so we never resume after a gap
+            out_file.write(chunk)
+            segment.done += len(chunk)
+    if not stopped.is_set() and segment.end is not None and not segment.complete:
+        raise exceptions.DataError("Connection closed after [%d] of [%d] bytes of [%s]." % (segment.position, segment.end, url))
+
+
+class _StreamingChecksum:
+    """
+    Calculates the checksum of a file while its segments are being downloaded by hashing all data that are contiguously available from
+    the start of the file.
+    """
+    def __init__(self, algorithm, path, segments):
+        self.hash = hashlib.new(algorithm)
+        self.path = path
+        self.segments = segments
+        self.segment_index = 0
+        self.position = 0
+
+    def update(self, final=False):
+        """
+        :param final: Whether all segments have been downloaded completely.
+        """
+        with open(self.path, "rb") as f:
+            f.seek(self.position)
+            while self.segment_index < len(self.segments):
+                segment = self.segments[self.segment_index]
+                for data in iter(lambda: f.read(min(DOWNLOAD_BUFFER_SIZE, segment.position - self.position)), b""):
+                    self.hash.update(data)
+                    self.position += len(data)
+                if segment.complete or final:
+                    self.segment_index += 1
+                else:
+                    break
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+def retrieve_checksum(url, algorithm="sha1"):
+    """
+    Retrieves the checksum that is published next to a file (e.g. ``elasticsearch-5.0.0.tar.gz.sha1``).
+
+    :param url: The URL of the file.
+    :param algorithm: A hash algorithm name. It is also used as file extension of the checksum file.
+    :return: A tuple of the algorithm and the hex digest or ``None`` if no checksum is available.
+    """
+    checksum_url = "%s.%s" % (url, algorithm)
+    # noinspection PyBroadException
+    try:
+        r = __http().request("GET", checksum_url, retries=3, timeout=urllib3.Timeout(connect=10, read=30))
+        if r.status == 200:
+            # checksum files contain either just the digest or the digest followed by the file name
+            return algorithm, r.data.decode("utf-8").split()[0]
+        logger.info("No checksum available at [%s] (HTTP status [%d])." % (checksum_url, r.status))
+    except BaseException:
+        logger.exception("Could not retrieve checksum from [%s]." % checksum_url)
+    return None
+
+
 def retrieve_content_as_string(url):
     with __http().request("GET", url, timeout=urllib3.Timeout(connect=45, read=240)) as response:
         return response.read().decode("utf-8")
@@ -28,6 +28,8 @@ install_requires = [
     "Jinja2==2.9.5",
     # remote messaging
     "thespian==3.7.3",
+    # esrally.client.ConnectionPools relies on internals of urllib3 1.x connection pools
+    "urllib3>=1.21.1,<2.0",
     # recommended library for thespian to identify actors more easily with `ps`
     # "setproctitle==1.1.10",
     # always use the latest version, these are certificate files...
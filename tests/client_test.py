@@ -0,0 +1,182 @@
+import gzip
+import http.server
+import json
+import socketserver
+import threading
+from unittest import TestCase
+
+import elasticsearch
+
+from esrally import client
+from esrally.utils import compression
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class RecordingRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Records all requests and responds with ``server.response_status`` and ``server.response_body``.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections.append(self.client_address)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append((self.path, dict(self.headers), body, self.client_address))
+        self.send_response(self.server.response_status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.server.response_body)))
+        self.end_headers()
+        self.wfile.write(self.server.response_body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ServerTestCase(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RecordingRequestHandler)
+        self.server.requests = []
+        self.server.connections = []
+        self.server.response_status = 200
+        self.server.response_body = b'{"took":3,"errors":false,"items":[{"index":{"status":201}}]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.hosts = [{"host": "127.0.0.1", "port": self.server.server_address[1]}]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+
+class LeanTransportTests(ServerTestCase):
+    def test_skips_parsing_bulk_response_without_errors(self):
+        transport = client.LeanTransport(self.hosts, {"http_auth": ("user", "password")})
+
+        self.assertEqual({"errors": False}, transport.bulk("/_bulk", {"pipeline": "p"}, b'{"index":{}}\n{"a":1}\n'))
+        self.server.response_body = b'{"errors":false}'
+        self.assertEqual({"errors": False}, transport.bulk("/_bulk", {"filter_path": "errors"}, b'{"index":{}}\n{"a":1}\n'))
+        self.server.response_body = b'{"took":3,"errors":false,"items":[{"index":{"status":201}}]}'
+        self.assertEqual({"took": 3, "errors": False, "items": [{"index": {"status": 201}}]},
+                         transport.bulk("/_bulk", {}, b'{"index":{}}\n{"a":1}\n', parse_items=True))
+
+        self.assertEqual(3, len(self.server.requests))
+        path, headers, body, client_address = self.server.requests[0]
+        self.assertEqual("/_bulk?pipeline=p", path)
+        self.assertEqual("Basic dXNlcjpwYXNzd29yZA==", headers["authorization"])
+        self.assertEqual(b'{"index":{}}\n{"a":1}\n', body)
+        # the connection is kept alive
+        self.assertEqual(client_address, self.server.requests[2][3])
+
+    def test_parses_bulk_response_with_errors(self):
+        self.server.response_body = b'{"took":3,"errors":true,"items":[{"index":{"status":429}}]}'
+        transport = client.LeanTransport(self.hosts, {})
+
+        self.assertEqual({"took": 3, "errors": True, "items": [{"index": {"status": 429}}]},
+                         transport.bulk("/logs/type/_bulk", {}, b'{"a":1}\n'))
+
+    def test_sends_precompressed_body(self):
+        transport = client.LeanTransport(self.hosts, {"compressed": True})
+        body = compression.PrecompressedBody(b'{"a":1}\n', gzip.compress(b'{"a":1}\n'))
+
+        transport.bulk("/logs/type/_bulk", {}, body)
+
+        path, headers, sent_body, _ = self.server.requests[0]
+        self.assertEqual("gzip", headers["content-encoding"])
+        self.assertEqual(body.compressed, sent_body)
+
+    def test_compresses_body_with_configured_level(self):
+        transport = client.LeanTransport(self.hosts, {"compressed": True, "compression_level": 1})
+        body = b'{"a":1}\n' * 100
+
+        transport.bulk("/logs/type/_bulk", {}, body)
+
+        _, _, sent_body, _ = self.server.requests[0]
+        # skip the gzip header as it contains a timestamp
+        self.assertEqual(gzip.compress(body, compresslevel=1)[10:], sent_body[10:])
+
+    def test_raises_transport_errors_like_elasticsearch_py(self):
+        self.server.response_status = 404
+        self.server.response_body = json.dumps({"error": {"type": "index_not_found_exception"}, "status": 404}).encode("utf-8")
+        transport = client.LeanTransport(self.hosts, {})
+
+        with self.assertRaises(elasticsearch.NotFoundError) as ctx:
+            transport.bulk("/logs/type/_bulk", {}, b'{"a":1}\n')
+        self.assertEqual(404, ctx.exception.status_code)
+        self.assertEqual("index_not_found_exception", ctx.exception.error)
+
+    def test_raises_connection_errors_like_elasticsearch_py(self):
+        self.server.shutdown()
+        self.server.server_close()
+        transport = client.LeanTransport(self.hosts, {})
+
+        with self.assertRaises(elasticsearch.ConnectionError) as ctx:
+            transport.bulk("/_bulk", {}, b'{"a":1}\n')
+        self.assertEqual("N/A", ctx.exception.status_code)
+
+
+class ConnectionPoolsTests(ServerTestCase):
+    def test_clients_share_warm_connections(self):
+        connection_pools = client.ConnectionPools(clients=2)
+        factory = client.EsClientFactory(self.hosts, {"timeout": 60, "lean_transport": True}, connection_pools)
+        clients = [factory.create(), factory.create()]
+
+        connection_pools.warm()
+        # the lean transport uses the same connections as the Elasticsearch client
+        self.assertEqual(1, len(connection_pools.pools))
+        pool = next(iter(connection_pools.pools.values()))
+        self.assertTrue(all(connection.sock is not None for connection in pool.pool.queue))
+
+        for es in clients:
+            es.lean_transport.bulk("/_bulk", {}, b'{"index":{}}\n{"a":1}\n')
+            es.transport.perform_request("POST", "/_bulk", body=b'{"index":{}}\n{"a":1}\n')
+
+        self.assertEqual(4, len(self.server.requests))
+        # no further connections have been opened
+        self.assertEqual(2, len(self.server.connections))
+
+    def test_records_time_waiting_for_a_free_connection(self):
+        connection_pools = client.ConnectionPools(clients=1)
+        transport = client.LeanTransport(self.hosts, {}, connection_pools)
+        pool, _ = transport.pools[0]
+        client.POOL_WAIT_TIME.pop()
+
+        # a client that holds the only connection for a while
+        connection = pool._get_conn()
+        threading.Timer(0.2, pool._put_conn, args=[connection]).start()
+        client.POOL_WAIT_TIME.pop()
+
+        transport.bulk("/_bulk", {}, b'{"index":{}}\n{"a":1}\n')
+
+        self.assertGreaterEqual(client.POOL_WAIT_TIME.pop(), 0.1)
+        self.assertEqual(0, client.POOL_WAIT_TIME.pop())
+
+
+class ElasticsearchClientTests(ServerTestCase):
+    def test_compresses_requests(self):
+        es = client.EsClientFactory(self.hosts, {"compressed": True, "compression_level": 1}).create()
+        body = b'{"a":1}\n' * 100
+
+        es.transport.perform_request("POST", "/_bulk", body=body)
+        es.transport.perform_request("POST", "/_bulk", body=compression.PrecompressedBody(body, b"precompressed"))
+
+        # skip the gzip header as it contains a timestamp
+        self.assertEqual(gzip.compress(body, compresslevel=1)[10:], self.server.requests[0][2][10:])
+        self.assertEqual(b"precompressed", self.server.requests[1][2])
+
+
+class EsClientFactoryTests(TestCase):
+    def test_creates_lean_transport_only_if_enabled(self):
+        client_options = {"timeout": 60, "lean_transport": True}
+        es = client.EsClientFactory([{"host": "127.0.0.1", "port": 9200}], client_options).create()
+        self.assertIsInstance(es.lean_transport, client.LeanTransport)
+        # the option is not passed to the Elasticsearch client
+        self.assertNotIn("lean_transport", es.transport.kwargs)
+
+        es = client.EsClientFactory([{"host": "127.0.0.1", "port": 9200}], {"timeout": 60}).create()
+        self.assertFalse(hasattr(es, "lean_transport"))
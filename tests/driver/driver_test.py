@@ -1,3 +1,8 @@
+import array
+import pickle
+import sys
+import time
+import zlib
 import unittest.mock as mock
 import threading
 import collections
@@ -176,6 +181,164 @@ class DriverTests(TestCase):
         self.assertEqual(4, target.drive_at.call_count)
 
 
+    @mock.patch("esrally.driver.driver.setup_template")
+    @mock.patch("esrally.driver.driver.setup_index")
+    @mock.patch("esrally.driver.driver.wait_for_status")
+    @mock.patch("esrally.utils.net.resolve")
+    def test_async_load_generator_drives_all_clients_of_a_host(self, resolve, wait_for_status, setup_index, setup_template):
+        self.cfg.add(config.Scope.applicationOverride, "driver", "load_driver_hosts", ["10.5.5.1", "10.5.5.2"])
+        self.cfg.add(config.Scope.applicationOverride, "driver", "load_driver_mode", "asyncio")
+        resolve.side_effect = ["10.5.5.1", "10.5.5.2"]
+
+        target = self.create_test_driver_target()
+        target.create_async_load_generator.side_effect = ["worker_marker_0", "worker_marker_1"]
+        d = driver.Driver(target, self.cfg)
+
+        d.start_benchmark(t=self.track, lap=1, metrics_meta_info={})
+        d.after_track_prepared()
+
+        target.create_client.assert_not_called()
+        target.create_async_load_generator.assert_has_calls(calls=[
+            mock.call(0, "10.5.5.1"),
+            mock.call(1, "10.5.5.2"),
+        ])
+        self.assertEqual(2, target.start_async_load_generator.call_count)
+        self.assertEqual([[0, 2], [1, 3]], d.clients_per_driver)
+        target.on_workers_allocated.assert_called_once_with(1)
+        self.assertEqual([0, 2], sorted(target.start_async_load_generator.call_args_list[0][0][4].keys()))
+        self.assertEqual([1, 3], sorted(target.start_async_load_generator.call_args_list[1][0][4].keys()))
+
+        # all four clients need to reach the join point
+        for client_id in range(3):
+            d.joinpoint_reached(client_id=client_id, client_local_timestamp=10, task=driver.JoinPoint(id=0))
+            self.assertEqual(-1, d.current_step)
+        d.joinpoint_reached(client_id=3, client_local_timestamp=10, task=driver.JoinPoint(id=0))
+        self.assertEqual(0, d.current_step)
+
+        # ... but we only need to tell each load generator once to continue
+        target.drive_at.assert_has_calls(calls=[
+            mock.call("worker_marker_0", mock.ANY),
+            mock.call("worker_marker_1", mock.ANY),
+        ])
+        self.assertEqual(2, target.drive_at.call_count)
+
+    @mock.patch("esrally.driver.driver.setup_template")
+    @mock.patch("esrally.driver.driver.setup_index")
+    @mock.patch("esrally.driver.driver.wait_for_status")
+    def test_process_pool_distributes_clients_across_workers(self, wait_for_status, setup_index, setup_template):
+        self.cfg.add(config.Scope.applicationOverride, "driver", "load_driver_mode", "process-pool")
+        self.cfg.add(config.Scope.applicationOverride, "driver", "load_driver_workers", 3)
+
+        target = self.create_test_driver_target()
+        d = driver.Driver(target, self.cfg)
+
+        d.start_benchmark(t=self.track, lap=1, metrics_meta_info={})
+        d.after_track_prepared()
+
+        target.create_client.assert_not_called()
+        target.create_async_load_generator.assert_has_calls(calls=[
+            mock.call(0, "localhost"),
+            mock.call(1, "localhost"),
+            mock.call(2, "localhost"),
+        ])
+        self.assertEqual(3, target.start_async_load_generator.call_count)
+        self.assertEqual([[0, 3], [1], [2]], d.clients_per_driver)
+        target.on_workers_allocated.assert_called_once_with(3)
+
+    @mock.patch("esrally.driver.driver.setup_template")
+    @mock.patch("esrally.driver.driver.setup_index")
+    @mock.patch("esrally.driver.driver.wait_for_status")
+    def test_process_pool_defaults_to_one_worker_per_cpu_core_of_load_driver_host(self, wait_for_status, setup_index, setup_template):
+        self.cfg.add(config.Scope.applicationOverride, "driver", "load_driver_mode", "process-pool")
+
+        target = self.create_test_driver_target()
+        d = driver.Driver(target, self.cfg)
+
+        d.start_benchmark(t=self.track, lap=1, metrics_meta_info={})
+        d.load_driver_host_prepared(0, 2)
+        d.after_track_prepared()
+
+        target.create_async_load_generator.assert_has_calls(calls=[
+            mock.call(0, "localhost"),
+            mock.call(1, "localhost"),
+        ])
+        self.assertEqual([[0, 2], [1, 3]], d.clients_per_driver)
+        target.on_workers_allocated.assert_called_once_with(2)
+
+    @mock.patch("esrally.driver.driver.setup_template")
+    @mock.patch("esrally.driver.driver.setup_index")
+    @mock.patch("esrally.driver.driver.wait_for_status")
+    @mock.patch("esrally.utils.net.resolve")
+    def test_process_pool_records_workers_of_each_load_driver_host(self, resolve, wait_for_status, setup_index, setup_template):
+        self.cfg.add(config.Scope.applicationOverride, "driver", "load_driver_hosts", ["10.5.5.1", "10.5.5.2"])
+        self.cfg.add(config.Scope.applicationOverride, "driver", "load_driver_mode", "process-pool")
+        resolve.side_effect = ["10.5.5.1", "10.5.5.2"]
+
+        target = self.create_test_driver_target()
+        d = driver.Driver(target, self.cfg)
+
+        d.start_benchmark(t=self.track, lap=1, metrics_meta_info={})
+        d.load_driver_host_prepared(0, 1)
+        d.load_driver_host_prepared(1, 2)
+        d.after_track_prepared()
+
+        self.assertEqual([[0, 2], [1], [3]], d.clients_per_driver)
+        target.on_workers_allocated.assert_called_once_with([1, 2])
+
+    @mock.patch("esrally.driver.driver.setup_template")
+    @mock.patch("esrally.driver.driver.setup_index")
+    @mock.patch("esrally.driver.driver.wait_for_status")
+    def test_stores_pool_wait_time_if_clients_share_connection_pools(self, wait_for_status, setup_index, setup_template):
+        self.cfg.add(config.Scope.applicationOverride, "driver", "load_driver_mode", "asyncio")
+
+        target = self.create_test_driver_target()
+        d = driver.Driver(target, self.cfg)
+
+        d.start_benchmark(t=self.track, lap=1, metrics_meta_info={metrics.MetaInfoScope.cluster: {}, metrics.MetaInfoScope.node: {}})
+        d.after_track_prepared()
+
+        task = self.track.find_challenge_or_default("default").schedule[0]
+        buffer = driver.SampleBuffer(0, task)
+        buffer.add(1470838595, 1, metrics.SampleType.Normal, None, 10, 5, 1000, "docs", 1, 1.0, pool_wait_ms=2)
+        d.update_samples([buffer])
+
+        self.assertEqual([2], d.metrics_store.get("pool_wait_time", operation="index"))
+
+    @mock.patch("esrally.driver.driver.setup_template")
+    @mock.patch("esrally.driver.driver.setup_index")
+    @mock.patch("esrally.driver.driver.wait_for_status")
+    def test_stores_latency_on_arrival_and_throughput_at_join_point(self, wait_for_status, setup_index, setup_template):
+        target = self.create_test_driver_target()
+        d = driver.Driver(target, self.cfg)
+
+        d.start_benchmark(t=self.track, lap=1, metrics_meta_info={metrics.MetaInfoScope.cluster: {}, metrics.MetaInfoScope.node: {}})
+        d.after_track_prepared()
+
+        task = self.track.find_challenge_or_default("default").schedule[0]
+        for client_id in range(4):
+            buffer = driver.SampleBuffer(client_id, task)
+            buffer.add(1470838595 + client_id, client_id + 1, metrics.SampleType.Normal, None, 10 + client_id, 5, 1000, "docs", 1,
+                       1.0)
+            d.update_samples([buffer])
+
+        self.assertEqual([10, 11, 12, 13], d.metrics_store.get("latency", operation="index"))
+        self.assertEqual([5, 5, 5, 5], d.metrics_store.get("service_time", operation="index"))
+        self.assertEqual([], d.metrics_store.get("throughput", operation="index"))
+        # each client runs in its own process and has its own connection pools
+        self.assertEqual([], d.metrics_store.get("pool_wait_time", operation="index"))
+
+        for client_id in range(4):
+            d.joinpoint_reached(client_id=client_id, client_local_timestamp=10, task=driver.JoinPoint(id=0))
+
+        # metrics of the finished task have been handed over and the throughput columns of the task are gone
+        metrics_of_task = pickle.loads(zlib.decompress(target.on_task_finished.call_args[0][0]))
+        self.assertEqual(8, len([doc for doc in metrics_of_task if doc["name"] in ["latency", "service_time"]]))
+        self.assertLess(0, len([doc for doc in metrics_of_task if doc["name"] == "throughput"]))
+        self.assertEqual({}, d.throughput_columns)
+        self.assertEqual({}, d.request_rates.requests_per_client)
+        self.assertEqual([], d.metrics_store.docs)
+
+
 class ScheduleTestCase(TestCase):
     def assert_schedule(self, expected_schedule, schedule, eternal_schedule=False):
         idx = 0
@@ -353,6 +516,27 @@ class AllocatorTests(TestCase):
         self.assertEqual([2, 0], final_join_point.clients_executing_completing_task)
 
 
+class WorkerAllocationTests(TestCase):
+    def test_allocates_all_clients_to_one_worker_per_host(self):
+        self.assertEqual([("localhost", [0, 1, 2])], driver.allocate_clients_to_workers(3, ["localhost"]))
+        self.assertEqual([("10.5.5.1", [0, 2, 4]), ("10.5.5.2", [1, 3])],
+                         driver.allocate_clients_to_workers(5, ["10.5.5.1", "10.5.5.2"]))
+
+    def test_omits_hosts_without_clients(self):
+        self.assertEqual([("10.5.5.1", [0])], driver.allocate_clients_to_workers(1, ["10.5.5.1", "10.5.5.2"]))
+
+    def test_allocates_clients_round_robin_to_multiple_workers_per_host(self):
+        self.assertEqual([("10.5.5.1", [0, 4]), ("10.5.5.1", [2]), ("10.5.5.2", [1]), ("10.5.5.2", [3])],
+                         driver.allocate_clients_to_workers(5, ["10.5.5.1", "10.5.5.2"], workers_per_host=2))
+
+    def test_allocates_different_number_of_workers_per_host(self):
+        self.assertEqual([("10.5.5.1", [0, 4]), ("10.5.5.1", [2]), ("10.5.5.2", [1, 3])],
+                         driver.allocate_clients_to_workers(5, ["10.5.5.1", "10.5.5.2"], workers_per_host=[2, 1]))
+
+    def test_omits_workers_without_clients(self):
+        self.assertEqual([("localhost", [0]), ("localhost", [1])], driver.allocate_clients_to_workers(2, ["localhost"], workers_per_host=4))
+
+
 class IndexManagementTests(TestCase):
     @mock.patch("elasticsearch.Elasticsearch")
     def test_setup_auto_managed_index(self, es):
@@ -461,6 +645,192 @@ class MetricsAggregationTests(TestCase):
         self.assertEqual((1470838600, 26, metrics.SampleType.Normal, 6666.666666666667, "docs/s"), throughput[5])
         # self.assertEqual((1470838600.5, 26.5, metrics.SampleType.Normal, 10000), throughput[6])
 
+    def test_aggregates_buffers_like_samples(self):
+        index = track.Task(track.Operation("index", track.OperationType.Index), clients=2)
+        search = track.Task(track.Operation("search", track.OperationType.Search), clients=1)
+
+        buffers = [driver.SampleBuffer(0, index), driver.SampleBuffer(1, index), driver.SampleBuffer(2, search)]
+        for i in range(10):
+            sample_type = metrics.SampleType.Warmup if i < 3 else metrics.SampleType.Normal
+            buffers[0].add(1470838595 + i, 21 + i, sample_type, None, -1, -1, 5000, "docs", i + 1, None)
+            buffers[1].add(1470838595.5 + i, 21.5 + i, sample_type, None, -1, -1, 2500, "docs", i + 1, None)
+            buffers[2].add(1470838595.25 + i / 2, 21.25 + i / 2, sample_type, None, -1, -1, 1, "ops", (i + 1) / 2, None)
+        samples = [sample for buffer in buffers for sample in buffer.to_samples()]
+
+        aggregated = driver.calculate_global_throughput_of_buffers(buffers)
+
+        self.assertEqual(driver.calculate_global_throughput(samples), aggregated)
+        self.assertEqual(2, len(aggregated))
+        self.assertEqual((1470838604, 30, metrics.SampleType.Normal, 7250, "docs/s"), aggregated[index][-1])
+        self.assertEqual("ops/s", aggregated[search][0][4])
+
+
+class RequestRateTests(TestCase):
+    def test_calculates_target_and_achieved_throughput(self):
+        throttled = track.Task(track.Operation("search", track.OperationType.Search), clients=2, params={"target-throughput": 4})
+        unthrottled = track.Task(track.Operation("index", track.OperationType.Index), clients=1)
+
+        buffers = [driver.SampleBuffer(0, throttled), driver.SampleBuffer(1, throttled), driver.SampleBuffer(0, throttled),
+                   driver.SampleBuffer(2, unthrottled)]
+        # warmup samples are not considered
+        buffers[0].add(1000, 0, metrics.SampleType.Warmup, None, 1, 1, 1, "ops", 0, None)
+        for i in range(5):
+            # client 0 issues two requests per second (its samples are spread across two buffers)
+            buffers[0].add(1001 + i * 0.5, 0, metrics.SampleType.Normal, None, 1, 1, 1, "ops", 0, None)
+            buffers[2].add(1003.5 + i * 0.5, 0, metrics.SampleType.Normal, None, 1, 1, 1, "ops", 0, None)
+            # client 1 only issues one request per second
+            buffers[1].add(1001 + i, 0, metrics.SampleType.Normal, None, 1, 1, 1, "ops", 0, None)
+            buffers[3].add(1001 + i, 0, metrics.SampleType.Normal, None, 1, 1, 1, "ops", 0, None)
+
+        request_rates = driver.calculate_request_rates(buffers)
+
+        self.assertEqual({throttled: (4, 3)}, request_rates)
+
+    def test_target_throughput(self):
+        def task(params):
+            return track.Task(track.Operation("search", track.OperationType.Search), params=params)
+
+        self.assertEqual(100, driver.target_throughput(task({"target-throughput": 100})))
+        self.assertEqual(0.5, driver.target_throughput(task({"target-interval": 2})))
+        self.assertIsNone(driver.target_throughput(task({})))
+
+
+class WaitStrategyTests(TestCase):
+    def task(self, params):
+        return track.Task(track.Operation("search", track.OperationType.Search), params=params)
+
+    def test_creates_wait_strategy_for_task(self):
+        self.assertIsInstance(driver.wait_strategy_for(self.task({})), driver.SleepWaitStrategy)
+        spin = driver.wait_strategy_for(self.task({"wait-strategy": "spin", "spin-micros": 200}))
+        self.assertIsInstance(spin, driver.SpinWaitStrategy)
+        self.assertAlmostEqual(0.0002, spin.spin_time)
+        self.assertIsInstance(driver.wait_strategy_for(self.task({"wait-strategy": "adaptive"})), driver.AdaptiveWaitStrategy)
+
+    def test_rejects_unknown_wait_strategy(self):
+        with self.assertRaises(exceptions.SystemSetupError) as ctx:
+            driver.wait_strategy_for(self.task({"wait-strategy": "yield"}))
+        self.assertTrue(ctx.exception.args[0].startswith("Unknown wait strategy [yield]"))
+
+    def test_waits_until_point_in_time(self):
+        for wait_strategy in [driver.SleepWaitStrategy(), driver.SpinWaitStrategy(0.001), driver.AdaptiveWaitStrategy(0.001)]:
+            for _ in range(3):
+                point_in_time = time.perf_counter() + 0.005
+                wait_strategy.wait_until(point_in_time)
+                self.assertGreaterEqual(time.perf_counter(), point_in_time, str(wait_strategy))
+
+    def test_adaptive_wait_strategy_bounds_spin_time(self):
+        wait_strategy = driver.AdaptiveWaitStrategy(initial_spin_time=0.5, max_spin_time=0.002)
+        wait_strategy.wait_until(time.perf_counter() + 0.6)
+        self.assertLessEqual(wait_strategy.spin_time, 0.002)
+
+
+class SamplerTests(TestCase):
+    def test_never_drops_samples(self):
+        sampler = driver.Sampler(client_id=3, task="test-task", start_timestamp=0)
+        # this exceeds the capacity of the sampling queue that we've used previously
+        for i in range(20000):
+            sampler.add(metrics.SampleType.Normal, {"success": True}, latency_ms=i, service_time_ms=i, total_ops=500,
+                        total_ops_unit="docs", time_period=i / 1000, percent_completed=i / 20000)
+
+        samples = sampler.samples
+        self.assertEqual(20000, len(samples))
+        for i, sample in enumerate(samples):
+            self.assertEqual(3, sample.client_id)
+            self.assertEqual("test-task", sample.task)
+            self.assertEqual(i, sample.latency_ms)
+            self.assertEqual(500, sample.total_ops)
+            self.assertEqual("docs", sample.total_ops_unit)
+        # the buffer has been swapped
+        self.assertEqual(0, len(sampler.samples))
+
+    def test_restores_all_sample_properties(self):
+        sampler = driver.Sampler(client_id=0, task="test-task", start_timestamp=0)
+        sampler.add(metrics.SampleType.Warmup, {"success": True}, 10.5, 9.5, 1, "ops", 0.5, None)
+        sampler.add(metrics.SampleType.Normal, {"success": False, "http-status": 500}, 12.5, 11.5, 0, "ops", 1.5, 0.5, 3.5, 0.25,
+                    0.75)
+
+        samples = sampler.samples
+
+        self.assertEqual(2, len(samples))
+        self.assertEqual(metrics.SampleType.Warmup, samples[0].sample_type)
+        self.assertEqual({"success": True}, samples[0].request_meta_data)
+        self.assertEqual(10.5, samples[0].latency_ms)
+        self.assertEqual(9.5, samples[0].service_time_ms)
+        self.assertEqual(0.5, samples[0].time_period)
+        self.assertIsNone(samples[0].percent_completed)
+
+        self.assertEqual(metrics.SampleType.Normal, samples[1].sample_type)
+        self.assertEqual({"success": False, "http-status": 500}, samples[1].request_meta_data)
+        self.assertEqual(0, samples[1].total_ops)
+        self.assertEqual(0.5, samples[1].percent_completed)
+        self.assertEqual(0, samples[0].schedule_lag_ms)
+        self.assertEqual(3.5, samples[1].schedule_lag_ms)
+        self.assertEqual(0.25, samples[1].param_wait_ms)
+        self.assertEqual(0, samples[0].pool_wait_ms)
+        self.assertEqual(0.75, samples[1].pool_wait_ms)
+        self.assertTrue(samples[0].absolute_time <= samples[1].absolute_time)
+
+    def test_interns_request_meta_data_and_units(self):
+        buffer = driver.SampleBuffer(client_id=0, task="test-task", chunk_size=2)
+        for i in range(5):
+            buffer.add(i, i, metrics.SampleType.Normal, {"success": True}, 1, 1, 5000, "docs", 1, None)
+        buffer.add(5, 5, metrics.SampleType.Normal, {"success": True, "nested": {"unhashable": True}}, 1, 1, 5000, "docs", 1, None)
+
+        self.assertEqual(6, len(buffer))
+        self.assertEqual(["docs"], buffer.units)
+        self.assertEqual([{"success": True}, {"success": True, "nested": {"unhashable": True}}], buffer.meta_data)
+
+    def test_encodes_and_decodes_samples(self):
+        task = track.Task(track.Operation("index", track.OperationType.Index, meta_data={"bulk-size": 5000}), meta_data={"phase": 1})
+        samplers = [driver.Sampler(client_id=client_id, task=task, start_timestamp=0) for client_id in range(2)]
+        for i in range(3):
+            for sampler in samplers:
+                sampler.add(metrics.SampleType.Normal, {"success": True}, latency_ms=i, service_time_ms=i, total_ops=500,
+                            total_ops_unit="docs", time_period=i, percent_completed=i / 3 if sampler.client_id == 0 else None)
+        buffers = [sampler.drain() for sampler in samplers]
+
+        for compress in [False, True]:
+            decoded = driver.decode_samples(driver.encode_samples(buffers, compress), compress)
+
+            self.assertEqual(2, len(decoded))
+            # tasks are only transferred once per batch
+            self.assertIs(decoded[0].task, decoded[1].task)
+            self.assertEqual(task, decoded[0].task)
+            self.assertEqual({"bulk-size": 5000}, decoded[0].task.operation.meta_data)
+            for original, restored in zip(buffers, decoded):
+                self.assertEqual(original.client_id, restored.client_id)
+                expected_samples = original.to_samples()
+                actual_samples = restored.to_samples()
+                self.assertEqual(3, len(actual_samples))
+                for expected, actual in zip(expected_samples, actual_samples):
+                    self.assertEqual(expected.absolute_time, actual.absolute_time)
+                    self.assertEqual(expected.relative_time, actual.relative_time)
+                    self.assertEqual(expected.sample_type, actual.sample_type)
+                    self.assertEqual(expected.request_meta_data, actual.request_meta_data)
+                    self.assertEqual(expected.latency_ms, actual.latency_ms)
+                    self.assertEqual(expected.total_ops, actual.total_ops)
+                    self.assertEqual(expected.total_ops_unit, actual.total_ops_unit)
+                    self.assertEqual(expected.percent_completed, actual.percent_completed)
+
+    def test_decodes_samples_of_other_byte_order(self):
+        buffer = driver.SampleBuffer(client_id=0, task="test-task")
+        buffer.add(1470838595.5, 0.5, metrics.SampleType.Normal, None, 12.5, 10.0, 5000, "docs", 0.5, 0.25)
+        swapped_columns = []
+        for raw_column, column in zip(buffer.raw_columns(), buffer._columns()):
+            swapped_column = array.array(column.typecode)
+            swapped_column.frombytes(raw_column)
+            swapped_column.byteswap()
+            swapped_columns.append(swapped_column.tobytes())
+        other_byteorder = "big" if sys.byteorder == "little" else "little"
+
+        sample = driver.SampleBuffer.from_raw_columns(0, "test-task", 1, buffer.units, buffer.meta_data, swapped_columns,
+                                                      other_byteorder).sample(0)
+
+        self.assertEqual(1470838595.5, sample.absolute_time)
+        self.assertEqual(12.5, sample.latency_ms)
+        self.assertEqual(5000, sample.total_ops)
+        self.assertEqual(0.25, sample.percent_completed)
+
 
 class SchedulerTests(ScheduleTestCase):
     def setUp(self):
@@ -634,6 +1004,144 @@ class ExecutorTests(TestCase):
             self.assertEqual("docs", sample.total_ops_unit)
             self.assertEqual(1, sample.request_meta_data["bulk-size"])
 
+    @mock.patch("elasticsearch.Elasticsearch")
+    def test_async_execute_schedule_in_throughput_mode(self, es):
+        import asyncio
+        import concurrent.futures
+
+        es.bulk.return_value = {
+            "errors": False
+        }
+
+        params.register_param_source_for_name("driver-test-param-source", DriverTestParamSource)
+        test_track = track.Track(name="unittest", short_description="unittest track",
+                                 source_root_url="http://example.org",
+                                 indices=None,
+                                 challenges=None)
+
+        task = track.Task(track.Operation("time-based", track.OperationType.Index.name, params={
+            "body": ["action_metadata_line", "index_line"],
+            "action_metadata_present": True,
+            "bulk-size": 1,
+            "size": 3
+        },
+                                          param_source="driver-test-param-source"),
+                          warmup_time_period=0, clients=2, completes_parent=True)
+
+        samplers = [driver.Sampler(client_id=client_id, task=task, start_timestamp=100) for client_id in range(2)]
+        cancel = threading.Event()
+        complete = threading.Event()
+        loop = asyncio.new_event_loop()
+        request_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        try:
+            executors = [driver.AsyncExecutor(task, driver.schedule_for(test_track, task, client_id), es, samplers[client_id], cancel,
+                                              complete, loop, request_pool) for client_id in range(2)]
+            loop.run_until_complete(asyncio.gather(*[e() for e in executors], loop=loop))
+        finally:
+            loop.close()
+            request_pool.shutdown()
+
+        self.assertTrue(complete.is_set(), "Executor should auto-complete a task that terminates its parent")
+        for client_id, sampler in enumerate(samplers):
+            samples = sampler.samples
+            self.assertEqual(3, len(samples))
+            previous_relative_time = -1.0
+            for sample in samples:
+                self.assertEqual(client_id, sample.client_id)
+                self.assertEqual(task, sample.task)
+                self.assertTrue(previous_relative_time < sample.relative_time)
+                previous_relative_time = sample.relative_time
+                self.assertEqual(metrics.SampleType.Normal, sample.sample_type)
+                self.assertEqual(sample.latency_ms, sample.service_time_ms)
+                self.assertEqual(1, sample.total_ops)
+                self.assertEqual("docs", sample.total_ops_unit)
+
+    @mock.patch("elasticsearch.Elasticsearch")
+    def test_execute_schedule_with_multiple_requests_in_flight(self, es):
+        import asyncio
+        import concurrent.futures
+
+        def run(es, params):
+            # earlier requests take longer so they complete after later ones
+            time.sleep(params["delay"])
+            return params["bulk-size"], "docs"
+
+        task = track.Task(track.Operation("index", track.OperationType.Index.name, params={}, param_source="driver-test-param-source"),
+                          warmup_time_period=0, clients=1, params={"max-in-flight": 3})
+        delays = [0.06, 0.03, 0.0, 0.05, 0.0, 0.0]
+        schedule = [(0, metrics.SampleType.Normal, (i + 1) / len(delays), self.context_managed(run), {"delay": delay, "bulk-size": i})
+                    for i, delay in enumerate(delays)]
+
+        sampler = driver.Sampler(client_id=0, task=task, start_timestamp=0)
+        driver.Executor(task, schedule, es, sampler, threading.Event(), threading.Event())()
+
+        loop = asyncio.new_event_loop()
+        request_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        async_sampler = driver.Sampler(client_id=0, task=task, start_timestamp=0)
+        try:
+            executor = driver.AsyncExecutor(task, iter(schedule), es, async_sampler, threading.Event(), threading.Event(), loop,
+                                            request_pool)
+            loop.run_until_complete(executor())
+        finally:
+            loop.close()
+            request_pool.shutdown()
+
+        for samples in [sampler.samples, async_sampler.samples]:
+            # samples are recorded in the order in which requests have been sent
+            self.assertEqual(list(range(len(delays))), [sample.total_ops for sample in samples])
+            self.assertEqual([(i + 1) / len(delays) for i in range(len(delays))], [sample.percent_completed for sample in samples])
+            for sample, delay in zip(samples, delays):
+                self.assertGreaterEqual(sample.service_time_ms, delay * 1000)
+                self.assertEqual(sample.latency_ms, sample.service_time_ms)
+            # ... but their timestamps are the points in time when they have completed
+            self.assertLess(samples[2].relative_time, samples[0].relative_time)
+
+    @mock.patch("elasticsearch.Elasticsearch")
+    def test_async_step_runs_all_clients_until_join_point(self, es):
+        import concurrent.futures
+        import queue
+
+        es.bulk.return_value = {
+            "errors": False
+        }
+
+        params.register_param_source_for_name("driver-test-param-source", DriverTestParamSource)
+        test_track = track.Track(name="unittest", short_description="unittest track",
+                                 source_root_url="http://example.org",
+                                 indices=None,
+                                 challenges=None)
+
+        task = track.Task(track.Operation("time-based", track.OperationType.Index.name, params={
+            "body": ["action_metadata_line", "index_line"],
+            "action_metadata_present": True,
+            "bulk-size": 1,
+            "size": 2
+        },
+                                          param_source="driver-test-param-source"),
+                          warmup_time_period=0, clients=2)
+        join_point = driver.JoinPoint(id=1)
+        clients = [
+            driver.AsyncClient(0, [task, join_point], es),
+            driver.AsyncClient(1, [task, None, join_point], es)
+        ]
+        join_points_reached = queue.Queue()
+        request_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        try:
+            driver.AsyncStep(test_track, clients, request_pool, threading.Event(), join_points_reached)()
+        finally:
+            request_pool.shutdown()
+
+        self.assertEqual([(0, join_point), (1, join_point)], sorted([join_points_reached.get_nowait() for _ in range(2)],
+                                                                    key=lambda t: t[0]))
+        for c in clients:
+            self.assertTrue(c.at_joinpoint())
+            buffers = c.drain()
+            self.assertEqual(1, len(buffers))
+            self.assertEqual(2, len(buffers[0]))
+            self.assertEqual(c.client_id, buffers[0].client_id)
+            # nothing left after draining
+            self.assertEqual(0, len(c.drain()))
+
     @mock.patch("elasticsearch.Elasticsearch")
     def test_execute_schedule_throughput_throttled(self, es):
         es.bulk.return_value = {
@@ -674,6 +1182,13 @@ class ExecutorTests(TestCase):
             self.assertTrue(lower_bound <= sample_size <= upper_bound,
                             msg="Expected sample size to be between %d and %d but was %d" % (lower_bound, upper_bound, sample_size))
             self.assertTrue(complete.is_set(), "Executor should auto-complete a task that terminates its parent")
+            self.assertTrue(all(sample.schedule_lag_ms >= 0 for sample in samples))
+
+    def test_schedule_lag(self):
+        self.assertEqual(0.5, driver.schedule_lag(start=10.5, absolute_expected_schedule_time=10, throughput_throttled=True))
+        # requests are never sent before they are scheduled but we guard against clock granularity anyway
+        self.assertEqual(0, driver.schedule_lag(start=9.9, absolute_expected_schedule_time=10, throughput_throttled=True))
+        self.assertEqual(0, driver.schedule_lag(start=10.5, absolute_expected_schedule_time=10, throughput_throttled=False))
 
     @mock.patch("elasticsearch.Elasticsearch")
     def test_cancel_execute_schedule(self, es):
@@ -1,7 +1,9 @@
 import unittest.mock as mock
 from unittest import TestCase
 
+from esrally import client, track
 from esrally.driver import runner
+from esrally.utils import compression
 
 
 class RegisterRunnerTests(TestCase):
@@ -77,7 +79,7 @@ class BulkIndexRunnerTests(TestCase):
         self.assertEqual(True, result["success"])
         self.assertEqual(0, result["error-count"])
 
-        es.bulk.assert_called_with(body=bulk_params["body"], params={})
+        es.bulk.assert_called_with(body=bulk_params["body"], params={"filter_path": "errors,items.*.error,error,status"})
 
     @mock.patch("elasticsearch.Elasticsearch")
     def test_bulk_index_success_without_metadata(self, es):
@@ -107,7 +109,131 @@ class BulkIndexRunnerTests(TestCase):
         self.assertEqual(True, result["success"])
         self.assertEqual(0, result["error-count"])
 
-        es.bulk.assert_called_with(body=bulk_params["body"], index="test-index", doc_type="test-type", params={})
+        es.bulk.assert_called_with(body=bulk_params["body"], index="test-index", doc_type="test-type", params={"filter_path": "errors,items.*.error,error,status"})
+
+    @mock.patch("elasticsearch.Elasticsearch")
+    def test_bulk_index_binary_body(self, es):
+        es.transport.perform_request.return_value = {
+            "errors": False
+        }
+        bulk = runner.BulkIndex()
+
+        bulk_params = {
+            "body": b"index_line\nindex_line\n",
+            "action_metadata_present": False,
+            "bulk-size": 2,
+            "index": "test-index",
+            "type": "test-type",
+            "pipeline": "test-pipeline"
+        }
+
+        result = bulk(es, bulk_params)
+
+        self.assertEqual(2, result["weight"])
+        self.assertEqual(True, result["success"])
+
+        es.bulk.assert_not_called()
+        es.transport.perform_request.assert_called_with("POST", "/test-index/test-type/_bulk",
+                                                        params={"pipeline": "test-pipeline", "filter_path": "errors,items.*.error,error,status"},
+                                                        body=b"index_line\nindex_line\n")
+
+    @mock.patch("elasticsearch.Elasticsearch")
+    def test_bulk_index_binary_body_with_lean_transport(self, es):
+        es.lean_transport = mock.create_autospec(client.LeanTransport, instance=True)
+        es.lean_transport.bulk.return_value = {
+            "errors": False
+        }
+        bulk = runner.BulkIndex()
+
+        bulk_params = {
+            "body": b"action_meta_data\nindex_line\n",
+            "action_metadata_present": True,
+            "bulk-size": 1,
+            "index": "test-index"
+        }
+
+        result = bulk(es, bulk_params)
+
+        self.assertEqual(1, result["weight"])
+        self.assertEqual(True, result["success"])
+
+        es.transport.perform_request.assert_not_called()
+        es.lean_transport.bulk.assert_called_with("/_bulk", {"filter_path": "errors,items.*.error,error,status"},
+                                                  b"action_meta_data\nindex_line\n", parse_items=False)
+
+    @mock.patch("elasticsearch.Elasticsearch")
+    def test_bulk_index_precompressed_body(self, es):
+        es.transport.perform_request.return_value = {
+            "errors": False
+        }
+        bulk = runner.BulkIndex()
+
+        bulk_params = {
+            "body": compression.PrecompressedBody(b"index_line\nindex_line\n", b"compressed", compression_time=0.0025),
+            "action_metadata_present": False,
+            "bulk-size": 2,
+            "index": "test-index",
+            "type": "test-type"
+        }
+
+        result = bulk(es, bulk_params)
+
+        self.assertEqual(True, result["success"])
+        self.assertEqual(2.2, result["compression-ratio"])
+        self.assertEqual(2.5, result["compression-time-ms"])
+
+        # bodies from the bulk cache do not know how long their compression took
+        bulk_params["body"] = compression.PrecompressedBody(b"index_line\nindex_line\n", b"compressed")
+
+        result = bulk(es, bulk_params)
+
+        self.assertEqual(2.2, result["compression-ratio"])
+        self.assertNotIn("compression-time-ms", result)
+
+    @mock.patch("elasticsearch.Elasticsearch")
+    def test_bulk_index_requests_full_responses_after_errors(self, es):
+        es.bulk.side_effect = [
+            # filtered response
+            {
+                "errors": True,
+                "items": [
+                    {
+                        "index": {
+                            "error": {
+                                "type": "mapper_parsing_exception"
+                            }
+                        }
+                    }
+                ]
+            },
+            {
+                "errors": False
+            }
+        ]
+        bulk = runner.BulkIndex()
+
+        bulk_params = {
+            "body": [
+                "action_meta_data",
+                "index_line",
+                "action_meta_data",
+                "index_line"
+            ],
+            "action_metadata_present": True,
+            "bulk-size": 2
+        }
+
+        result = bulk(es, bulk_params)
+
+        self.assertEqual(False, result["success"])
+        self.assertEqual(1, result["success-count"])
+        self.assertEqual(1, result["error-count"])
+        es.bulk.assert_called_with(body=bulk_params["body"], params={"filter_path": "errors,items.*.error,error,status"})
+
+        result = bulk(es, bulk_params)
+
+        self.assertEqual(True, result["success"])
+        es.bulk.assert_called_with(body=bulk_params["body"], params={})
 
     @mock.patch("elasticsearch.Elasticsearch")
     def test_bulk_index_error(self, es):
@@ -171,7 +297,7 @@ class BulkIndexRunnerTests(TestCase):
         self.assertEqual(False, result["success"])
         self.assertEqual(2, result["error-count"])
 
-        es.bulk.assert_called_with(body=bulk_params["body"], params={})
+        es.bulk.assert_called_with(body=bulk_params["body"], params={"filter_path": "errors,items.*.error,error,status"})
 
     @mock.patch("elasticsearch.Elasticsearch")
     def test_mixed_bulk_with_simple_stats(self, es):
@@ -275,8 +401,42 @@ class BulkIndexRunnerTests(TestCase):
         self.assertEqual(False, result["success"])
         self.assertEqual(2, result["error-count"])
 
+        es.bulk.assert_called_with(body=bulk_params["body"], params={"filter_path": "errors,items.*.error,error,status"})
+
+    @mock.patch("elasticsearch.Elasticsearch")
+    def test_requests_full_responses_after_errors_only_for_the_current_task(self, es):
+        es.bulk.return_value = {
+            "errors": True,
+            "items": [
+                {
+                    "index": {
+                        "status": 400,
+                        "error": "MapperParsingException"
+                    }
+                }
+            ]
+        }
+        bulk_params = {
+            "body": [
+                "action_meta_data",
+                "index_line"
+            ],
+            "action_metadata_present": True,
+            "bulk-size": 1,
+            "index": "test"
+        }
+
+        warmup_task_bulk = runner.runner_for(track.OperationType.Index.name)
+        warmup_task_bulk(es, bulk_params)
+        es.bulk.assert_called_with(body=bulk_params["body"], params={"filter_path": "errors,items.*.error,error,status"})
+        warmup_task_bulk(es, bulk_params)
         es.bulk.assert_called_with(body=bulk_params["body"], params={})
 
+        # the next task starts with filtered responses again
+        measurement_task_bulk = runner.runner_for(track.OperationType.Index.name)
+        measurement_task_bulk(es, bulk_params)
+        es.bulk.assert_called_with(body=bulk_params["body"], params={"filter_path": "errors,items.*.error,error,status"})
+
     @mock.patch("elasticsearch.Elasticsearch")
     def test_mixed_bulk_with_detailed_stats(self, es):
         es.bulk.return_value = {
@@ -503,6 +663,41 @@ class QueryRunnerTests(TestCase):
         self.assertEqual(2, result["hits"])
         self.assertFalse(result["timed_out"])
         self.assertEqual(5, result["took"])
+        es.search.assert_called_with(index="unittest", doc_type="type", request_cache=False, body=params["body"],
+                                     filter_path="hits.total,timed_out,took,error,status")
+
+    @mock.patch("elasticsearch.Elasticsearch")
+    def test_query_keeps_user_defined_filter_path(self, es):
+        es.search.return_value = {
+            "timed_out": False,
+            "took": 5,
+            "hits": {
+                "total": 2
+            }
+        }
+
+        query_runner = runner.Query()
+
+        params = {
+            "index": "unittest",
+            "type": "type",
+            "use_request_cache": False,
+            "request_params": {
+                "filter_path": "hits.total,timed_out,took,aggregations"
+            },
+            "body": {
+                "query": {
+                    "match_all": {}
+                }
+            }
+        }
+
+        with query_runner:
+            result = query_runner(es, params)
+
+        self.assertEqual(2, result["hits"])
+        es.search.assert_called_with(index="unittest", doc_type="type", request_cache=False, body=params["body"],
+                                     filter_path="hits.total,timed_out,took,aggregations")
 
     @mock.patch("elasticsearch.Elasticsearch")
     def test_scroll_query_only_one_page(self, es):
@@ -68,6 +68,20 @@ class DeterministicSchedulerTests(SchedulerTestCase):
         s = scheduler.DeterministicScheduler({})
         self.assertRateEquals(s, 0)
 
+    def test_next_n_matches_next(self):
+        s = scheduler.DeterministicScheduler({
+            "target-throughput": 30,
+            "clients": 4
+        })
+        expected = []
+        current = 2
+        for _ in range(100):
+            current = s.next(current)
+            expected.append(current)
+
+        self.assertEqual(expected, s.next_n(2, 100))
+        self.assertEqual([0, 0, 0], scheduler.DeterministicScheduler({}).next_n(0, 3))
+
 
 class PoissonSchedulerTests(SchedulerTestCase):
     def test_schedule_matches_expected_target_throughput(self):
@@ -83,3 +97,48 @@ class PoissonSchedulerTests(SchedulerTestCase):
         # no params -> no limit
         s = scheduler.PoissonScheduler({})
         self.assertRateEquals(s, 0)
+
+    def test_seeded_schedule_is_reproducible_per_client(self):
+        def schedule(client_index):
+            return scheduler.PoissonScheduler({
+                "target-throughput": 100,
+                "clients": 2,
+                "schedule-seed": 42,
+                "client-index": client_index
+            }).next_n(0, 100)
+
+        self.assertEqual(schedule(0), schedule(0))
+        self.assertNotEqual(schedule(0), schedule(1))
+
+    def test_next_n_matches_next(self):
+        params = {
+            "target-throughput": 100,
+            "schedule-seed": 7
+        }
+        s = scheduler.PoissonScheduler(params)
+        expected = []
+        current = 0
+        for _ in range(100):
+            current = s.next(current)
+            expected.append(current)
+
+        self.assertEqual(expected, scheduler.PoissonScheduler(params).next_n(0, 100))
+
+
+class ScheduledTimesTests(TestCase):
+    class ScheduleWithoutNextN:
+        def next(self, current):
+            return current + 1
+
+    def test_calculates_points_in_time_in_blocks(self):
+        s = scheduler.DeterministicScheduler({"target-interval": 2})
+        self.assertEqual([0, 2, 4, 6, 8, 10, 12], list(scheduler.scheduled_times(s, iterations=7, block_size=3)))
+
+    def test_supports_schedulers_without_next_n(self):
+        s = ScheduledTimesTests.ScheduleWithoutNextN()
+        self.assertEqual([0, 1, 2, 3, 4], list(scheduler.scheduled_times(s, iterations=5, block_size=2)))
+
+    def test_provides_points_in_time_eternally(self):
+        s = scheduler.DeterministicScheduler({"target-interval": 1})
+        points_in_time = scheduler.scheduled_times(s, block_size=2)
+        self.assertEqual([0, 1, 2, 3, 4], [next(points_in_time) for _ in range(5)])
@@ -850,6 +850,30 @@ class InMemoryMetricsStoreTests(TestCase):
             "io-batch-size-kb": 4
         }, self.metrics_store.docs[1]["meta"])
 
+    def test_put_values_with_shared_meta_data(self):
+        self.metrics_store.open(EsMetricsTests.TRIAL_TIMESTAMP, "test", "append-no-conflicts", "defaults", create=True)
+        self.metrics_store.lap = 1
+        self.metrics_store.add_meta_info(metrics.MetaInfoScope.cluster, None, "cluster-name", "test")
+        success = {"success": True}
+        failure = {"success": False, "http-status": 500}
+
+        self.metrics_store.put_values_cluster_level("latency", [10.0, 20.0, 30.0], "ms", operation="index", operation_type="Index",
+                                                    sample_types=[metrics.SampleType.Warmup, metrics.SampleType.Normal, 1],
+                                                    absolute_times=[1, 2, 3], relative_times=[0.5, 1.5, 2.5],
+                                                    meta_data=[success, failure, success])
+
+        self.assertEqual(3, len(self.metrics_store.docs))
+        self.assertEqual([10.0, 20.0, 30.0], [doc["value"] for doc in self.metrics_store.docs])
+        self.assertEqual(["warmup", "normal", "normal"], [doc["sample-type"] for doc in self.metrics_store.docs])
+        self.assertEqual([1000, 2000, 3000], [doc["@timestamp"] for doc in self.metrics_store.docs])
+        self.assertEqual([500000, 1500000, 2500000], [doc["relative-time"] for doc in self.metrics_store.docs])
+        self.assertEqual("index", self.metrics_store.docs[0]["operation"])
+        self.assertEqual({"cluster-name": "test", "success": True}, self.metrics_store.docs[0]["meta"])
+        self.assertEqual({"cluster-name": "test", "success": False, "http-status": 500}, self.metrics_store.docs[1]["meta"])
+        # merged only once
+        self.assertIs(self.metrics_store.docs[0]["meta"], self.metrics_store.docs[2]["meta"])
+        self.assertEqual([10.0, 20.0, 30.0], self.metrics_store.get("latency", operation="index"))
+
     def test_get_error_rate_zero_without_samples(self):
         self.metrics_store.open(EsMetricsTests.TRIAL_TIMESTAMP, "test", "append-no-conflicts", "defaults", create=True)
         self.metrics_store.lap = 1
@@ -963,3 +987,23 @@ class FileRaceStoreTests(TestCase):
         retrieved_race = self.race_store.find_by_timestamp(timestamp=time.to_iso8601(FileRaceStoreTests.TRIAL_TIMESTAMP))
         self.assertEqual(race.trial_timestamp, retrieved_race.trial_timestamp)
         self.assertEqual(1, len(self.race_store.list()))
+
+    def test_store_race_with_load_driver_workers(self):
+        from esrally import time
+        t = track.Track(name="unittest", short_description="unittest track",
+                        challenges=[track.Challenge(name="index", description="Index", default=True, index_settings=None, schedule=[])])
+
+        race = metrics.Race(rally_version="0.4.4", environment_name="unittest", trial_timestamp=FileRaceStoreTests.TRIAL_TIMESTAMP,
+                            pipeline="from-sources", user_tag="let-me-test", track=t, challenge=t.default_challenge, car="4gheap",
+                            total_laps=1,
+                            cluster=FileRaceStoreTests.DictHolder({"distribution-version": "5.0.0", "nodes": []}),
+                            lap_results=[],
+                            results=FileRaceStoreTests.DictHolder({"op_metrics": []}),
+                            load_driver_workers=8)
+
+        self.assertEqual(8, race.as_dict()["load-driver-workers"])
+
+        self.race_store.store_race(race)
+
+        retrieved_race = self.race_store.find_by_timestamp(timestamp=time.to_iso8601(FileRaceStoreTests.TRIAL_TIMESTAMP))
+        self.assertEqual(8, retrieved_race.load_driver_workers)
@@ -84,6 +84,10 @@ class StatsTests(TestCase):
                         "50": 341,
                         "100": 376
                     },
+                    "schedule_lag": {
+                        "50": 1,
+                        "100": 4
+                    },
                     "error_rate": 0.0
                 }
             ],
@@ -122,6 +126,15 @@ class StatsTests(TestCase):
             }
         }, select(metric_list, "latency", "index"))
 
+        self.assertEqual({
+            "name": "schedule_lag",
+            "operation": "index",
+            "value": {
+                "50": 1,
+                "100": 4
+            }
+        }, select(metric_list, "schedule_lag", "index"))
+
         self.assertEqual({
             "name": "error_rate",
             "operation": "index",
@@ -145,6 +158,51 @@ class StatsTests(TestCase):
         }, select(metric_list, "old_gc_time"))
 
 
+class SummaryReporterTests(TestCase):
+    def op_metrics(self, schedule_lag):
+        return {
+            "operation": "index",
+            "throughput": {"min": 450, "median": 450, "max": 452, "unit": "docs/s"},
+            "latency": {"50": 340, "100": 376},
+            "service_time": {"50": 341, "100": 376},
+            "error_rate": 0.0,
+            "schedule_lag": schedule_lag
+        }
+
+    def test_reports_schedule_lag(self):
+        r = reporter.SummaryReporter(reporter.Stats(), config.Config(), revision=None, current_lap=None, total_laps=1)
+        self.assertEqual([
+            ["All", "50th percentile schedule lag", "index", 0.5, "ms"],
+            ["All", "99.9th percentile schedule lag", "index", 4, "ms"]
+        ], r.report_schedule_lag(self.op_metrics(collections.OrderedDict([("50", 0.5), ("99_9", 4)])), "index"))
+        self.assertEqual([], r.report_schedule_lag(self.op_metrics(None), "index"))
+
+    def test_warns_about_schedule_lag(self):
+        r = reporter.SummaryReporter(reporter.Stats(), config.Config(), revision=None, current_lap=None, total_laps=1)
+
+        warnings = []
+        r.add_warnings(warnings, self.op_metrics({"50": 0.5, "90": 2, "100": 150}), "index")
+        self.assertEqual([], warnings)
+
+        r.add_warnings(warnings, self.op_metrics({"50": 8, "90": 25, "100": 150}), "index")
+        self.assertEqual(1, len(warnings))
+        self.assertTrue(warnings[0].startswith("90th percentile schedule lag for [index] is 25.00 ms"))
+        self.assertIn("--load-driver-workers", warnings[0])
+
+    def test_warns_about_schedule_lag_above_configured_threshold(self):
+        cfg = config.Config()
+        cfg.add(config.Scope.application, "reporting", "schedule.lag.warning.threshold", 50)
+        r = reporter.SummaryReporter(reporter.Stats(), cfg, revision=None, current_lap=None, total_laps=1)
+
+        warnings = []
+        r.add_warnings(warnings, self.op_metrics({"50": 8, "90": 25, "100": 150}), "index")
+        self.assertEqual([], warnings)
+
+        r.add_warnings(warnings, self.op_metrics({"50": 8, "90": 60, "100": 150}), "index")
+        self.assertEqual(1, len(warnings))
+        self.assertTrue(warnings[0].startswith("90th percentile schedule lag for [index] is 60.00 ms which exceeds 50 ms."))
+
+
 class ComparisonReporterTests(TestCase):
     def test_formats_table(self):
         cfg = config.Config()
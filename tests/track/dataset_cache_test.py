@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest.mock as mock
+from unittest import TestCase
+
+from esrally.track import dataset_cache
+from esrally.utils import io
+
+
+class DatasetCacheTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def write(self, relative_path, contents):
+        path = os.path.join(self.root, relative_path)
+        io.ensure_dir(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(contents)
+        return path
+
+    def test_checksum_is_calculated_only_once(self):
+        archive = self.write("geonames/documents.json.bz2", b"archive")
+        cache = dataset_cache.DatasetCache(self.root)
+
+        with mock.patch("esrally.track.dataset_cache.checksum", wraps=dataset_cache.checksum) as checksum:
+            key = cache.add_archive("http://example.org/geonames/documents.json.bz2", archive)
+            # the index is persisted
+            self.assertEqual(key, dataset_cache.DatasetCache(self.root).add_archive(None, archive))
+            self.assertEqual(1, checksum.call_count)
+
+        self.assertEqual(dataset_cache.checksum(archive), key)
+
+    def test_shares_identical_archives_between_tracks(self):
+        archive = self.write("geonames/documents.json.bz2", b"archive")
+        cache = dataset_cache.DatasetCache(self.root)
+        key = cache.add_archive("http://example.org/geonames/documents.json.bz2", archive)
+
+        # same URL
+        fork = os.path.join(self.root, "geonames-fork/documents.json.bz2")
+        self.assertTrue(cache.provide_archive("http://example.org/geonames/documents.json.bz2", fork))
+        self.assertEqual(key, cache.add_archive("http://example.org/geonames/documents.json.bz2", fork))
+        self.assertTrue(os.path.samefile(archive, fork))
+        # unknown URL
+        self.assertFalse(cache.provide_archive("http://example.org/other/documents.json.bz2",
+                                               os.path.join(self.root, "other/documents.json.bz2")))
+
+        # same contents
+        mirror = self.write("geonames-mirror/documents.json.bz2", b"archive")
+        self.assertEqual(key, cache.add_archive("http://mirror.example.org/geonames/documents.json.bz2", mirror))
+        self.assertTrue(os.path.samefile(archive, mirror))
+
+    def test_shares_validated_data_files_between_tracks(self):
+        archive = self.write("geonames/documents.json.bz2", b"archive")
+        cache = dataset_cache.DatasetCache(self.root)
+        key = cache.add_archive(None, archive)
+        self.assertIsNone(cache.provide_data_file(key, archive, offset_table_stride=2))
+
+        data_file = self.write("geonames/documents.json", b"line 1\nline 2\nline 3\n")
+        self.assertEqual(3, io.prepare_file_offset_table(data_file, stride=2))
+        cache.add_data_file(key, archive, number_of_lines=3, offset_table_stride=2)
+
+        self.assertEqual(3, cache.provide_data_file(key, archive, offset_table_stride=2))
+        # a different stride requires a new file offset table
+        self.assertIsNone(cache.provide_data_file(key, archive, offset_table_stride=5))
+
+        fork = self.write("geonames-fork/documents.json.bz2", b"archive")
+        self.assertEqual(key, cache.add_archive(None, fork))
+        self.assertEqual(3, cache.provide_data_file(key, fork, offset_table_stride=2))
+        self.assertTrue(os.path.samefile(data_file, os.path.join(self.root, "geonames-fork/documents.json")))
+        self.assertTrue(io.is_file_offset_table_valid(os.path.join(self.root, "geonames-fork/documents.json")))
+
+        # modified data files are not valid anymore
+        self.write("geonames/documents.json", b"line 1\n")
+        self.assertIsNone(cache.provide_data_file(key, archive, offset_table_stride=2))
+
+    def test_evicts_least_recently_used_entries(self):
+        cache = dataset_cache.DatasetCache(self.root, max_size_in_bytes=25)
+        keys = []
+        for name in ["a", "b", "c"]:
+            archive = self.write("%s/documents.json.bz2" % name, name.encode() * 10)
+            self.write("%s/documents.json" % name, b"")
+            keys.append(cache.add_archive(None, archive))
+
+        cache.evict(keep=[keys[0]])
+
+        # "a" is kept although it is the least recently used one
+        self.assertTrue(os.path.exists(os.path.join(self.root, "a/documents.json.bz2")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "b/documents.json.bz2")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "b/documents.json")))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "c/documents.json.bz2")))
+        self.assertEqual({keys[0], keys[2]}, set(dataset_cache.DatasetCache(self.root).entries.keys()))
+
+    def test_drops_entries_of_removed_files(self):
+        archive = self.write("geonames/documents.json.bz2", b"archive")
+        cache = dataset_cache.DatasetCache(self.root)
+        cache.add_archive(None, archive)
+        os.remove(archive)
+
+        cache.evict()
+
+        self.assertEqual({}, dataset_cache.DatasetCache(self.root).entries)
@@ -299,6 +299,49 @@ class TrackPathTests(TestCase):
         self.assertEqual("/data/docs/documents.json.bz2", t.indices[0].types[0].document_archive)
 
 
+class OperationParametersTests(TestCase):
+    def setUp(self):
+        from esrally.track import track
+
+        self.track = track.Track(name="unittest", short_description="unittest track", indices=[
+            track.Index(name="test", auto_managed=True, types=[track.Type("docs", mapping={}, document_file="docs/documents.json",
+                                                                         number_of_documents=10)])
+        ])
+        self.operation = track.Operation("index", operation_type=track.OperationType.Index.name, params={"bulk-size": 5})
+
+    def config(self, bulk_cache_enabled, client_options=None):
+        from esrally import config
+
+        cfg = config.Config()
+        cfg.add(config.Scope.application, "track", "bulk.cache.enabled", bulk_cache_enabled)
+        cfg.add(config.Scope.application, "client", "options", client_options if client_options else {})
+        return cfg
+
+    def test_uses_bulk_cache_only_if_enabled(self):
+        self.assertFalse(loader.operation_parameters(self.track, self.operation).bulk_cache)
+        self.assertFalse(loader.operation_parameters(self.track, self.operation, self.config(bulk_cache_enabled=False)).bulk_cache)
+        self.assertTrue(loader.operation_parameters(self.track, self.operation, self.config(bulk_cache_enabled=True)).bulk_cache)
+
+    def test_reads_compressed_bulks_of_client_compression_level(self):
+        cfg = self.config(bulk_cache_enabled=True)
+        self.assertIsNone(loader.operation_parameters(self.track, self.operation, cfg).bulk_cache_compression_level)
+
+        cfg = self.config(bulk_cache_enabled=True, client_options={"compressed": True, "compression_level": 3})
+        self.assertEqual(3, loader.operation_parameters(self.track, self.operation, cfg).bulk_cache_compression_level)
+
+    def test_rejects_compression_level_if_client_does_not_compress(self):
+        from esrally.track import track
+
+        operation = track.Operation("index", operation_type=track.OperationType.Index.name, params={"bulk-size": 5, "compression-level": 1})
+
+        with self.assertRaisesRegex(exceptions.SystemSetupError, "Operation \\[index\\] defines a 'compression-level' but the client does "
+                                                                 "not compress requests."):
+            loader.operation_parameters(self.track, operation, self.config(bulk_cache_enabled=False))
+
+        cfg = self.config(bulk_cache_enabled=False, client_options={"compressed": True})
+        self.assertEqual(1, loader.operation_parameters(self.track, operation, cfg).compression_level)
+
+
 class TrackFilterTests(TestCase):
     def test_create_filters_from_empty_included_tasks(self):
         self.assertEqual(0, len(loader.filters_from_included_tasks(None)))
@@ -557,6 +600,143 @@ class TrackSpecificationReaderTests(TestCase):
                          "period of '20' seconds and '1000' iterations. Please do not mix time periods and iterations.",
                          ctx.exception.args[0])
 
+    def test_parse_with_multiple_requests_in_flight_for_non_bulk_operation(self):
+        track_specification = {
+            "short-description": "short description for unit test",
+            "description": "longer description of this track for unit test",
+            "indices": [
+                {
+                    "name": "test-index",
+                    "types": [
+                        {
+                            "name": "main",
+                            "mapping": "main-type-mappings.json"
+                        }
+                    ]
+                }
+            ],
+            "operations": [
+                {
+                    "name": "search",
+                    "operation-type": "search",
+                    "index": "test-index"
+                }
+            ],
+            "challenges": [
+                {
+                    "name": "default-challenge",
+                    "description": "Default challenge",
+                    "schedule": [
+                        {
+                            "operation": "search",
+                            "max-in-flight": 4
+                        }
+                    ]
+                }
+
+            ]
+        }
+
+        reader = loader.TrackSpecificationReader(source=io.DictStringFileSourceFactory({
+            "/mappings/main-type-mappings.json": ['{"main": "empty-for-test"}'],
+        }))
+        with self.assertRaises(loader.TrackSyntaxError) as ctx:
+            reader("unittest", track_specification, "/mappings")
+        self.assertEqual("Track 'unittest' is invalid. Operation 'search' in challenge 'default-challenge' defines '4' requests in flight "
+                         "but only bulk-index operations support more than one request in flight.", ctx.exception.args[0])
+
+    def test_parse_with_unknown_wait_strategy(self):
+        track_specification = {
+            "short-description": "short description for unit test",
+            "description": "longer description of this track for unit test",
+            "indices": [
+                {
+                    "name": "test-index",
+                    "types": [
+                        {
+                            "name": "main",
+                            "mapping": "main-type-mappings.json"
+                        }
+                    ]
+                }
+            ],
+            "operations": [
+                {
+                    "name": "search",
+                    "operation-type": "search",
+                    "index": "test-index"
+                }
+            ],
+            "challenges": [
+                {
+                    "name": "default-challenge",
+                    "description": "Default challenge",
+                    "schedule": [
+                        {
+                            "operation": "search",
+                            "target-throughput": 100,
+                            "wait-strategy": "busy"
+                        }
+                    ]
+                }
+
+            ]
+        }
+
+        reader = loader.TrackSpecificationReader(source=io.DictStringFileSourceFactory({
+            "/mappings/main-type-mappings.json": ['{"main": "empty-for-test"}'],
+        }))
+        with self.assertRaises(loader.TrackSyntaxError) as ctx:
+            reader("unittest", track_specification, "/mappings")
+        self.assertEqual("Track 'unittest' is invalid. Operation 'search' in challenge 'default-challenge' defines an unknown wait "
+                         "strategy 'busy'. Please use one of 'sleep', 'spin' or 'adaptive'.", ctx.exception.args[0])
+
+    def test_parse_with_non_numeric_spin_micros(self):
+        track_specification = {
+            "short-description": "short description for unit test",
+            "description": "longer description of this track for unit test",
+            "indices": [
+                {
+                    "name": "test-index",
+                    "types": [
+                        {
+                            "name": "main",
+                            "mapping": "main-type-mappings.json"
+                        }
+                    ]
+                }
+            ],
+            "operations": [
+                {
+                    "name": "search",
+                    "operation-type": "search",
+                    "index": "test-index"
+                }
+            ],
+            "challenges": [
+                {
+                    "name": "default-challenge",
+                    "description": "Default challenge",
+                    "schedule": [
+                        {
+                            "operation": "search",
+                            "target-throughput": 100,
+                            "spin-micros": "500us"
+                        }
+                    ]
+                }
+
+            ]
+        }
+
+        reader = loader.TrackSpecificationReader(source=io.DictStringFileSourceFactory({
+            "/mappings/main-type-mappings.json": ['{"main": "empty-for-test"}'],
+        }))
+        with self.assertRaises(loader.TrackSyntaxError) as ctx:
+            reader("unittest", track_specification, "/mappings")
+        self.assertEqual("Track 'unittest' is invalid. Operation 'search' in challenge 'default-challenge' defines '500us' spin "
+                         "microseconds but it must be a non-negative number.", ctx.exception.args[0])
+
     def test_parse_valid_track_specification(self):
         track_specification = {
             "short-description": "short description for unit test",
@@ -1,7 +1,11 @@
+import gzip
+import os
+import tempfile
+import unittest.mock as mock
 from unittest import TestCase
 
 from esrally import exceptions
-from esrally.utils import io
+from esrally.utils import io, compression
 from esrally.track import params, track
 
 
@@ -58,7 +62,7 @@ class ConflictingIdsBuilderTests(TestCase):
                 "         9",
                 "        10",
             ],
-            params.build_conflicting_ids(params.IndexIdConflict.SequentialConflicts, 11, 0)
+            list(params.build_conflicting_ids(params.IndexIdConflict.SequentialConflicts, 11, 0))
         )
 
         self.assertEqual(
@@ -75,27 +79,29 @@ class ConflictingIdsBuilderTests(TestCase):
                 "        14",
                 "        15",
             ],
-            params.build_conflicting_ids(params.IndexIdConflict.SequentialConflicts, 11, 5)
+            list(params.build_conflicting_ids(params.IndexIdConflict.SequentialConflicts, 11, 5))
         )
 
     def test_random_conflicts(self):
-        self.assertEqual(
-            [
-                "         3",
-                "         3",
-                "         3"
-            ],
-            params.build_conflicting_ids(params.IndexIdConflict.RandomConflicts, 3, 0, rand=lambda x, y: y)
-        )
-
-        self.assertEqual(
-            [
-                "         8",
-                "         8",
-                "         8"
-            ],
-            params.build_conflicting_ids(params.IndexIdConflict.RandomConflicts, 3, 5, rand=lambda x, y: y)
-        )
+        ids = params.build_conflicting_ids(params.IndexIdConflict.RandomConflicts, 1000, 5, seed=42)
+        self.assertEqual(1000, len(ids))
+        self.assertTrue(all(5 <= int(doc_id) <= 1005 for doc_id in ids))
+        # ids are stable on repeated access and for the same seed...
+        self.assertEqual(list(ids), list(ids))
+        self.assertEqual(list(ids), list(params.build_conflicting_ids(params.IndexIdConflict.RandomConflicts, 1000, 5, seed=42)))
+        # ... but differ for different seeds
+        self.assertNotEqual(list(ids), list(params.build_conflicting_ids(params.IndexIdConflict.RandomConflicts, 1000, 5, seed=43)))
+        # ids are random
+        self.assertGreater(len(set(ids)), 500)
+
+    def test_ids_are_computed_lazily(self):
+        ids = params.build_conflicting_ids(params.IndexIdConflict.SequentialConflicts, 10 ** 12, 5)
+        self.assertEqual(10 ** 12, len(ids))
+        self.assertEqual("      1004", ids[999])
+        self.assertEqual("1000000000004", ids[-1])
+        with self.assertRaises(IndexError):
+            # noinspection PyStatementEffect
+            ids[10 ** 12]
 
 
 class ActionMetaDataTests(TestCase):
@@ -273,6 +279,243 @@ class IndexDataReaderTests(TestCase):
                     bulk_index += 1
 
 
+class MmapIndexDataReaderTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def write(self, contents):
+        path = os.path.join(self.tmp_dir, "docs.json")
+        with open(path, "wb") as f:
+            f.write(contents)
+        return path
+
+    def read_bulks(self, data_file, offset, number_of_lines, bulk_size, action_metadata, source_class=io.MmapSource):
+        source = params.Slice(source_class, offset, number_of_lines)
+        am_handler = params.SourceActionMetaData(source) if action_metadata is None else action_metadata
+        reader = params.MmapIndexDataReader(data_file, batch_size=bulk_size, bulk_size=bulk_size, file_source=source,
+                                            action_metadata=am_handler, index_name="test_index", type_name="test_type")
+        with reader:
+            return [bulk for _, _, batch in reader for bulk in batch]
+
+    def test_read_bulks_with_offset(self):
+        data_file = self.write(b'{"key": "value1"}\n{"key": "value2"}\n{"key": "value3"}\n{"key": "value4"}\n{"key": "value5"}')
+        am_handler = params.GenerateActionMetaData("test_index", "test_type", conflicting_ids=None)
+
+        self.assertEqual([
+            (2, b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value2"}\n'
+                b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value3"}\n'),
+            (2, b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value4"}\n'
+                b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value5"}\n')
+        ], self.read_bulks(data_file, offset=1, number_of_lines=4, bulk_size=2, action_metadata=am_handler))
+
+    def test_read_bulks_from_block_compressed_file(self):
+        data_file = self.write(b'{"key": "value1"}\n{"key": "value2"}\n{"key": "value3"}\n{"key": "value4"}\n{"key": "value5"}')
+        io.compress_blocks(data_file, data_file, lines_per_block=2)
+        am_handler = params.GenerateActionMetaData("test_index", "test_type", conflicting_ids=None)
+
+        self.assertEqual([
+            (3, b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value2"}\n'
+                b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value3"}\n'
+                b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value4"}\n'),
+            (1, b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value5"}\n')
+        ], self.read_bulks(data_file, offset=1, number_of_lines=4, bulk_size=3, action_metadata=am_handler,
+                           source_class=io.BlockCompressedSource))
+
+    def test_read_bulks_with_id_conflicts(self):
+        data_file = self.write(b'{"key": "value1"}\n{"key": "value2"}\n')
+        # never replace a document
+        am_handler = params.GenerateActionMetaData("test_index", "test_type", conflicting_ids=["100", "200"], rand=lambda x, y: x)
+
+        self.assertEqual([
+            (2, b'{"index": {"_index": "test_index", "_type": "test_type", "_id": "100"}}\n{"key": "value1"}\n'
+                b'{"index": {"_index": "test_index", "_type": "test_type", "_id": "200"}}\n{"key": "value2"}\n')
+        ], self.read_bulks(data_file, offset=0, number_of_lines=2, bulk_size=5, action_metadata=am_handler))
+
+    def test_read_bulks_and_assume_metadata_line_in_source_file(self):
+        data_file = self.write(b'{"index": {}}\n{"key": "value1"}\n{"index": {}}\n{"key": "value2"}\n{"index": {}}\n{"key": "value3"}\n')
+
+        self.assertEqual([
+            (2, b'{"index": {}}\n{"key": "value1"}\n{"index": {}}\n{"key": "value2"}\n'),
+            (1, b'{"index": {}}\n{"key": "value3"}\n')
+        ], self.read_bulks(data_file, offset=0, number_of_lines=6, bulk_size=2, action_metadata=None))
+
+    def test_read_bulks_with_windows_line_endings(self):
+        data_file = self.write(b'{"key": "value1"}\r\n{"key": "value2"}\r\n{"key": "value3"}\r\n')
+        am_handler = params.GenerateActionMetaData("test_index", "test_type", conflicting_ids=None)
+
+        self.assertEqual([
+            (2, b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value1"}\n'
+                b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value2"}\n'),
+            (1, b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value3"}\n')
+        ], self.read_bulks(data_file, offset=0, number_of_lines=3, bulk_size=2, action_metadata=am_handler))
+
+    def test_read_bulks_with_windows_line_endings_and_metadata_line_in_source_file(self):
+        data_file = self.write(b'{"index": {}}\r\n{"key": "value1"}\r\n{"index": {}}\r\n{"key": "value2"}\r\n')
+
+        self.assertEqual([
+            (2, b'{"index": {}}\n{"key": "value1"}\n{"index": {}}\n{"key": "value2"}\n')
+        ], self.read_bulks(data_file, offset=0, number_of_lines=4, bulk_size=2, action_metadata=None))
+
+
+class BulkCacheTests(TestCase):
+    def setUp(self):
+        self.data_file = os.path.join(tempfile.mkdtemp(), "docs.json")
+        with open(self.data_file, "wb") as f:
+            for i in range(10):
+                f.write(b'{"key": "value%d"}\n' % i)
+        self.type = track.Type("test_type", mapping={}, document_file=self.data_file, number_of_documents=10)
+        self.index = track.Index("test_index", auto_managed=True, types=[self.type])
+
+    def bulks(self, reader):
+        with reader:
+            return [(docs_in_bulk, bytes(body)) for _, _, batch in reader for docs_in_bulk, body in batch]
+
+    def test_reads_compiled_bulks(self):
+        expected = self.bulks(params.create_mmap_reader(self.index, self.type, 5, 5, 5, 3, 3, None))
+
+        cache_path = params.compile_bulk_bodies(self.index, self.type, 5, 5, 5, 3, 3, None)
+        self.assertTrue(params.is_bulk_cache_valid(self.data_file, cache_path))
+        self.assertFalse(params.is_bulk_cache_valid(self.data_file, cache_path, compression_level=9))
+
+        reader = params.create_default_reader(self.index, self.type, 5, 5, 5, 3, 3, None, bulk_cache=True)
+        self.assertIsInstance(reader, params.CachedIndexDataReader)
+        self.assertEqual([3, 2], [docs_in_bulk for docs_in_bulk, _ in expected])
+        self.assertEqual(expected, self.bulks(reader))
+
+    def test_ignores_compiled_bulks_unless_cache_is_enabled(self):
+        params.compile_bulk_bodies(self.index, self.type, 5, 5, 5, 3, 3, None)
+
+        reader = params.create_default_reader(self.index, self.type, 5, 5, 5, 3, 3, None)
+        self.assertIsInstance(reader, params.MmapIndexDataReader)
+
+    def test_invalidates_cache_while_it_is_compiled_again(self):
+        cache_path = params.compile_bulk_bodies(self.index, self.type, 0, 10, 10, 4, 4, None)
+
+        with mock.patch("gzip.compress", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                params.compile_bulk_bodies(self.index, self.type, 0, 10, 10, 4, 4, None, compression_level=1)
+
+        self.assertFalse(params.is_bulk_cache_valid(self.data_file, cache_path))
+
+    def test_reads_compressed_bulks(self):
+        cache_path = params.compile_bulk_bodies(self.index, self.type, 0, 10, 10, 4, 4, None, compression_level=1)
+        self.assertTrue(params.is_bulk_cache_valid(self.data_file, cache_path, compression_level=1))
+        # a different compression level requires compressing all bodies again
+        self.assertFalse(params.is_bulk_cache_valid(self.data_file, cache_path, compression_level=9))
+        params.compile_bulk_bodies(self.index, self.type, 0, 10, 10, 4, 4, None, compression_level=9)
+        self.assertEqual([params.compressed_bulk_cache_path(cache_path, 9)], params.existing_compressed_bulk_cache_paths(cache_path))
+
+        with params.CachedIndexDataReader(cache_path, 8, self.index, self.type, compression_level=9) as reader:
+            _, _, batch = next(reader)
+            self.assertEqual(2, len(batch))
+            for docs_in_bulk, body in batch:
+                self.assertEqual(4, docs_in_bulk)
+                self.assertEqual(bytes(body), gzip.decompress(body.compressed))
+            _, _, batch = next(reader)
+            self.assertEqual([2], [docs_in_bulk for docs_in_bulk, _ in batch])
+            with self.assertRaises(StopIteration):
+                next(reader)
+
+    def test_reads_uncompressed_bulks_if_client_does_not_compress(self):
+        params.compile_bulk_bodies(self.index, self.type, 0, 10, 10, 4, 4, None, compression_level=1)
+
+        reader = params.create_default_reader(self.index, self.type, 0, 10, 10, 4, 4, None, bulk_cache=True)
+        self.assertIsInstance(reader, params.CachedIndexDataReader)
+        with reader:
+            for _, _, batch in reader:
+                for _, body in batch:
+                    self.assertNotIsInstance(body, compression.PrecompressedBody)
+
+    def test_ignores_compressed_bulks_of_other_compression_level(self):
+        params.compile_bulk_bodies(self.index, self.type, 0, 10, 10, 4, 4, None, compression_level=1)
+
+        reader = params.create_default_reader(self.index, self.type, 0, 10, 10, 4, 4, None, bulk_cache=True, compression_level=9)
+        self.assertIsInstance(reader, params.MmapIndexDataReader)
+
+    def test_compiles_bulks_for_all_partitions(self):
+        source = params.BulkIndexParamSource(indices=[self.index], params={"bulk-size": 2})
+        source.compile(total_partitions=2)
+
+        for offset in [0, 5]:
+            cache_path = params.bulk_cache_path(self.index, self.type, offset, 5, 2, params.IndexIdConflict.NoConflicts)
+            self.assertTrue(params.is_bulk_cache_valid(self.data_file, cache_path))
+
+    def test_caches_random_conflicts_per_seed(self):
+        conflicts = params.IndexIdConflict.RandomConflicts
+        cache_path = params.compile_bulk_bodies(self.index, self.type, 0, 10, 10, 5, 5, conflicts, conflicts_seed=42)
+
+        self.assertEqual(cache_path, params.bulk_cache_path(self.index, self.type, 0, 10, 5, conflicts, conflicts_seed=42))
+        for other_seed in [None, 43]:
+            other_cache_path = params.bulk_cache_path(self.index, self.type, 0, 10, 5, conflicts, conflicts_seed=other_seed)
+            self.assertNotEqual(cache_path, other_cache_path)
+            self.assertFalse(params.is_bulk_cache_valid(self.data_file, other_cache_path))
+
+
+class PrefetcherTests(TestCase):
+    def test_returns_all_elements_in_order(self):
+        prefetcher = params.Prefetcher(iter(range(100)), depth=3)
+        self.assertEqual(list(range(100)), list(prefetcher))
+        # stays exhausted
+        with self.assertRaises(StopIteration):
+            next(prefetcher)
+
+    def test_propagates_errors(self):
+        def failing():
+            yield 1
+            raise IOError("disk failure")
+
+        prefetcher = params.Prefetcher(failing(), depth=3)
+        self.assertEqual(1, next(prefetcher))
+        with self.assertRaisesRegex(IOError, "disk failure"):
+            next(prefetcher)
+
+    def test_stops_reading_ahead_when_closed(self):
+        closed = []
+
+        def endless():
+            try:
+                while True:
+                    yield 1
+            finally:
+                closed.append(True)
+
+        prefetcher = params.Prefetcher(endless(), depth=2)
+        self.assertEqual(1, next(prefetcher))
+        prefetcher.close()
+        prefetcher.producer.join(timeout=5)
+        self.assertFalse(prefetcher.producer.is_alive())
+        self.assertEqual([True], closed)
+
+    def test_returns_all_elements_in_order_from_background_process(self):
+        prefetcher = params.Prefetcher(({"body": b"%d" % i} for i in range(100)), depth=3, mode="process")
+        self.assertEqual([{"body": b"%d" % i} for i in range(100)], list(prefetcher))
+        with self.assertRaises(StopIteration):
+            next(prefetcher)
+        prefetcher.producer.join(timeout=5)
+        self.assertFalse(prefetcher.producer.is_alive())
+
+    def test_propagates_errors_from_background_process(self):
+        def failing():
+            yield 1
+            raise IOError("disk failure")
+
+        prefetcher = params.Prefetcher(failing(), depth=3, mode="process")
+        self.assertEqual(1, next(prefetcher))
+        with self.assertRaisesRegex(IOError, "disk failure"):
+            next(prefetcher)
+
+    def test_stops_background_process_when_closed(self):
+        def endless():
+            while True:
+                yield 1
+
+        prefetcher = params.Prefetcher(endless(), depth=2, mode="process")
+        self.assertEqual(1, next(prefetcher))
+        prefetcher.close()
+        prefetcher.producer.join(timeout=5)
+        self.assertFalse(prefetcher.producer.is_alive())
+
+
 class InvocationGeneratorTests(TestCase):
     class TestIndexReader:
         def __init__(self, data):
@@ -371,7 +614,7 @@ class InvocationGeneratorTests(TestCase):
     def test_build_conflicting_ids(self):
         self.assertIsNone(params.build_conflicting_ids(params.IndexIdConflict.NoConflicts, 3, 0))
         self.assertEqual(["         0", "         1", "         2"],
-                         params.build_conflicting_ids(params.IndexIdConflict.SequentialConflicts, 3, 0))
+                         list(params.build_conflicting_ids(params.IndexIdConflict.SequentialConflicts, 3, 0)))
         # we cannot tell anything specific about the contents...
         self.assertEqual(3, len(params.build_conflicting_ids(params.IndexIdConflict.RandomConflicts, 3, 0)))
 
@@ -399,6 +642,34 @@ class BulkIndexParamSourceTests(TestCase):
 
         self.assertEqual("'bulk-size' must be positive but was -5", ctx.exception.args[0])
 
+    def test_create_with_negative_prefetch_depth(self):
+        with self.assertRaises(exceptions.InvalidSyntax) as ctx:
+            params.BulkIndexParamSource(indices=[], params={
+                "bulk-size": 5,
+                "prefetch-depth": -1
+            })
+
+        self.assertEqual("'prefetch-depth' must be non-negative but was -1", ctx.exception.args[0])
+
+    def test_create_with_unknown_prefetch_mode(self):
+        with self.assertRaises(exceptions.InvalidSyntax) as ctx:
+            params.BulkIndexParamSource(indices=[], params={
+                "bulk-size": 5000,
+                "prefetch-depth": 2,
+                "prefetch-mode": "fiber"
+            })
+
+        self.assertEqual("Unknown 'prefetch-mode' [fiber]. Use one of 'thread', 'process'.", ctx.exception.args[0])
+
+    def test_create_with_invalid_compression_level(self):
+        with self.assertRaises(exceptions.InvalidSyntax) as ctx:
+            params.BulkIndexParamSource(indices=[], params={
+                "bulk-size": 5,
+                "compression-level": 10
+            })
+
+        self.assertEqual("'compression-level' must be between 1 and 9 but was 10", ctx.exception.args[0])
+
     def test_create_with_fraction_smaller_batch_size(self):
         with self.assertRaises(exceptions.InvalidSyntax) as ctx:
             params.BulkIndexParamSource(indices=[], params={
@@ -594,6 +865,24 @@ class BulkDataGeneratorTests(TestCase):
             "custom-param": "bar"
         }, all_bulks[0])
 
+    def test_compresses_bodies_ahead_of_dispatch(self):
+        type1 = track.Type("type1", mapping={}, number_of_documents=3)
+        index1 = track.Index(name="index1", auto_managed=True, types=[type1])
+        precompressed = compression.PrecompressedBody(b"3\n", gzip.compress(b"3\n"))
+
+        bulks = params.bulk_data_based(num_clients=1, client_index=0, indices=[index1], batch_size=1, bulk_size=1,
+                                       id_conflicts=params.IndexIdConflict.NoConflicts, pipeline=None, original_params={},
+                                       create_reader=BulkDataGeneratorTests.create_test_reader([b"1\n", b"2\n", precompressed]),
+                                       compression_level=1)
+        all_bulks = list(bulks)
+
+        for bulk in all_bulks[:2]:
+            self.assertIsInstance(bulk["body"], compression.PrecompressedBody)
+            self.assertEqual(bytes(bulk["body"]), gzip.decompress(bulk["body"].compressed))
+            self.assertIsNotNone(bulk["body"].compression_time)
+        # already compressed bodies are kept
+        self.assertIs(precompressed, all_bulks[2]["body"])
+
 
 class ParamsRegistrationTests(TestCase):
     @staticmethod
@@ -0,0 +1,21 @@
+import gzip
+import pickle
+from unittest import TestCase
+
+from esrally.utils import compression
+
+
+class CompressionTests(TestCase):
+    def test_compress_records_compression_time_and_ratio(self):
+        body = compression.compress(b"a" * 1000, compression_level=1)
+
+        self.assertEqual(b"a" * 1000, gzip.decompress(body.compressed))
+        self.assertGreaterEqual(body.compression_time, 0)
+        self.assertEqual(1000 / len(body.compressed), body.compression_ratio)
+
+    def test_pickles_precompressed_body(self):
+        body = pickle.loads(pickle.dumps(compression.PrecompressedBody(b"body", b"compressed", compression_time=0.5)))
+
+        self.assertEqual(b"body", body)
+        self.assertEqual(b"compressed", body.compressed)
+        self.assertEqual(0.5, body.compression_time)
@@ -1,4 +1,7 @@
+import bz2
+import gzip
 import os
+import random
 import tempfile
 import unittest.mock as mock
 from unittest import TestCase
@@ -88,6 +91,182 @@ class DecompressionTests(TestCase):
             self.assertEqual("Sample text for DecompressionTests\n", self.read(decompressed_path),
                              msg="Could not decompress [%s] to [%s] (target file is corrupt)" % (archive_path, decompressed_path))
 
+    @mock.patch("esrally.utils.io.DECOMPRESSION_BUFFER_SIZE", 7)
+    @mock.patch("esrally.utils.io.PARALLEL_DECOMPRESSORS", {})
+    def test_creates_offset_table_while_decompressing(self):
+        self.assert_offset_table_matches_separately_created_one()
+
+    @mock.patch("esrally.utils.io.DECOMPRESSION_BUFFER_SIZE", 7)
+    @mock.patch("esrally.utils.io.PARALLEL_DECOMPRESSORS", {".gz": ["gzip"], ".bz2": ["bzip2"]})
+    def test_decompresses_with_external_decompressor(self):
+        self.assert_offset_table_matches_separately_created_one()
+
+    @mock.patch("esrally.utils.io.PARALLEL_DECOMPRESSORS", {".gz": ["false"], ".bz2": ["false"]})
+    def test_falls_back_if_external_decompressor_fails(self):
+        self.assert_offset_table_matches_separately_created_one()
+
+    def assert_offset_table_matches_separately_created_one(self):
+        contents = b"".join(b"line %d\n" % i for i in range(50)) + b"last line"
+        for ext, compressor in [("gz", gzip), ("bz2", bz2)]:
+            tmp_dir = tempfile.mkdtemp()
+            archive_path = os.path.join(tmp_dir, "docs.json.%s" % ext)
+            decompressed_path = os.path.join(tmp_dir, "docs.json")
+            with compressor.open(archive_path, "wb") as f:
+                f.write(contents)
+
+            self.assertEqual(51, io.decompress(archive_path, target_directory=tmp_dir, offset_table_stride=3))
+            with open(decompressed_path, "rb") as f:
+                self.assertEqual(contents, f.read())
+            with open("%s.offset.bin" % decompressed_path, "rb") as f:
+                offset_table = f.read()
+            # the offset table is still considered valid
+            self.assertIsNone(io.prepare_file_offset_table(decompressed_path, stride=3))
+
+            io.remove_file_offset_table(decompressed_path)
+            self.assertEqual(51, io.prepare_file_offset_table(decompressed_path, stride=3))
+            with open("%s.offset.bin" % decompressed_path, "rb") as f:
+                self.assertEqual(f.read(), offset_table)
+
     def read(self, f):
         with open(f, 'r') as content_file:
             return content_file.read()
+
+
+class BlockCompressionTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data_file_path = os.path.join(self.tmp_dir, "docs.json")
+        self.lines = [b"line %d\n" % i for i in range(50)] + [b"last line"]
+
+    @mock.patch("esrally.utils.io.DECOMPRESSION_BUFFER_SIZE", 7)
+    @mock.patch("esrally.utils.io.PARALLEL_DECOMPRESSORS", {})
+    def test_converts_archive_to_block_compressed_file(self):
+        archive_path = "%s.bz2" % self.data_file_path
+        with bz2.open(archive_path, "wb") as f:
+            f.write(b"".join(self.lines))
+
+        self.assertEqual(51, io.compress_blocks(archive_path, self.data_file_path, lines_per_block=3))
+        # still valid
+        self.assertIsNone(io.compress_blocks(archive_path, self.data_file_path, lines_per_block=3))
+        self.assertFalse(os.path.exists(self.data_file_path))
+        self.assertTrue(io.is_block_compressed(self.data_file_path))
+        # the blocks also form a regular gzip file
+        with gzip.open("%s.blocks.gz" % self.data_file_path, "rb") as f:
+            self.assertEqual(b"".join(self.lines), f.read())
+
+        for i in range(51):
+            with io.BlockCompressedSource(self.data_file_path) as source:
+                io.skip_lines(self.data_file_path, source, i)
+                self.assertEqual(self.lines[i], source.readline())
+
+        with io.BlockCompressedSource(self.data_file_path) as source:
+            io.skip_lines(self.data_file_path, source, 2)
+            self.assertEqual((5, b"".join(self.lines[2:7])), source.read_lines(5))
+            self.assertEqual((44, b"".join(self.lines[7:])), source.read_lines(100))
+            self.assertEqual((0, b""), source.read_lines(1))
+            self.assertEqual(b"", source.readline())
+
+        io.remove_block_compressed_file(self.data_file_path)
+        self.assertFalse(io.is_block_compressed(self.data_file_path))
+
+    def test_converts_text_file_to_block_compressed_file(self):
+        with open(self.data_file_path, "wb") as f:
+            f.write(b"".join(self.lines[:50]))
+
+        self.assertEqual(50, io.compress_blocks(self.data_file_path, self.data_file_path, lines_per_block=10))
+        self.assertTrue(io.is_block_compressed(self.data_file_path))
+        with io.BlockCompressedSource(self.data_file_path) as source:
+            io.skip_lines(self.data_file_path, source, 40)
+            self.assertEqual((10, b"".join(self.lines[40:50])), source.read_lines(20))
+
+
+class MmapSourceTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def write(self, name, contents):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "wb") as f:
+            f.write(contents)
+        return path
+
+    def test_reads_lines(self):
+        path = self.write("lines.txt", b"line 1\nline 2\nline 3")
+        with io.MmapSource(path, "rb") as source:
+            self.assertEqual(b"line 1\n", source.readline())
+            self.assertEqual((1, b"line 2\n"), source.read_lines(1))
+            self.assertEqual((1, b"line 3"), source.read_lines(5))
+            self.assertEqual((0, b""), source.read_lines(5))
+            self.assertEqual(b"", source.readline())
+
+    def test_skips_lines(self):
+        path = self.write("lines.txt", b"line 1\nline 2\nline 3\n")
+        with io.MmapSource(path, "rb") as source:
+            io.skip_lines(path, source, 2)
+            self.assertEqual(b"line 3\n", source.read())
+
+    def test_reads_empty_file(self):
+        path = self.write("empty.txt", b"")
+        with io.MmapSource(path, "rb") as source:
+            self.assertEqual(b"", source.readline())
+            self.assertEqual((0, b""), source.read_lines(5))
+
+
+class FileOffsetTableTests(TestCase):
+    def setUp(self):
+        self.data_file_path = os.path.join(tempfile.mkdtemp(), "docs.json")
+
+    def write(self, contents):
+        with open(self.data_file_path, "wb") as f:
+            f.write(contents)
+
+    def line_after_skipping(self, number_of_lines_to_skip):
+        with io.MmapSource(self.data_file_path, "rb") as source:
+            io.skip_lines(self.data_file_path, source, number_of_lines_to_skip)
+            return source.readline()
+
+    @mock.patch("esrally.utils.io.OFFSET_TABLE_CHUNK_SIZE", 7)
+    def test_skips_lines_with_offset_table(self):
+        lines = [b"line %d\n" % i for i in range(50)]
+        self.write(b"".join(lines))
+
+        self.assertEqual(50, io.prepare_file_offset_table(self.data_file_path, stride=3))
+        # table is still valid
+        self.assertIsNone(io.prepare_file_offset_table(self.data_file_path, stride=3))
+
+        for i in range(50):
+            self.assertEqual(lines[i], self.line_after_skipping(i))
+
+        io.remove_file_offset_table(self.data_file_path)
+        self.assertFalse(os.path.exists("%s.offset.bin" % self.data_file_path))
+
+    @mock.patch("esrally.utils.io.OFFSET_TABLE_CHUNK_SIZE", 5)
+    @mock.patch("esrally.utils.io.OFFSET_TABLE_MIN_RANGE_SIZE", 16)
+    def test_parallel_offset_table_matches_serial_one(self):
+        random.seed(17)
+        self.write(b"".join(b"x" * random.randint(0, 12) + b"\n" for _ in range(300)) + b"unterminated")
+        offset_table_path = "%s.offset.bin" % self.data_file_path
+
+        self.assertEqual(301, io.prepare_file_offset_table(self.data_file_path, stride=4, workers=1))
+        with open(offset_table_path, "rb") as f:
+            serial = f.read()
+        io.remove_file_offset_table(self.data_file_path)
+
+        self.assertEqual(301, io.prepare_file_offset_table(self.data_file_path, stride=4, workers=4))
+        with open(offset_table_path, "rb") as f:
+            self.assertEqual(serial, f.read())
+
+    def test_counts_unterminated_last_line(self):
+        self.write(b"line 0\nline 1")
+        self.assertEqual(2, io.prepare_file_offset_table(self.data_file_path, stride=1))
+        self.assertEqual(b"line 1", self.line_after_skipping(1))
+
+    def test_skips_lines_with_legacy_offset_table(self):
+        self.write(b"line 0\nline 1\nline 2\nline 3\n")
+        with open("%s.offset" % self.data_file_path, "w") as f:
+            f.write("2;14\n")
+
+        data_file = mock.Mock()
+        io.skip_lines(self.data_file_path, data_file, 3)
+        data_file.seek.assert_called_with(14)
+        self.assertEqual(1, data_file.readline.call_count)
@@ -0,0 +1,172 @@
+import hashlib
+import http.server
+import json
+import os
+import random
+import socketserver
+import tempfile
+import threading
+import unittest.mock as mock
+from unittest import TestCase
+
+import urllib3
+
+from esrally import exceptions
+from esrally.utils import net
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class FileRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves ``server.content`` for every path and supports (single) range requests if ``server.ranges_supported`` is set. The
+    ``Content-Length`` header is omitted unless ``server.content_length_known`` is set.
+    """
+    def do_HEAD(self):
+        self.send_headers(200, len(self.server.content))
+        self.end_headers()
+
+    def do_GET(self):
+        content = self.server.content
+        requested_range = self.headers.get("Range")
+        self.server.requested_ranges.append(requested_range)
+        start, end = [int(i) for i in requested_range[len("bytes="):].split("-")] if requested_range else (None, None)
+        # servers ignore invalid ranges (see RFC 7233, section 3.1)
+        if requested_range and self.server.ranges_supported and start <= end:
+            body = content[start:end + 1]
+            self.send_headers(206, len(body))
+            self.send_header("Content-Range", "bytes %d-%d/%d" % (start, end, len(content)))
+        else:
+            body = content
+            self.send_headers(200, len(body))
+        self.end_headers()
+        if self.server.truncate_next_response:
+            # simulate a connection that breaks in the middle of the transfer
+            self.server.truncate_next_response = False
+            body = body[:len(body) // 2]
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def send_headers(self, status, content_length):
+        self.send_response(status)
+        if self.server.content_length_known:
+            self.send_header("Content-Length", str(content_length))
+        else:
+            # the end of the body is signalled by closing the connection
+            self.close_connection = True
+        self.send_header("ETag", '"v1"')
+        if self.server.ranges_supported:
+            self.send_header("Accept-Ranges", "bytes")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@mock.patch("esrally.utils.net.PARALLEL_DOWNLOAD_MIN_SEGMENT_SIZE", 1000)
+@mock.patch("esrally.utils.net.DOWNLOAD_BUFFER_SIZE", 512)
+class DownloadTests(TestCase):
+    def setUp(self):
+        self.content = bytes(random.getrandbits(8) for _ in range(10000))
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FileRequestHandler)
+        self.server.content = self.content
+        self.server.ranges_supported = True
+        self.server.content_length_known = True
+        self.server.truncate_next_response = False
+        self.server.requested_ranges = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:%d/docs.json.bz2" % self.server.server_address[1]
+        self.local_path = os.path.join(tempfile.mkdtemp(), "docs.json.bz2")
+        # connect directly regardless of any proxy settings in the environment
+        self.http = mock.patch("esrally.utils.net.__HTTP", urllib3.PoolManager())
+        self.http.start()
+
+    def tearDown(self):
+        self.http.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def checksum(self, content=None):
+        return "sha1", hashlib.sha1(self.content if content is None else content).hexdigest()
+
+    def assert_downloaded(self):
+        with open(self.local_path, "rb") as f:
+            self.assertEqual(self.content, f.read())
+        self.assertFalse(os.path.exists(self.local_path + ".tmp"))
+        self.assertFalse(os.path.exists(self.local_path + ".tmp.state"))
+
+    def test_downloads_over_several_connections(self):
+        progress = mock.Mock()
+        net.download(self.url, self.local_path, expected_size_in_bytes=10000, progress_indicator=progress,
+                     expected_checksum=self.checksum(), connections=4)
+
+        self.assert_downloaded()
+        self.assertEqual(["bytes=0-2499", "bytes=2500-4999", "bytes=5000-7499", "bytes=7500-9999"], sorted(self.server.requested_ranges))
+        progress.assert_called_with(10000, 10000)
+
+    def test_downloads_over_one_connection_without_range_support(self):
+        self.server.ranges_supported = False
+
+        net.download(self.url, self.local_path, expected_checksum=self.checksum(), connections=4)
+
+        self.assert_downloaded()
+        self.assertEqual([None], self.server.requested_ranges)
+
+    def test_downloads_over_one_connection_with_range_support_but_unknown_size(self):
+        self.server.content_length_known = False
+
+        net.download(self.url, self.local_path, expected_checksum=self.checksum(), connections=4)
+
+        self.assert_downloaded()
+        self.assertEqual([None], self.server.requested_ranges)
+
+    def test_resumes_partial_download(self):
+        with open(self.local_path + ".tmp", "wb") as f:
+            f.write(self.content[:3000])
+
+        net.download(self.url, self.local_path, expected_checksum=self.checksum(), connections=4)
+
+        self.assert_downloaded()
+        self.assertEqual(["bytes=3000-9999"], self.server.requested_ranges)
+
+    def test_resumes_download_with_complete_segments(self):
+        with open(self.local_path + ".tmp", "wb") as f:
+            f.write(self.content[:2500] + self.content[2500:3000] + bytes(2000) + self.content[5000:7500] + bytes(2500))
+        with open(self.local_path + ".tmp.state", "wt") as f:
+            json.dump({"url": self.url, "size": 10000, "etag": '"v1"',
+                       "segments": [[0, 2500, 2500], [2500, 5000, 500], [5000, 7500, 2500], [7500, 10000, 0]]}, f)
+
+        net.download(self.url, self.local_path, expected_checksum=self.checksum(), connections=4)
+
+        self.assert_downloaded()
+        self.assertEqual(["bytes=3000-4999", "bytes=7500-9999"], sorted(self.server.requested_ranges))
+
+    def test_resumes_segment_after_broken_connection(self):
+        self.server.truncate_next_response = True
+
+        net.download(self.url, self.local_path, expected_checksum=self.checksum(), connections=1)
+
+        self.assert_downloaded()
+        self.assertEqual(["bytes=0-9999", "bytes=5000-9999"], self.server.requested_ranges)
+
+    def test_keeps_partial_download_if_it_cannot_be_completed(self):
+        self.server.truncate_next_response = True
+
+        with mock.patch("esrally.utils.net.SEGMENT_DOWNLOAD_ATTEMPTS", 1):
+            with self.assertRaises(exceptions.DataError):
+                net.download(self.url, self.local_path, connections=1)
+
+        self.assertFalse(os.path.exists(self.local_path))
+        self.assertTrue(os.path.exists(self.local_path + ".tmp.state"))
+
+        net.download(self.url, self.local_path, expected_checksum=self.checksum(), connections=1)
+        self.assert_downloaded()
+        self.assertEqual(["bytes=0-9999", "bytes=5000-9999"], self.server.requested_ranges)
+
+    def test_rejects_download_with_wrong_checksum(self):
+        with self.assertRaisesRegex(exceptions.DataError, "Expected sha1 checksum"):
+            net.download(self.url, self.local_path, expected_checksum=self.checksum(b"other content"), connections=4)
+
+        self.assertFalse(os.path.exists(self.local_path))
+        self.assertFalse(os.path.exists(self.local_path + ".tmp"))